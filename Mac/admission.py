@@ -0,0 +1,349 @@
+# admission.py
+# 인기 이벤트 대기열 (이벤트별로 켜고, 토큰 버킷 속도로 입장시킨 뒤 서명된 입장권으로 예약)
+#   AdmissionControl       : 대기열을 워커 메모리에 둠 (memory 저장소 - 워커 하나로만 실행)
+#   SqliteAdmissionControl : 대기열 설정, 순번, 사용한 입장권을 모든 워커가 같은 SQLite 파일(ADMISSION_DATABASE)에 둠
+#                            (어느 워커로 요청이 가도 같은 대기열을 보고, 입장권도 전체에서 한 번만 쓸 수 있음)
+import os
+import secrets
+import threading
+import time
+from collections import deque
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from db import immediate_transaction, open_connection
+
+# 토큰 버킷 갱신: 남은 토큰과 지난 시간 -> (꺼낸 개수, 남은 토큰), 최대 limit개까지 꺼냄
+
+def take_tokens(tokens, elapsed, rate, burst, limit):
+    tokens = min(burst, tokens + elapsed * rate)
+    taken = min(int(tokens), limit)
+    return taken, tokens - taken
+
+# 초당 rate개씩 채워지고 최대 burst개까지 쌓이는 토큰 버킷
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    # 최대 limit개까지 쓸 수 있는 토큰을 꺼내고 꺼낸 개수 반환
+    def take(self, now, limit):
+        taken, self.tokens = take_tokens(self.tokens, now - self.updated, self.rate, self.burst, limit)
+        self.updated = now
+        return taken
+
+class QueueFull(Exception):
+    pass
+
+# 이벤트 하나의 대기열 (선착순으로 줄을 세우고 토큰 버킷 속도로 입장시킴)
+
+class WaitingRoom:
+    def __init__(self, rate, burst, max_size, pass_ttl):
+        self.rate = rate
+        self.max_size = max_size
+        self.pass_ttl = pass_ttl
+        self.used_ttl = 2 * pass_ttl + 1
+        self._bucket = TokenBucket(rate, burst)
+        self._lock = threading.Lock()
+        self._waiting = deque()      # 아직 입장하지 못한 토큰 (순서대로)
+        self._admitted = deque()     # 입장한 토큰 (입장 시각 순서대로, pass_ttl이 지나면 정리)
+        self._entries = {}           # token -> [user_id, 순번, 입장 시각]
+        self._joined = 0
+        self._admitted_count = 0
+        self.used_tokens = set()     # 이미 예약에 사용한 대기열 토큰
+        self._used_expiry = deque()  # (만료 시각, 토큰) - 보관 기간이 같으므로 사용한 순서가 곧 만료 순서
+
+    def _advance(self, now):
+        admit = self._bucket.take(now, len(self._waiting))
+        for _ in range(admit):
+            token = self._waiting.popleft()
+            self._entries[token][2] = now
+            self._admitted.append(token)
+            self._admitted_count += 1
+        while self._admitted and now - self._entries[self._admitted[0]][2] > self.pass_ttl:
+            del self._entries[self._admitted.popleft()]
+        while self._used_expiry and self._used_expiry[0][0] < now:
+            self.used_tokens.discard(self._used_expiry.popleft()[1])
+
+    def join(self, user_id):
+        with self._lock:
+            now = time.monotonic()
+            self._advance(now)
+            if len(self._waiting) >= self.max_size:
+                raise QueueFull()
+            token = secrets.token_urlsafe(16)
+            self._entries[token] = [user_id, self._joined, None]
+            self._joined += 1
+            self._waiting.append(token)
+            self._advance(now)
+            return token
+
+    # 대기 상태 조회: 토큰이 없으면 None, 있으면 (입장 여부, 내 앞에 남은 순번 포함 위치, 예상 대기 시간)
+    def status(self, token, user_id):
+        with self._lock:
+            self._advance(time.monotonic())
+            entry = self._entries.get(token)
+            if entry is None or entry[0] != user_id:
+                return None
+            if entry[2] is not None:
+                return True, 0, 0.0
+            position = entry[1] - self._admitted_count + 1
+            return False, position, round(position / self.rate, 1)
+
+    # 대기열 토큰 하나로는 한 번만 예약할 수 있음 (입장권을 여러 번 받아도 마찬가지)
+    # 입장권은 입장 후 pass_ttl까지 다시 받을 수 있고 받은 뒤 pass_ttl 동안 유효하므로
+    # 사용 기록은 사용 시각부터 2 * pass_ttl + 1초 동안 보관 (입장권 발급 시각이 초 단위로 잘리므로 1초 여유)
+    # -> 입장 시각 + 2 * pass_ttl 뒤에 만료되는 입장권까지 막음
+    def use_token(self, token):
+        with self._lock:
+            if token in self.used_tokens:
+                return False
+            self.used_tokens.add(token)
+            self._used_expiry.append((time.monotonic() + self.used_ttl, token))
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {'rate': self.rate, 'waiting': len(self._waiting),
+                    'joined': self._joined, 'admitted': self._admitted_count}
+
+# 이벤트별 대기열 관리 + 입장권 발급/검증 (워커 메모리)
+# 입장권은 서명된 값이라 어느 워커 프로세스에서도 검증할 수 있음
+
+class AdmissionControl:
+    def __init__(self, secret_key, default_rate, max_size, pass_ttl):
+        self.default_rate = default_rate
+        self.max_size = max_size
+        self.pass_ttl = pass_ttl
+        self.used_ttl = 2 * pass_ttl + 1   # 사용한 대기열 토큰 기록 보관 기간 (WaitingRoom.use_token 참고)
+        self._rooms = {}
+        self._serializer = URLSafeTimedSerializer(secret_key, salt='admission-pass')
+
+    def enable(self, event_id, rate=None, burst=None):
+        rate = rate or self.default_rate
+        burst = burst or max(rate, 1)   # 1보다 작은 버킷은 아무도 입장시키지 못함
+        self._rooms[event_id] = WaitingRoom(rate, burst, self.max_size, self.pass_ttl)
+        return self._rooms[event_id]
+
+    def disable(self, event_id):
+        return self._rooms.pop(event_id, None) is not None
+
+    def room(self, event_id):
+        return self._rooms.get(event_id)
+
+    def is_gated(self, event_id):
+        return event_id in self._rooms
+
+    # 대기열이 켜진 이벤트별 통계
+    def stats(self):
+        return {event_id: room.stats() for event_id, room in list(self._rooms.items())}
+
+    # 대기열 토큰을 함께 넣어 입장권마다 값이 달라지게 함 (한 번만 쓰도록 기록하기 위해)
+    def issue_pass(self, event_id, user_id, token):
+        return self._serializer.dumps([event_id, user_id, token])
+
+    # 입장권이 이 이벤트/사용자 것이고 만료되지 않았으며 처음 쓰는 것이면 True
+    def check_pass(self, event_id, user_id, admission_pass):
+        if not self.is_gated(event_id):
+            return True
+        if not admission_pass:
+            return False
+        try:
+            data = self._serializer.loads(admission_pass, max_age=self.pass_ttl)
+        except BadSignature:
+            return False
+        if data[:2] != [event_id, user_id]:
+            return False
+        return self.use_token(event_id, data[2])
+
+    def use_token(self, event_id, token):
+        room = self._rooms.get(event_id)
+        return room is not None and room.use_token(token)
+
+# 여러 워커가 함께 쓰는 SQLite 대기열
+# - 순번은 방마다 joined(다음 순번)와 admitted(입장한 인원) 두 숫자로 관리 (순번 < admitted면 입장)
+# - 토큰 버킷은 꺼낼 토큰이 있을 때만 갱신 (그 사이 시간은 다음에 꺼낼 때 한꺼번에 채워도 결과가 같음)
+# - 시각은 프로세스끼리 비교할 수 있도록 time.time() 사용
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS admission_rooms (
+        event_id INTEGER PRIMARY KEY,
+        rate REAL NOT NULL,
+        burst REAL NOT NULL,
+        tokens REAL NOT NULL,        -- updated_at 시점에 버킷에 남은 토큰
+        updated_at REAL NOT NULL,
+        joined INTEGER NOT NULL,     -- 지금까지 줄 선 인원 (다음 순번)
+        admitted INTEGER NOT NULL    -- 지금까지 입장한 인원
+    )''',
+    '''CREATE TABLE IF NOT EXISTS admission_queue (
+        token TEXT PRIMARY KEY,
+        event_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        admitted_at REAL             -- 입장 시각 (대기 중이면 NULL)
+    ) WITHOUT ROWID''',
+    'CREATE INDEX IF NOT EXISTS idx_admission_queue_seq ON admission_queue(event_id, seq)',
+    'CREATE INDEX IF NOT EXISTS idx_admission_queue_admitted ON admission_queue(admitted_at)',
+    '''CREATE TABLE IF NOT EXISTS admission_used (
+        token TEXT PRIMARY KEY,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID''',
+    'CREATE INDEX IF NOT EXISTS idx_admission_used_expires ON admission_used(expires_at)',
+)
+
+# SQLite 대기열 하나 (WaitingRoom과 같은 메서드, 상태는 모두 DB에 있으므로 요청마다 새로 만들어도 됨)
+
+class SqliteWaitingRoom:
+    def __init__(self, control, event_id):
+        self.control = control
+        self.event_id = event_id
+
+    # 꺼낼 수 있는 토큰만큼 입장시키고 (joined, admitted, rate) 반환, 방이 없으면 None (쓰기 트랜잭션 안에서 호출)
+    def _advance(self, conn, now):
+        room = conn.execute('SELECT rate, burst, tokens, updated_at, joined, admitted FROM admission_rooms WHERE event_id = ?',
+                            (self.event_id,)).fetchone()
+        if room is None:
+            return None
+        admitted = room['admitted']
+        taken, tokens = take_tokens(room['tokens'], now - room['updated_at'], room['rate'], room['burst'], room['joined'] - admitted)
+        if taken:
+            conn.execute('UPDATE admission_rooms SET tokens = ?, updated_at = ?, admitted = ? WHERE event_id = ?',
+                         (tokens, now, admitted + taken, self.event_id))
+            conn.execute('UPDATE admission_queue SET admitted_at = ? WHERE event_id = ? AND seq >= ? AND seq < ?',
+                         (now, self.event_id, admitted, admitted + taken))
+        return room['joined'], admitted + taken, room['rate']
+
+    # 줄 서기: 대기열 토큰 반환, 그 사이 대기열이 꺼졌으면 None
+    def join(self, user_id):
+        conn = self.control._connect()
+        now = time.time()
+        with immediate_transaction(conn):
+            counts = self._advance(conn, now)
+            if counts is None:
+                return None
+            joined, admitted, _ = counts
+            if joined - admitted >= self.control.max_size:
+                raise QueueFull()
+            token = secrets.token_urlsafe(16)
+            conn.execute('INSERT INTO admission_queue (token, event_id, user_id, seq) VALUES (?, ?, ?, ?)',
+                         (token, self.event_id, user_id, joined))
+            conn.execute('UPDATE admission_rooms SET joined = joined + 1 WHERE event_id = ?', (self.event_id,))
+            self._advance(conn, now)
+        return token
+
+    # WaitingRoom.status와 같음 (아직 대기 중이고 꺼낼 토큰이 있을 때만 쓰기 트랜잭션으로 입장 처리)
+    def status(self, token, user_id):
+        conn = self.control._connect()
+        now = time.time()
+        entry = conn.execute('SELECT user_id, seq, admitted_at FROM admission_queue WHERE token = ? AND event_id = ?',
+                             (token, self.event_id)).fetchone()
+        if entry is None or entry['user_id'] != user_id:
+            return None
+        if entry['admitted_at'] is not None:
+            return (True, 0, 0.0) if entry['admitted_at'] > now - self.control.pass_ttl else None
+        room = conn.execute('SELECT rate, burst, tokens, updated_at, joined, admitted FROM admission_rooms WHERE event_id = ?',
+                            (self.event_id,)).fetchone()
+        if room is None:
+            return None
+        admitted, rate = room['admitted'], room['rate']
+        if entry['seq'] >= admitted and take_tokens(room['tokens'], now - room['updated_at'], rate, room['burst'], 1)[0]:
+            with immediate_transaction(conn):
+                counts = self._advance(conn, now)
+            if counts is None:
+                return None
+            admitted = counts[1]
+        if entry['seq'] < admitted:
+            return True, 0, 0.0
+        position = entry['seq'] - admitted + 1
+        return False, position, round(position / rate, 1)
+
+    def stats(self):
+        room = self.control._connect().execute('SELECT rate, joined, admitted FROM admission_rooms WHERE event_id = ?',
+                                               (self.event_id,)).fetchone()
+        if room is None:
+            return {'rate': 0, 'waiting': 0, 'joined': 0, 'admitted': 0}
+        return {'rate': room['rate'], 'waiting': room['joined'] - room['admitted'],
+                'joined': room['joined'], 'admitted': room['admitted']}
+
+class SqliteAdmissionControl(AdmissionControl):
+    def __init__(self, secret_key, default_rate, max_size, pass_ttl, config, path, purge_interval=60):
+        super().__init__(secret_key, default_rate, max_size, pass_ttl)
+        self.config = dict(config, DATABASE=path)
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._purge_lock = threading.Lock()
+        self._purge_at = time.time() + purge_interval
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode = WAL')
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+
+    # 스레드별 연결 (fork 뒤에는 부모 프로세스의 연결을 쓰지 않음)
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = open_connection(self.config)
+            self._local.pid = os.getpid()
+        return conn
+
+    # 대기열을 새로 시작 (이미 켜져 있으면 설정을 바꾸고 기존 대기 인원은 비움)
+    def enable(self, event_id, rate=None, burst=None):
+        rate = rate or self.default_rate
+        burst = burst or max(rate, 1)
+        conn = self._connect()
+        with immediate_transaction(conn):
+            conn.execute('DELETE FROM admission_queue WHERE event_id = ?', (event_id,))
+            conn.execute('''INSERT OR REPLACE INTO admission_rooms (event_id, rate, burst, tokens, updated_at, joined, admitted)
+                            VALUES (?, ?, ?, ?, ?, 0, 0)''', (event_id, rate, burst, burst, time.time()))
+        return SqliteWaitingRoom(self, event_id)
+
+    def disable(self, event_id):
+        conn = self._connect()
+        with immediate_transaction(conn):
+            removed = conn.execute('DELETE FROM admission_rooms WHERE event_id = ?', (event_id,)).rowcount
+            conn.execute('DELETE FROM admission_queue WHERE event_id = ?', (event_id,))
+        return removed == 1
+
+    def room(self, event_id):
+        return SqliteWaitingRoom(self, event_id) if self.is_gated(event_id) else None
+
+    def is_gated(self, event_id):
+        return self._connect().execute('SELECT 1 FROM admission_rooms WHERE event_id = ?', (event_id,)).fetchone() is not None
+
+    def stats(self):
+        rows = self._connect().execute('SELECT event_id, rate, joined, admitted FROM admission_rooms').fetchall()
+        return {row['event_id']: {'rate': row['rate'], 'waiting': row['joined'] - row['admitted'],
+                                  'joined': row['joined'], 'admitted': row['admitted']} for row in rows}
+
+    # 사용한 대기열 토큰은 모든 워커가 같은 표에 기록 (먼저 넣은 쪽만 성공, 보관 기간은 WaitingRoom.use_token과 같음)
+    def use_token(self, event_id, token):
+        conn = self._connect()
+        now = time.time()
+        inserted = conn.execute('INSERT INTO admission_used (token, expires_at) VALUES (?, ?) ON CONFLICT(token) DO NOTHING',
+                                (token, now + self.used_ttl)).rowcount
+        conn.commit()
+        if now >= self._purge_at:
+            self._purge(conn, now)
+        return inserted == 1
+
+    # 만료된 입장권 기록과 입장 후 pass_ttl이 지난 대기열 항목을 purge_interval마다 지움 (만료 시각 인덱스 사용)
+    def _purge(self, conn, now):
+        with self._purge_lock:
+            if now < self._purge_at:
+                return
+            self._purge_at = now + self.purge_interval
+        conn.execute('DELETE FROM admission_used WHERE expires_at < ?', (now,))
+        conn.execute('DELETE FROM admission_queue WHERE admitted_at < ?', (now - self.pass_ttl,))
+        conn.commit()
+
+# 설정에 맞는 대기열 관리자 (shared면 모든 워커가 ADMISSION_DATABASE 파일을 함께 씀)
+
+def create_admission_control(config, shared):
+    args = (config['SECRET_KEY'], config['ADMISSION_DEFAULT_RATE'], config['ADMISSION_MAX_QUEUE'], config['ADMISSION_PASS_TTL'])
+    if shared:
+        return SqliteAdmissionControl(*args, config, config['ADMISSION_DATABASE'] or config['DATABASE'] + '-admission')
+    return AdmissionControl(*args)
@@ -0,0 +1,2 @@
+# bench - 예약 서버 부하/성능 측정 도구
+# 사용법: Mac 디렉터리에서 python -m bench --help
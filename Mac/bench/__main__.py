@@ -0,0 +1,52 @@
+# bench/__main__.py
+# 예) python -m bench --scenario reserve_storm --threads 16 --requests 200 --output result.json
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from bench.runner import run
+from bench.scenarios import SCENARIOS
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m bench', description='예약 서버 벤치마크')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='reserve_storm')
+    parser.add_argument('--mode', choices=['inprocess', 'http'], default='inprocess',
+                        help='inprocess: Flask test client, http: 로컬 서버에 실제 HTTP 요청')
+    parser.add_argument('--url', help='이미 실행 중인 서버 주소 (http 모드, --database와 같은 DB를 써야 함)')
+    parser.add_argument('--threads', type=int, default=8, help='프로세스당 워커 스레드 수')
+    parser.add_argument('--processes', type=int, default=1, help='부하를 만드는 프로세스 수')
+    parser.add_argument('--requests', type=int, default=100, help='워커당 요청 수')
+    parser.add_argument('--events', type=int, default=4)
+    parser.add_argument('--tickets', type=int, default=500, help='이벤트당 초기 티켓 수')
+    parser.add_argument('--bcrypt-rounds', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--storage', choices=['sqlite', 'memory'], default='sqlite',
+                        help='서버 저장소 (memory는 --processes 1, 이미 실행 중인 서버(--url)와는 같이 쓸 수 없음)')
+    parser.add_argument('--rate-limit', action='store_true', help='서버의 요청 속도 제한을 켠 채로 측정 (기본값: 끔)')
+    parser.add_argument('--database', help='기본값: 임시 디렉터리의 새 DB')
+    parser.add_argument('--output', help='결과 JSON 파일 경로 (없으면 표준 출력)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = vars(args)
+    if not options['database']:
+        options['database'] = os.path.join(tempfile.mkdtemp(prefix='bench-'), 'events.db')
+    if options['url']:
+        options['mode'] = 'http'
+    if options['storage'] == 'memory' and (options['processes'] != 1 or options['url']):
+        print('--storage memory는 --processes 1로, 벤치마크가 띄운 서버에서만 측정할 수 있습니다', file=sys.stderr)
+        return 2
+
+    result = run(options)
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0 if result['inventory_ok'] and not result['response_mismatches'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,48 @@
+# bench/clients.py
+import logging
+import threading
+
+import requests
+from werkzeug.serving import make_server
+
+# Flask test client로 같은 프로세스 안에서 앱을 직접 호출
+
+class InProcessClient:
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method, path, json=None):
+        response = self._client.open(path, method=method, json=json)
+        return response.status_code, response.get_json(silent=True)
+
+# 실제 HTTP로 서버 호출 (Keep-Alive 세션 사용)
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._session = requests.Session()
+
+    def request(self, method, path, json=None):
+        response = self._session.request(method, self.base_url + path, json=json)
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        return response.status_code, body
+
+# 벤치마크 동안 백그라운드 스레드에서 실행하는 로컬 HTTP 서버
+
+class LocalServer:
+    def __init__(self, app, host='127.0.0.1', port=0):
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)  # 요청마다 찍히는 접근 로그 끄기
+        self._server = make_server(host, port, app, threaded=True)
+        self.url = 'http://%s:%d' % (host, self._server.server_port)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._thread.join()
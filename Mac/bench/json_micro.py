@@ -0,0 +1,123 @@
+# bench/json_micro.py
+# 목록 API 응답 인코딩 마이크로벤치마크 (요청 하나당 CPU 시간)
+# 같은 DB로 앱을 설정만 바꿔 다시 만들고, Flask test client로 같은 목록을 여러 번 요청
+#   before        : JSON_FAST_ENABLED=0, COMPRESS_ENABLED=0 (Flask 기본 인코더, 행마다 dict)
+#   fast_json     : 빠른 인코더 + 행 직접 인코딩
+#   fast_json_gzip: 위와 같고 Accept-Encoding: gzip으로 압축까지
+# 예) python -m bench.json_micro --events 20000 --users 20000 --reservations 20000 --iterations 20
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+MODES = {
+    'before': {'JSON_FAST_ENABLED': False, 'COMPRESS_ENABLED': False},
+    'fast_json': {'JSON_FAST_ENABLED': True, 'COMPRESS_ENABLED': False},
+    'fast_json_gzip': {'JSON_FAST_ENABLED': True, 'COMPRESS_ENABLED': True},
+}
+
+# 이름: 경로 (events_full은 목록 캐시를 끄고 재서 매번 DB에서 다시 만드는 경우)
+ENDPOINTS = {
+    'events_full': '/events',
+    'events_page': '/events?limit=1000',
+    'users_full': '/users',
+    'users_page': '/users?limit=1000',
+    'event_reservations_full': '/events/1/reservations',
+    'stats_page': '/stats?limit=1000',
+}
+
+ADMIN_USERNAME = 'bench_admin'
+ADMIN_PASSWORD = 'bench-password'
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m bench.json_micro', description='목록 응답 인코딩 마이크로벤치마크')
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--reservations', type=int, default=20000, help='1번 이벤트의 예약 수')
+    parser.add_argument('--iterations', type=int, default=20, help='엔드포인트별 요청 수')
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES), default=list(MODES))
+    parser.add_argument('--output', help='결과 JSON 파일 경로 (없으면 표준 출력)')
+    return parser.parse_args(argv)
+
+def load_server(database, mode):
+    os.environ['BCRYPT_ROUNDS'] = '4'
+    os.environ['HASH_WORKERS'] = '0'
+    import server
+    server.create_app(dict(MODES[mode], DATABASE=database, STORAGE_BACKEND='sqlite', CATALOG_CACHE_TTL=0.0,
+                           RATE_LIMIT_ENABLED=False, METRICS_ENABLED=False))
+    return server
+
+# 관리자는 API로 만들고 (로그인에 진짜 해시가 필요), 나머지 행은 SQL로 한꺼번에 넣음
+
+def prepare(database, options):
+    server = load_server(database, 'before')
+    server.init_db()
+    client = server.app.test_client()
+    client.post('/register', json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD, 'is_admin': 1})
+    server.close_app()
+
+    conn = sqlite3.connect(database)
+    with conn:
+        conn.executemany('INSERT INTO users (username, password, is_admin) VALUES (?, ?, 0)',
+                         (('사용자_%d' % index, 'x') for index in range(options['users'])))
+        conn.executemany('INSERT INTO events (name, tickets_left) VALUES (?, ?)',
+                         (('공연 "%d"' % index, 1000 + index % 500) for index in range(options['events'])))
+        user_count = options['users'] + 1
+        conn.executemany('INSERT INTO reservations (user_id, event_id) VALUES (?, 1)',
+                         ((index % user_count + 1,) for index in range(options['reservations'])))
+    conn.close()
+
+def measure(client, path, iterations, headers):
+    response = client.get(path, headers=headers)   # 첫 요청은 준비 운동 (문장 캐시, 연결 풀)
+    assert response.status_code == 200, (path, response.status_code)
+    size = len(response.get_data())
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(iterations):
+        client.get(path, headers=headers).get_data()
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    return {
+        'cpu_ms_per_request': round(cpu / iterations * 1000, 3),
+        'wall_ms_per_request': round(wall / iterations * 1000, 3),
+        'response_bytes': size,
+        'content_encoding': response.headers.get('Content-Encoding'),
+    }
+
+def run(options):
+    database = os.path.join(tempfile.mkdtemp(prefix='bench-json-'), 'events.db')
+    prepare(database, options)
+    import fast_json
+
+    result = {'encoder': 'orjson' if fast_json.orjson else 'json', 'options': options, 'modes': {}}
+    for mode in options['modes']:
+        server = load_server(database, mode)
+        client = server.app.test_client()
+        client.post('/login', json={'username': ADMIN_USERNAME, 'password': ADMIN_PASSWORD})
+        headers = {'Accept-Encoding': 'gzip'} if mode.endswith('_gzip') else {}
+        result['modes'][mode] = {name: measure(client, path, options['iterations'], headers) for name, path in ENDPOINTS.items()}
+        server.close_app()
+
+    # before 대비 CPU 시간 비율 (작을수록 좋음)
+    before = result['modes'].get('before')
+    if before:
+        for mode, endpoints in result['modes'].items():
+            for name, row in endpoints.items():
+                row['cpu_ratio'] = round(row['cpu_ms_per_request'] / before[name]['cpu_ms_per_request'], 3)
+    return result
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = run(vars(args))
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
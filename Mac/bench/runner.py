@@ -0,0 +1,242 @@
+# bench/runner.py
+import multiprocessing
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from bench.clients import HttpClient, InProcessClient, LocalServer
+from bench.scenarios import SCENARIOS, WorkerContext
+
+BENCH_PASSWORD = 'bench-password'
+ADMIN_USERNAME = 'bench_admin'
+
+# 서버 앱은 create_app() 시점의 환경 변수로 설정을 읽으므로 반드시 환경 변수를 먼저 지정
+# (프로세스마다 앱은 한 번만 만듦)
+
+def load_server(options):
+    os.environ['DATABASE'] = options['database']
+    os.environ['STORAGE_BACKEND'] = options['storage']
+    os.environ['BCRYPT_ROUNDS'] = str(options['bcrypt_rounds'])
+    os.environ['RATE_LIMIT_ENABLED'] = '1' if options['rate_limit'] else '0'   # 사용자/주소가 적어 켜 두면 대부분 429가 됨
+    import server
+    if server.app is None:
+        server.create_app()
+    return server
+
+def worker_username(process_index, thread_index):
+    return 'bench_user_%d_%d' % (process_index, thread_index)
+
+# 새 데이터베이스에 관리자, 워커 사용자, 이벤트를 만들고 {event_id: 초기 티켓 수} 반환
+
+def prepare(options):
+    server = load_server(options)
+    server.init_db()
+    client = InProcessClient(server.app)
+    client.request('POST', '/register', {'username': ADMIN_USERNAME, 'password': BENCH_PASSWORD, 'is_admin': 1})
+    client.request('POST', '/login', {'username': ADMIN_USERNAME, 'password': BENCH_PASSWORD})
+    for process_index in range(options['processes']):
+        for thread_index in range(options['threads']):
+            client.request('POST', '/register', {'username': worker_username(process_index, thread_index), 'password': BENCH_PASSWORD})
+    for index in range(options['events']):
+        client.request('POST', '/events', {'name': 'bench event %d' % index, 'tickets_left': options['tickets']})
+
+    if options['storage'] == 'memory':
+        return {event['id']: event['tickets_left'] for event in server.storage.list_events(0, None)}
+    conn = sqlite3.connect(options['database'])
+    inventory = dict(conn.execute('SELECT id, tickets_left FROM events'))
+    conn.close()
+    return inventory
+
+# 사용자 이름 -> 저장소에 있는 [(reservation_id, event_id), ...] (시나리오가 응답과 비교할 때 사용)
+# memory 저장소는 서버 앱이 같은 프로세스에 있을 때만 읽을 수 있음
+
+def reservations_reader(options, server):
+    if options['storage'] == 'memory':
+        def read(username):
+            user = server.storage.find_user(username)
+            return [(row['reservation_id'], row['id']) for row in server.storage.list_user_reservations(user['id'], 0, None)]
+        return read
+
+    def read(username):
+        conn = sqlite3.connect(options['database'])
+        try:
+            return conn.execute('''
+                SELECT reservations.id, reservations.event_id FROM reservations
+                JOIN users ON reservations.user_id = users.id
+                WHERE users.username = ? ORDER BY reservations.id
+            ''', (username,)).fetchall()
+        finally:
+            conn.close()
+    return read
+
+def _client_factory(options, server):
+    if options['url']:
+        return lambda: HttpClient(options['url'])
+    return lambda: InProcessClient(server.app)
+
+# 한 프로세스 안에서 threads개의 워커를 동시에 시작해 결과를 모음
+
+def run_threads(options, process_index, event_ids):
+    server = load_server(options)
+    make_client = _client_factory(options, server)
+    scenario_fn = SCENARIOS[options['scenario']]
+    read_reservations = reservations_reader(options, server)
+    barrier = threading.Barrier(options['threads'])
+    latencies = []
+    statuses = Counter()
+    mismatches = [0]
+    results_lock = threading.Lock()
+
+    def work(thread_index):
+        client = make_client()
+        ctx = WorkerContext('%d_%d' % (process_index, thread_index), worker_username(process_index, thread_index),
+                            BENCH_PASSWORD, event_ids, random.Random(options['seed'] + process_index * 1000 + thread_index))
+        ctx.reservations_of = read_reservations
+        if options['scenario'] != 'register' and ctx.login(client) != 200:
+            barrier.abort()  # 다른 워커가 barrier에서 영원히 기다리지 않도록
+            raise RuntimeError('%s 로그인 실패' % ctx.username)
+        local_latencies = []
+        local_statuses = Counter()
+        barrier.wait()
+        for _ in range(options['requests']):
+            start = time.perf_counter()
+            status = scenario_fn(client, ctx)
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[status] += 1
+        with results_lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+            mismatches[0] += ctx.mismatches
+
+    baseline = dict(server.db.lock_stats)
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(options['threads'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, lock_stats_delta(server.db.lock_stats, baseline), mismatches[0]
+
+def _process_main(args):
+    try:
+        return run_threads(*args)
+    finally:
+        # 자식 프로세스는 종료 시 atexit 정리가 돌지 않으므로 해시 프로세스 풀을 직접 정리
+        load_server(args[0]).hasher.shutdown()
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+# 실행 후 이벤트별로 남은 티켓 + 예약 수 + 진행 중인 임시 예약 수가 초기 재고와 같은지 확인
+# (다르면 초과 예약 또는 유실)
+
+def check_inventory(options, server, inventory):
+    if options['storage'] == 'memory':
+        return check_memory_inventory(server.storage, inventory)
+    conn = sqlite3.connect(options['database'])
+    mismatches = []
+    for event_id, initial in inventory.items():
+        tickets_left = conn.execute('SELECT tickets_left FROM events WHERE id = ?', (event_id,)).fetchone()[0]
+        reserved = conn.execute('SELECT COUNT(*) FROM reservations WHERE event_id = ?', (event_id,)).fetchone()[0]
+        held = conn.execute('SELECT COUNT(*) FROM holds WHERE event_id = ?', (event_id,)).fetchone()[0]
+        if tickets_left < 0 or tickets_left + reserved + held != initial:
+            mismatches.append({'event_id': event_id, 'initial': initial, 'tickets_left': tickets_left,
+                               'reserved': reserved, 'held': held})
+    conn.close()
+    return mismatches
+
+# memory 저장소에는 임시 예약이 없으므로 남은 티켓 + 예약 수만 확인
+
+def check_memory_inventory(storage, inventory):
+    mismatches = []
+    for event_id, initial in inventory.items():
+        tickets_left = storage.get_event(event_id)['tickets_left']
+        reserved = sum(1 for _ in storage.list_event_reservations(event_id, 0, None))
+        if tickets_left < 0 or tickets_left + reserved != initial:
+            mismatches.append({'event_id': event_id, 'initial': initial, 'tickets_left': tickets_left,
+                               'reserved': reserved, 'held': 0})
+    return mismatches
+
+def lock_stats_delta(current, baseline):
+    return {key: current[key] - baseline.get(key, 0) for key in current}
+
+def _merge_lock_stats(all_stats):
+    merged = Counter()
+    for stats in all_stats:
+        merged.update(stats)
+    return dict(merged)
+
+# 벤치마크 한 번 실행: 준비 -> 부하 -> 재고 검증 -> 결과 dict 반환
+
+def run(options):
+    options = dict(options)
+    inventory = prepare(options)
+    event_ids = sorted(inventory)
+    server = load_server(options)
+    baseline_lock_stats = dict(server.db.lock_stats)
+
+    local_server = None
+    if options['mode'] == 'http' and not options['url']:
+        local_server = LocalServer(server.app)
+        local_server.__enter__()
+        options['url'] = local_server.url
+
+    started = time.perf_counter()
+    try:
+        if options['processes'] == 1:
+            outcomes = [run_threads(options, 0, event_ids)]
+        else:
+            # 서버의 해시 프로세스 풀을 자식에서 다시 만들 수 있도록 daemon이 아닌 워커를 spawn으로 시작
+            # (스레드가 돌고 있는 부모를 fork하면 자식에서 교착될 수 있음)
+            with ProcessPoolExecutor(options['processes'], mp_context=multiprocessing.get_context('spawn')) as pool:
+                outcomes = list(pool.map(_process_main, [(options, index, event_ids) for index in range(options['processes'])]))
+        duration = time.perf_counter() - started
+    finally:
+        if local_server is not None:
+            local_server.__exit__(None, None, None)
+
+    latencies = sorted(latency for outcome in outcomes for latency in outcome[0])
+    statuses = Counter()
+    for outcome in outcomes:
+        statuses.update(outcome[1])
+
+    # HTTP 모드에서는 서버가 이 프로세스에 있으므로 여기서 잠금 통계를 읽음
+    if options['mode'] == 'http':
+        lock_stats = lock_stats_delta(server.db.lock_stats, baseline_lock_stats)
+    else:
+        lock_stats = _merge_lock_stats(outcome[2] for outcome in outcomes)
+
+    mismatches = check_inventory(options, server, inventory)
+    response_mismatches = sum(outcome[3] for outcome in outcomes)
+    return {
+        'scenario': options['scenario'],
+        'mode': options['mode'],
+        'storage': options['storage'],
+        'threads': options['threads'],
+        'processes': options['processes'],
+        'requests': len(latencies),
+        'duration_s': round(duration, 4),
+        'throughput_rps': round(len(latencies) / duration, 2) if duration else None,
+        'latency_ms': {
+            'p50': _ms(percentile(latencies, 0.50)),
+            'p95': _ms(percentile(latencies, 0.95)),
+            'p99': _ms(percentile(latencies, 0.99)),
+            'max': _ms(latencies[-1] if latencies else None),
+        },
+        'status_counts': {str(status): count for status, count in sorted(statuses.items())},
+        'lock_waits': lock_stats,
+        'inventory_ok': not mismatches,
+        'inventory_mismatches': mismatches,
+        'response_mismatches': response_mismatches,   # 시나리오가 응답을 DB와 비교해 다르다고 본 횟수
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {key: options[key] for key in ('events', 'tickets', 'bcrypt_rounds', 'seed')},
+    }
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
@@ -0,0 +1,88 @@
+# bench/scenarios.py
+# Mac/client.py의 사용 흐름을 본뜬 시나리오
+# 각 시나리오 함수는 작업 한 번을 수행하고 HTTP 상태 코드를 반환
+
+SCENARIOS = {}
+
+def scenario(name):
+    def register(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+# 워커(스레드)마다 하나씩 갖는 상태
+
+class WorkerContext:
+    def __init__(self, tag, username, password, event_ids, rng):
+        self.tag = tag
+        self.username = username
+        self.password = password
+        self.event_ids = event_ids
+        self.rng = rng
+        self.sequence = 0
+        self.held = []
+        self.reservations_of = None   # 사용자 이름 -> 저장소의 [(reservation_id, event_id), ...]
+        self.mismatches = 0     # 응답이 저장소와 다른 횟수 (결과의 response_mismatches)
+
+    def login(self, client):
+        return client.request('POST', '/login', {'username': self.username, 'password': self.password})[0]
+
+@scenario('register')
+def register(client, ctx):
+    ctx.sequence += 1
+    username = 'bench_%s_%d' % (ctx.tag, ctx.sequence)
+    return client.request('POST', '/register', {'username': username, 'password': ctx.password})[0]
+
+@scenario('login')
+def login(client, ctx):
+    return ctx.login(client)
+
+@scenario('list_events')
+def list_events(client, ctx):
+    return client.request('GET', '/events')[0]
+
+# 모든 워커가 같은 이벤트들에 동시에 예약 요청
+@scenario('reserve_storm')
+def reserve_storm(client, ctx):
+    event_id = ctx.rng.choice(ctx.event_ids)
+    return client.request('POST', '/events/%d/reserve' % event_id)[0]
+
+# 예약과 취소를 번갈아 반복
+@scenario('cancel_churn')
+def cancel_churn(client, ctx):
+    if ctx.held:
+        event_id = ctx.held.pop()
+        return client.request('DELETE', '/events/%d/cancel' % event_id)[0]
+    event_id = ctx.rng.choice(ctx.event_ids)
+    status = client.request('POST', '/events/%d/reserve' % event_id)[0]
+    if status == 200:
+        ctx.held.append(event_id)
+    return status
+
+# 임시 예약 후 확정 (일부는 확정하지 않고 남겨 두어 만료 시 reaper가 해제하게 함)
+@scenario('hold_confirm')
+def hold_confirm(client, ctx):
+    if ctx.held:
+        hold_id = ctx.held.pop()
+        return client.request('POST', '/holds/%d/confirm' % hold_id)[0]
+    event_id = ctx.rng.choice(ctx.event_ids)
+    status, body = client.request('POST', '/events/%d/hold' % event_id)
+    if status == 201 and ctx.rng.random() < 0.8:
+        ctx.held.append(body['hold_id'])
+    return status
+
+# 예약/취소와 내 예약 목록 조회를 섞어서 반복하고, 조회 결과를 저장소와 비교 (사용자별 예약 목록 캐시 정합성 확인)
+# 사용자마다 워커 하나만 요청을 보내므로 응답 직후 저장소를 읽어도 그 사이에 바뀌지 않음
+@scenario('my_reservations')
+def my_reservations(client, ctx):
+    roll = ctx.rng.random()
+    if roll < 0.3:
+        return client.request('POST', '/events/%d/reserve' % ctx.rng.choice(ctx.event_ids))[0]
+    if roll < 0.45:
+        return client.request('DELETE', '/events/%d/cancel' % ctx.rng.choice(ctx.event_ids))[0]
+    status, body = client.request('GET', '/my_reservations')
+    if status == 200:
+        expected = [tuple(row) for row in ctx.reservations_of(ctx.username)]
+        if [(item['reservation_id'], item['event_id']) for item in body['reservations']] != expected:
+            ctx.mismatches += 1
+    return status
@@ -0,0 +1,154 @@
+# bench/seats.py
+# 거의 매진된 대형 공연장에서 연속 좌석 배정 속도/메모리 측정
+# 예) python -m bench.seats --sections 20 --rows 50 --seats 50 --fill 0.97 --output seats.json
+#
+# 1. 메모리 인덱스만: 무작위 크기(1~max-block석)로 채운 뒤 quantity별 배정 시간과 인덱스 메모리 측정
+# 2. SQLite 포함: 같은 배치도를 임시 DB에 만들고 예약 트랜잭션(좌석 저장 + 예약 행)까지 포함한 시간 측정
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench.runner import percentile
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='python -m bench.seats', description='좌석 배정 벤치마크')
+    parser.add_argument('--sections', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=50, help='구역당 열 수')
+    parser.add_argument('--seats', type=int, default=50, help='열당 좌석 수')
+    parser.add_argument('--fill', type=float, default=0.97, help='측정 전에 채울 좌석 비율')
+    parser.add_argument('--max-block', type=int, default=6, help='요청 좌석 수 최대값')
+    parser.add_argument('--samples', type=int, default=2000, help='quantity별 배정 측정 횟수')
+    parser.add_argument('--db-requests', type=int, default=200, help='SQLite 포함 측정 요청 수 (0이면 생략)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='결과 JSON 파일 경로 (없으면 표준 출력)')
+    return parser.parse_args(argv)
+
+def layout(args):
+    return [('S%d' % section, str(row), args.seats) for section in range(args.sections) for row in range(1, args.rows + 1)]
+
+def empty_rows(rows):
+    return [(row_id, section, name, seats, bytes((seats + 7) // 8)) for row_id, (section, name, seats) in enumerate(rows, 1)]
+
+# 무작위 크기/구역 요청으로 목표 비율까지 채움 (관객이 들어찬 것처럼 구역마다 조각난 상태를 만듦)
+
+def fill(index, total, ratio, max_block, rng):
+    sections = sorted(index.sections)
+    taken = 0
+    while taken < total * ratio:
+        quantity = rng.randint(1, max_block)
+        found = index.find(quantity, rng.choice(sections)) or index.find(quantity)
+        if found is None:
+            quantity = 1
+            found = index.find(1)
+            if found is None:
+                break
+        position, start = found
+        index.set_taken(position, index.taken[position] | (((1 << quantity) - 1) << start))
+        taken += quantity
+    return taken
+
+def _us(seconds):
+    return None if seconds is None else round(seconds * 1e6, 2)
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {'p50_us': _us(percentile(timings, 0.50)), 'p99_us': _us(percentile(timings, 0.99)),
+            'max_us': _us(timings[-1] if timings else None)}
+
+# 메모리 인덱스만 측정 (찾기만 하고 상태는 바꾸지 않으므로 모든 표본이 같은 채움 비율에서 측정됨)
+
+def bench_index(args, rows):
+    import seatmaps
+    total = len(rows) * args.seats
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = seatmaps.SeatIndex(0, empty_rows(rows))
+    build_seconds = time.perf_counter() - started
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    rng = random.Random(args.seed)
+    taken = fill(index, total, args.fill, args.max_block, rng)
+    result = {'seats': total, 'rows': len(rows), 'filled': taken, 'fill_ratio': round(taken / total, 4),
+              'index_bytes': memory, 'build_ms': round(build_seconds * 1000, 3), 'allocation': {}}
+    sections = sorted(index.sections)
+    for quantity in range(1, args.max_block + 1):
+        timings = []
+        misses = 0
+        for sample in range(args.samples):
+            section = sections[sample % len(sections)] if sample % 2 else None
+            start = time.perf_counter()
+            found = index.find(quantity, section)
+            timings.append(time.perf_counter() - start)
+            misses += found is None
+        result['allocation'][str(quantity)] = dict(summarize(timings), no_block=misses)
+    return result
+
+# 예약 트랜잭션까지 포함해 측정 (실제로 배정하므로 측정하는 동안 조금씩 더 찹니다)
+
+def bench_database(args, rows):
+    os.environ['DATABASE'] = os.path.join(tempfile.mkdtemp(prefix='bench-seats-'), 'events.db')
+    os.environ.setdefault('HASH_WORKERS', '0')
+    os.environ.setdefault('BCRYPT_ROUNDS', '4')
+    import db
+    import reservations
+    import seatmaps
+    import server
+    server.create_app()
+    server.init_db()
+    conn = db.open_connection(server.app.config)
+    conn.execute("INSERT INTO users (username, password) VALUES ('bench_seats', '')")
+    conn.execute("INSERT INTO events (name, tickets_left) VALUES ('bench venue', 0)")
+    conn.commit()
+    with db.immediate_transaction(conn):
+        seatmaps.replace_seat_map(conn, 1, rows)
+
+    # 채우기는 메모리에서 한 뒤 한 번에 저장 (예약 행은 만들지 않음)
+    with db.immediate_transaction(conn):
+        index = seatmaps._current_index(conn, 1)
+        taken = fill(index, len(rows) * args.seats, args.fill, args.max_block, random.Random(args.seed))
+        seatmaps._save_rows(conn, 1, index, range(len(index.row_ids)), -taken)
+
+    rng = random.Random(args.seed + 1)
+    timings = []
+    misses = 0
+    for _ in range(args.db_requests):
+        start = time.perf_counter()
+        seats = reservations.reserve_seats(conn, 1, 1, rng.randint(1, args.max_block))
+        timings.append(time.perf_counter() - start)
+        misses += seats is None
+    loads_started = time.perf_counter()
+    seatmaps._indexes.clear()
+    with db.immediate_transaction(conn):
+        seatmaps._current_index(conn, 1)
+    reload_seconds = time.perf_counter() - loads_started
+
+    tickets_left = conn.execute('SELECT tickets_left FROM events WHERE id = 1').fetchone()[0]
+    free = sum(row['seats'] - int.from_bytes(row['taken'], 'little').bit_count()
+               for row in conn.execute('SELECT seats, taken FROM seat_rows WHERE event_id = 1'))
+    conn.close()
+    server.close_app()
+    return dict(summarize(timings), requests=len(timings), no_block=misses,
+                reload_ms=round(reload_seconds * 1000, 3), tickets_left=tickets_left, consistent=tickets_left == free)
+
+def main(argv=None):
+    args = parse_args(argv)
+    rows = layout(args)
+    result = {'index': bench_index(args, rows)}
+    if args.db_requests:
+        result['database'] = bench_database(args, rows)
+    result['timestamp'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+    return 0 if result.get('database', {}).get('consistent', True) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,331 @@
+# bulk_import.py
+# 이벤트/사용자 일괄 가져오기 (CSV 또는 NDJSON)
+# - 입력을 레코드 하나씩 읽어 검증하고, 올바른 행만 IMPORT_CHUNK_SIZE개씩 모아 한 트랜잭션으로 추가
+#   (파일이 아무리 커도 메모리에는 한 묶음만 올라감)
+# - 잘못된 행은 건너뛰고 행 번호와 이유를 기록 (결과에는 앞의 IMPORT_MAX_ERRORS개만 담음)
+# - 사용자 비밀번호는 password(평문, 해시 프로세스들이 나눠 해시) 또는 password_hash(bcrypt 해시 그대로) 중 하나
+#
+# 서버: POST /events/import, POST /users/import (관리자 전용, 요청 본문이 파일 내용)
+# 명령행: python bulk_import.py events|users 파일 [--format csv|ndjson] [--database 경로]
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+
+import metrics
+from hashing import hash_cost
+
+FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+# 종류별 (허용 항목, 반드시 있어야 하는 항목 묶음 - 묶음마다 하나 이상)
+KINDS = {
+    'events': ({'name', 'tickets_left', 'hold_ttl'}, [('name',), ('tickets_left',)]),
+    'users': ({'username', 'password', 'password_hash', 'is_admin'}, [('username',), ('password', 'password_hash')]),
+}
+
+FLAGS = {'': 0, '0': 0, '1': 1, 'false': 0, 'true': 1}
+
+import_rows = metrics.registry.counter(
+    'import_rows_total', '일괄 가져오기로 처리한 행 수 (result: imported=추가, failed=건너뜀)', ('kind', 'result'))
+
+# 머리글이 잘못되었거나 UTF-8이 아닌 내용처럼 더 읽을 수 없는 입력
+
+class ImportFormatError(Exception):
+    pass
+
+# 가져오기 결과 (오류는 max_errors개까지만 보관)
+
+class ImportResult:
+    def __init__(self, kind, max_errors):
+        self.kind = kind
+        self.max_errors = max_errors
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.error = None   # 중간에 멈춘 이유 (그 전 묶음까지는 이미 추가됨)
+
+    def added(self, count):
+        self.imported += count
+        import_rows.inc((self.kind, 'imported'), count)
+
+    def fail(self, line, message):
+        self.failed += 1
+        import_rows.inc((self.kind, 'failed'))
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'message': message})
+
+    def to_dict(self):
+        return {'imported': self.imported, 'failed': self.failed, 'errors': self.errors,
+                'errors_truncated': self.failed > len(self.errors)}
+
+# ?format= 값이 있으면 그대로, 없으면 Content-Type으로 판단 (모르면 None)
+
+def detect_format(name, content_type):
+    if name:
+        return name if name in FORMATS else None
+    return CONTENT_TYPES.get(content_type)
+
+def format_from_path(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    return None
+
+# 바이트 스트림에서 (행 번호, 레코드 dict 또는 None, 오류 메시지 또는 None)를 차례로 읽음
+
+def read_records(stream, fmt, kind, max_line):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            yield from _read_csv(text, kind)
+        else:
+            yield from _read_ndjson(text, max_line)
+    except UnicodeDecodeError:
+        raise ImportFormatError('UTF-8이 아닌 내용이 있어 가져오기를 멈췄습니다.')
+
+def _read_csv(text, kind):
+    reader = csv.reader(text)
+    try:
+        header = [name.strip() for name in next(reader)]
+    except StopIteration:
+        return
+    except csv.Error as e:
+        raise ImportFormatError('CSV 머리글을 읽을 수 없습니다: %s' % e)
+    allowed, required = KINDS[kind]
+    unknown = [name for name in header if name not in allowed]
+    if unknown:
+        raise ImportFormatError('알 수 없는 열: %s' % ', '.join(unknown))
+    missing = [' 또는 '.join(names) for names in required if not any(name in header for name in names)]
+    if missing:
+        raise ImportFormatError('필요한 열이 없습니다: %s' % ', '.join(missing))
+
+    while True:
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield reader.line_num, None, 'CSV 형식 오류: %s' % e
+            continue
+        if not values:
+            continue
+        if len(values) != len(header):
+            yield reader.line_num, None, '열 개수(%d)가 머리글(%d)과 다릅니다.' % (len(values), len(header))
+            continue
+        yield reader.line_num, dict(zip(header, values)), None
+
+# max_line자보다 긴 행은 끝까지 버리고 오류로 기록 (한 행 때문에 메모리가 커지지 않도록)
+
+def _read_ndjson(text, max_line):
+    line_no = 0
+    while True:
+        line = text.readline(max_line + 1)
+        if not line:
+            return
+        line_no += 1
+        if len(line) > max_line and not line.endswith(('\n', '\r')):
+            while line and not line.endswith(('\n', '\r')):
+                line = text.readline(max_line)
+            yield line_no, None, '행이 너무 깁니다 (최대 %d자).' % max_line
+            continue
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, 'JSON 형식 오류: %s' % e
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, 'JSON 객체가 아닙니다.'
+            continue
+        yield line_no, record, None
+
+# CSV 값은 모두 문자열이므로 정수 모양이면 변환 (아니면 None)
+
+def _int(value):
+    if type(value) is int:
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return None
+    return None
+
+def validate_event(record, max_hold_ttl):
+    name = record.get('name')
+    if not isinstance(name, str) or not name.strip():
+        return None, '이벤트 이름이 필요합니다.'
+    tickets_left = _int(record.get('tickets_left'))
+    if tickets_left is None or tickets_left < 0:
+        return None, '티켓 수량(tickets_left)은 0 이상의 정수여야 합니다.'
+    hold_ttl = record.get('hold_ttl')
+    if hold_ttl in (None, ''):
+        hold_ttl = None
+    else:
+        hold_ttl = _int(hold_ttl)
+        if hold_ttl is None or not 0 < hold_ttl <= max_hold_ttl:
+            return None, '임시 예약 유지 시간(hold_ttl)이 올바르지 않습니다.'
+    return {'name': name, 'tickets_left': tickets_left, 'hold_ttl': hold_ttl}, None
+
+def validate_user(record):
+    username = record.get('username')
+    if not isinstance(username, str) or not username:
+        return None, '사용자 이름이 필요합니다.'
+    password = record.get('password') or None
+    password_hash = record.get('password_hash') or None
+    if (password is None) == (password_hash is None):
+        return None, '비밀번호(password)와 비밀번호 해시(password_hash) 중 하나만 있어야 합니다.'
+    if password is not None and not isinstance(password, str):
+        return None, '비밀번호는 문자열이어야 합니다.'
+    if password_hash is not None and (not isinstance(password_hash, str) or not password_hash.startswith('$2')
+                                      or hash_cost(password_hash) is None):
+        return None, '비밀번호 해시(password_hash)는 bcrypt 형식이어야 합니다.'
+    is_admin = record.get('is_admin', 0)
+    is_admin = FLAGS.get(is_admin.strip().lower()) if isinstance(is_admin, str) else is_admin
+    if is_admin not in (0, 1):
+        return None, '관리자 여부(is_admin)는 0 또는 1이어야 합니다.'
+    return {'username': username, 'password': password, 'password_hash': password_hash, 'is_admin': int(is_admin)}, None
+
+# 올바른 행을 size개씩 [(행 번호, 행), ...] 묶음으로 (잘못된 행은 result에 기록하고 건너뜀)
+# 입력이 중간에 깨지면 그때까지 모은 묶음을 먼저 내보낸 뒤 ImportFormatError를 다시 올림
+
+def _valid_chunks(records, kind, validate, size, result):
+    allowed = KINDS[kind][0]
+    chunk = []
+    try:
+        for line, record, error in records:
+            row = None
+            if error is None:
+                unknown = sorted(set(record) - allowed)
+                if unknown:
+                    error = '알 수 없는 항목: %s' % ', '.join(unknown)
+                else:
+                    row, error = validate(record)
+            if error is not None:
+                result.fail(line, error)
+                continue
+            chunk.append((line, row))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    except ImportFormatError:
+        if chunk:
+            yield chunk
+        raise
+    if chunk:
+        yield chunk
+
+def _import_events(storage, records, config, result, on_chunk):
+    validate = lambda record: validate_event(record, config['HOLD_MAX_TTL'])
+    for chunk in _valid_chunks(records, 'events', validate, config['IMPORT_CHUNK_SIZE'], result):
+        storage.import_events([row for _, row in chunk])
+        result.added(len(chunk))
+        if on_chunk:
+            on_chunk(result)
+
+# 이미 있는 이름은 해시하기 전에 걸러냄 (같은 파일을 다시 가져와도 bcrypt를 다시 돌리지 않도록)
+
+def _import_users(storage, hasher, records, config, result, on_chunk):
+    for chunk in _valid_chunks(records, 'users', validate_user, config['IMPORT_CHUNK_SIZE'], result):
+        existing = storage.existing_usernames({row['username'] for _, row in chunk})
+        pending = []
+        for line, row in chunk:
+            if row['username'] in existing:
+                result.fail(line, '이미 등록된 사용자입니다.')
+                continue
+            existing.add(row['username'])
+            pending.append((line, row))
+
+        hashed = iter(hasher.hash_many([row['password'] for _, row in pending if row['password'] is not None]))
+        rows = [{'username': row['username'], 'is_admin': row['is_admin'],
+                 'password': row['password_hash'] if row['password'] is None else next(hashed)}
+                for _, row in pending]
+        skipped = storage.import_users(rows)
+        for index in skipped:
+            result.fail(pending[index][0], '이미 등록된 사용자입니다.')
+        result.added(len(rows) - len(skipped))
+        if on_chunk:
+            on_chunk(result)
+
+# stream(바이트)을 읽어 kind('events' 또는 'users')를 가져옴
+# on_chunk(result): 묶음 하나를 커밋할 때마다 호출 / hasher: 사용자 가져오기에만 필요
+
+def run_import(kind, storage, hasher, stream, fmt, config, on_chunk=None):
+    result = ImportResult(kind, config['IMPORT_MAX_ERRORS'])
+    records = read_records(stream, fmt, kind, config['IMPORT_MAX_LINE_LENGTH'])
+    try:
+        if kind == 'events':
+            _import_events(storage, records, config, result, on_chunk)
+        else:
+            _import_users(storage, hasher, records, config, result, on_chunk)
+    except ImportFormatError as e:
+        result.error = str(e)
+    return result
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='이벤트/사용자 일괄 가져오기 (CSV 또는 NDJSON)')
+    parser.add_argument('kind', choices=sorted(KINDS))
+    parser.add_argument('path', help="가져올 파일 경로 ('-'이면 표준 입력)")
+    parser.add_argument('--format', choices=FORMATS, help='기본값: 파일 확장자로 판단')
+    parser.add_argument('--config', help='JSON 설정 파일 경로 (SERVER_CONFIG_FILE과 같음)')
+    parser.add_argument('--database')
+    parser.add_argument('--hash-workers', type=int, default=os.cpu_count() or 1, help='비밀번호 해시 프로세스 수')
+    return parser.parse_args(argv)
+
+# 서버를 거치지 않고 DB 파일에 바로 가져옴 (실행 중인 서버의 목록 캐시에는 CATALOG_CACHE_TTL 안에 반영)
+
+def main(argv=None):
+    from config import read_config
+    from db import configure_database, open_connection
+    from hashing import PasswordHasher
+    from migrations import migrate
+    from sqlite_storage import SqliteStorage
+
+    args = parse_args(argv)
+    options = {'SERVER_CONFIG_FILE': args.config, 'DATABASE': args.database}
+    config = read_config({key: value for key, value in options.items() if value is not None})
+    fmt = args.format or format_from_path(args.path)
+    if fmt is None:
+        print('형식을 알 수 없습니다. --format csv 또는 --format ndjson을 지정해 주세요.', file=sys.stderr)
+        return 2
+
+    conn = open_connection(config)
+    configure_database(conn)
+    migrate(conn)
+    hasher = None
+    if args.kind == 'users':
+        hasher = PasswordHasher(args.hash_workers, 1, config['BCRYPT_ROUNDS'], config['BCRYPT_TARGET_MS'])
+    stream = sys.stdin.buffer if args.path == '-' else open(args.path, 'rb')
+
+    def progress(result):
+        print('\r추가 %d행, 건너뜀 %d행' % (result.imported, result.failed), end='', file=sys.stderr, flush=True)
+
+    try:
+        result = run_import(args.kind, SqliteStorage(lambda: conn), hasher, stream, fmt, config, progress)
+    finally:
+        print(file=sys.stderr)
+        stream.close()
+        if hasher:
+            hasher.shutdown()
+        conn.close()
+    output = result.to_dict()
+    if result.error:
+        output['message'] = result.error
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+    return 1 if result.error or result.failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
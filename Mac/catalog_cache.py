@@ -0,0 +1,100 @@
+# catalog_cache.py
+import hashlib
+import threading
+import time
+
+import compression
+
+# GET /events 응답 본문을 미리 인코딩해 두는 스냅샷
+
+class CatalogSnapshot:
+    def __init__(self, body, loaded_at):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()[:20]  # 내용 기반이므로 워커가 달라도 같은 값
+        self.loaded_at = loaded_at   # 읽기 시작한 시각 (이 시각 전의 변경은 모두 반영됨)
+        self._encoded = {}
+
+    # 압축한 본문 (인코딩별로 처음 요청될 때 한 번 압축, 동시에 처음 요청되면 두 번 압축할 수 있지만 결과는 같음)
+    def encoded(self, encoding, level):
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = compression.compress(self.body, encoding, level)
+        return body
+
+# 이벤트 목록 캐시
+# - invalidate(): 이벤트 생성/수정/삭제처럼 목록 구성이 바뀌면 즉시 폐기
+# - mark_dirty(): 예약/취소처럼 남은 티켓 수만 바뀌면 stale_ms 동안은 기존 스냅샷을 계속 사용
+#   (스냅샷을 버리지 않으므로 예약이 계속 들어와도 stale_ms마다 한 번만 다시 읽음)
+# - ttl: 다른 워커 프로세스의 변경을 놓치더라도 이 시간이 지나면 다시 읽음
+
+class CatalogCache:
+    def __init__(self, ttl, stale_ms):
+        self.ttl = ttl
+        self.stale = stale_ms / 1000
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._generation = 0       # invalidate()마다 증가 (읽는 도중 목록 구성이 바뀌면 결과를 버리기 위해)
+        self._dirty_since = None   # 현재 스냅샷이 처음 낡은 시각
+        self._last_dirty = None    # 마지막 mark_dirty() 시각
+        self._loading = False      # 다른 스레드가 다시 읽는 중인지
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+            self._dirty_since = None
+
+    def mark_dirty(self):
+        now = time.monotonic()
+        with self._lock:
+            self._last_dirty = now
+            if self._dirty_since is None:
+                self._dirty_since = now
+
+    def _is_fresh(self, snapshot, now):
+        if snapshot is None or now - snapshot.loaded_at >= self.ttl:
+            return False
+        dirty_since = self._dirty_since
+        return dirty_since is None or now - dirty_since < self.stale
+
+    # 신선한 스냅샷이 있으면 그대로, 없으면 loader()로 본문을 만들어 새 스냅샷 반환
+    def get(self, loader):
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot, time.monotonic()):
+            self.hits += 1
+            return snapshot
+
+        # 남은 티켓 수만 낡은 스냅샷은 다른 스레드가 다시 읽는 동안 그대로 씀 (동시에 여러 번 읽지 않도록)
+        with self._lock:
+            if self._loading and snapshot is not None and snapshot is self._snapshot:
+                self.hits += 1
+                return snapshot
+            self._loading = True
+        self.misses += 1
+        generation = self._generation
+        started = time.monotonic()
+        try:
+            snapshot = CatalogSnapshot(loader(), started)
+        finally:
+            self._loading = False
+        with self._lock:
+            # 읽는 도중 목록 구성이 바뀌었거나 더 나중에 읽기 시작한 스냅샷이 이미 있으면 저장하지 않음
+            current = self._snapshot
+            if generation == self._generation and (current is None or current.loaded_at <= snapshot.loaded_at):
+                self._snapshot = snapshot
+                # 읽는 도중 예약/취소가 있었으면 읽기 시작한 시각부터 낡은 것으로 봄
+                self._dirty_since = snapshot.loaded_at if self._last_dirty is not None and self._last_dirty >= snapshot.loaded_at else None
+        return snapshot
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'cached': snapshot is not None,
+            'etag': snapshot.etag if snapshot else None,
+        }
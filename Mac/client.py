@@ -2,23 +2,78 @@
 import requests
 import json
 import logging
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 BASE_URL = "http://127.0.0.1:5000"
+POOL_SIZE = 32
+REQUEST_TIMEOUT = 10    # 쓰기 요청 응답을 기다리는 시간 (초), 넘으면 같은 Idempotency-Key로 다시 보냄
+RETRIES = 3             # 쓰기 요청 재시도 횟수
+RETRY_BASE_DELAY = 0.2  # 재시도 간격 기본값 (초, 시도마다 두 배 + 무작위 지연)
+RETRY_MAX_DELAY = 5.0
+EVENT_CACHE_FILE = "events_cache.json"  # 이벤트 목록 캐시 (실행 사이에도 유지, 다시 조회할 때는 바뀐 이벤트만 받음)
+
+# Keep-Alive 연결을 재사용하는 세션 (로그인 쿠키도 세션이 자동으로 보관)
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE))
 
 # 로그인 상태 유지
 token = None
 is_admin = False
+event_cache = None   # {"url", "catalog_id", "version", "events": {ID: 이벤트}}, 처음 조회할 때 파일에서 읽음
 
 # 로그 설정
 logging.basicConfig(filename='client_activity.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# 재시도할 응답: 게이트웨이 오류, 또는 서버가 Retry-After로 다시 시도하라고 한 경우
+# (409는 같은 키의 처음 요청이 아직 처리 중일 때만 Retry-After가 붙음)
+def is_retryable(response):
+    if response.status_code in (502, 504):
+        return True
+    return response.status_code in (409, 429, 503) and "Retry-After" in response.headers
+
+def retry_delay(attempt, response=None):
+    if response is not None:
+        try:
+            return min(RETRY_MAX_DELAY, float(response.headers["Retry-After"]))
+        except (KeyError, ValueError):
+            pass
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+# 쓰기 요청: Idempotency-Key를 붙여 보내고, 타임아웃/연결 오류/일시적인 오류면 같은 키로 다시 보냄
+# (서버가 같은 키에는 처음 응답을 그대로 돌려주므로 재시도해도 예약이 두 번 되지 않음)
+def send_write(method, path, json=None):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    for attempt in range(RETRIES + 1):
+        try:
+            response = session.request(method, BASE_URL + path, json=json, headers=headers, timeout=REQUEST_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == RETRIES:
+                raise
+            reason, delay = e, retry_delay(attempt)
+        else:
+            if attempt == RETRIES or not is_retryable(response):
+                return response
+            reason, delay = response.status_code, retry_delay(attempt, response)
+        logging.warning(f"{method} {path} 재시도 ({attempt + 1}/{RETRIES}, {delay:.2f}초 후): {reason}")
+        time.sleep(delay)
+
 # CLI 메뉴 함수
 def main_menu():
     while True:
         print("\n1. 사용자 등록\n2. 로그인\n3. 로그아웃\n4. 이벤트 조회")
         if is_admin:
             print("5. 이벤트 생성 (관리자)\n6. 사용자 정보 삭제 (관리자)\n7. 이벤트 삭제 (관리자)\n8. 사용자 목록 조회 (관리자)")
-        print("9. 티켓 예약\n10. 티켓 예약 취소\n11. 예약 현황 조회\n12. 종료")
+        print("9. 티켓 예약\n10. 티켓 예약 취소\n11. 예약 현황 조회\n12. 종료\n13. 이벤트 실시간 조회")
         choice = input("원하는 기능의 번호를 입력하세요: ")
 
         if choice == '1':
@@ -45,6 +100,8 @@ def main_menu():
             get_my_reservations()
         elif choice == '12':
             break
+        elif choice == '13':
+            get_events(watch=True)
         else:
             print("잘못된 입력입니다. 다시 시도하세요.")
 
@@ -61,7 +118,7 @@ def register_user():
         "is_admin": is_admin
     }
     try:
-        response = requests.post(f"{BASE_URL}/register", json=data)
+        response = session.post(f"{BASE_URL}/register", json=data)
         message = response.json().get("message", "등록에 성공했습니다.")
         print(message)
         logging.info(f"사용자 등록: {username} - {message}")
@@ -80,7 +137,7 @@ def login_user():
         "password": password
     }
     try:
-        response = requests.post(f"{BASE_URL}/login", json=data)
+        response = session.post(f"{BASE_URL}/login", json=data)
         if response.status_code == 200:
             print(response.json().get("message", "로그인에 성공했습니다."))
             token = response.cookies.get('session')  # 세션 토큰 저장
@@ -98,31 +155,135 @@ def login_user():
 def logout_user():
     global token, is_admin
     try:
-        response = requests.post(f"{BASE_URL}/logout", cookies={"session": token})
+        response = session.post(f"{BASE_URL}/logout")
         message = response.json().get("message", "로그아웃되었습니다.")
         print(message)
         logging.info("사용자 로그아웃 - 성공")
         token = None
         is_admin = False
+        session.cookies.clear()
     except requests.RequestException as e:
         print("로그아웃 실패:", e)
         logging.error(f"로그아웃 실패: {e}")
 
-# 이벤트 조회
-def get_events():
+# 캐시 파일 읽기 (없거나, 깨졌거나, 다른 서버의 캐시면 빈 캐시)
+def load_event_cache():
+    try:
+        with open(EVENT_CACHE_FILE, encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache["url"] == BASE_URL:
+            cache["events"] = {int(event_id): event for event_id, event in cache["events"].items()}
+            return cache
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    return {"url": BASE_URL, "catalog_id": None, "version": 0, "events": {}}
+
+# 임시 파일에 쓰고 바꿔 치움 (쓰다가 끊겨도 이전 캐시는 남음)
+def save_event_cache(cache):
+    temp_file = EVENT_CACHE_FILE + ".tmp"
+    try:
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(temp_file, EVENT_CACHE_FILE)
+    except OSError as e:
+        logging.warning(f"이벤트 캐시 저장 실패: {e}")
+
+# 캐시의 목록 버전 이후 바뀐 이벤트만 받아 캐시에 반영 -> (전체 목록 여부, 바뀐 이벤트 목록, 삭제된 이벤트 ID 목록)
+# 서버가 전체 목록을 보내면(처음, 서버 DB가 바뀜, 목록 버전을 모르는 서버) 캐시를 통째로 바꿈
+def sync_events():
+    global event_cache
+    if event_cache is None:
+        event_cache = load_event_cache()
+    params = {"changed_since": event_cache["version"]}
+    if event_cache["catalog_id"]:
+        params["catalog_id"] = event_cache["catalog_id"]
+    response = session.get(f"{BASE_URL}/events", params=params)
+    response.raise_for_status()
+    data = response.json()
+    full = data.get("full", True)
+    changed = data.get("events", [])
+    cached = event_cache["events"]
+    if full:
+        cached.clear()
+    for event in changed:
+        cached[event["id"]] = event
+    deleted = [event_id for event_id in data.get("deleted", []) if cached.pop(event_id, None) is not None]
+    if full or changed or deleted or data.get("version", 0) != event_cache["version"]:
+        event_cache["catalog_id"] = data.get("catalog_id")
+        event_cache["version"] = data.get("version", 0)
+        save_event_cache(event_cache)
+    return full, changed, deleted
+
+def print_event(event):
+    print(f"ID: {event['id']}, 이름: {event['name']}, 남은 티켓: {event['tickets_left']}")
+
+# 이벤트 조회: 처음에는 전체 목록, 그 뒤로는 지난 조회 이후 바뀐 이벤트만 출력
+# (watch=True면 목록을 보여준 뒤 남은 티켓 변경을 실시간으로 표시)
+def get_events(watch=False):
     try:
-        response = requests.get(f"{BASE_URL}/events")
-        events = response.json().get("events", [])
+        full, changed, deleted = sync_events()
+        logging.info(f"이벤트 조회 - 성공 ({'전체' if full else '변경분'} {len(changed)}개, 삭제 {len(deleted)}개)")
+    except (requests.RequestException, ValueError) as e:
+        print("이벤트 조회 실패:", e)
+        logging.error(f"이벤트 조회 실패: {e}")
+        return
+
+    events = event_cache["events"]
+    if full:
         if events:
             print("\n이벤트 목록:")
-            for event in events:
-                print(f"ID: {event['id']}, 이름: {event['name']}, 남은 티켓: {event['tickets_left']}")
+            for event_id in sorted(events):
+                print_event(events[event_id])
         else:
             print("등록된 이벤트가 없습니다.")
-        logging.info("이벤트 조회 - 성공")
+    elif changed or deleted:
+        print("\n지난 조회 이후 바뀐 이벤트:")
+        for event in changed:
+            print_event(event)
+        for event_id in deleted:
+            print(f"ID: {event_id} - 삭제된 이벤트입니다.")
+        print(f"전체 이벤트 {len(events)}개")
+    else:
+        print(f"지난 조회 이후 바뀐 이벤트가 없습니다. (전체 이벤트 {len(events)}개)")
+
+    if watch:
+        watch_events({event_id: event['name'] for event_id, event in events.items()})
+
+# 서버의 /events/stream(Server-Sent Events)을 구독하며 변경된 남은 티켓 수 출력 (Ctrl+C로 종료)
+def watch_events(names):
+    print("\n실시간 조회 중입니다. 종료하려면 Ctrl+C를 누르세요.")
+    try:
+        with session.get(f"{BASE_URL}/events/stream", stream=True, timeout=(5, 60)) as response:
+            event_type, data = None, []
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith('event:'):
+                    event_type = line[6:].strip()
+                elif line.startswith('data:'):
+                    data.append(line[5:].strip())
+                elif not line and data:
+                    handle_stream_message(event_type, '\n'.join(data), names)
+                    event_type, data = None, []
+    except KeyboardInterrupt:
+        print("\n실시간 조회를 종료합니다.")
     except requests.RequestException as e:
-        print("이벤트 조회 실패:", e)
-        logging.error(f"이벤트 조회 실패: {e}")
+        print("실시간 조회 실패:", e)
+        logging.error(f"실시간 조회 실패: {e}")
+
+def handle_stream_message(event_type, data, names):
+    if event_type == 'resync':
+        print("변경 사항이 많아 목록을 다시 불러옵니다.")
+        get_events()
+        return
+    if event_type != 'inventory':
+        return
+    for delta in json.loads(data):
+        name = names.get(delta['event_id'], '')
+        if delta['deleted']:
+            print(f"ID: {delta['event_id']}, 이름: {name} - 삭제된 이벤트입니다.")
+        elif delta['sold_out']:
+            print(f"ID: {delta['event_id']}, 이름: {name}, 남은 티켓: 0 (매진)")
+        else:
+            print(f"ID: {delta['event_id']}, 이름: {name}, 남은 티켓: {delta['tickets_left']}")
 
 # 이벤트 생성 (관리자)
 def create_event():
@@ -141,7 +302,7 @@ def create_event():
         "tickets_left": tickets_left
     }
     try:
-        response = requests.post(f"{BASE_URL}/events", json=data, cookies={"session": token})
+        response = send_write("POST", "/events", json=data)
         message = response.json().get("message", "이벤트 생성에 성공했습니다.")
         print(message)
         logging.info(f"이벤트 생성: {name} - {message}")
@@ -159,7 +320,7 @@ def get_users():
         return
     
     try:
-        response = requests.get(f"{BASE_URL}/users", cookies={"session": token})
+        response = session.get(f"{BASE_URL}/users")
         users = response.json().get("users", [])
         if users:
             print("\n사용자 목록:")
@@ -186,7 +347,7 @@ def delete_user():
 
     user_id = input("삭제할 사용자 ID를 입력하세요: ")
     try:
-        response = requests.delete(f"{BASE_URL}/users/{user_id}", cookies={"session": token})
+        response = send_write("DELETE", f"/users/{user_id}")
         if response.status_code == 200:
             message = response.json().get("message", "사용자 정보 삭제에 성공했습니다.")
             print(message)
@@ -212,7 +373,7 @@ def delete_event():
     
     event_id = input("삭제할 이벤트 ID를 입력하세요: ")
     try:
-        response = requests.delete(f"{BASE_URL}/events/{event_id}", cookies={"session": token})
+        response = send_write("DELETE", f"/events/{event_id}")
         message = response.json().get("message", "이벤트 삭제에 성공했습니다.")
         print(message)
         logging.info(f"이벤트 삭제: ID {event_id} - {message}")
@@ -228,7 +389,7 @@ def reserve_ticket():
     
     event_id = int(input("예약할 이벤트 ID를 입력하세요: "))
     try:
-        response = requests.post(f"{BASE_URL}/events/{event_id}/reserve", cookies={"session": token})
+        response = send_write("POST", f"/events/{event_id}/reserve")
         message = response.json().get("message", "티켓 예약에 성공했습니다.")
         print(message)
         logging.info(f"티켓 예약: 이벤트 ID {event_id} - {message}")
@@ -244,7 +405,7 @@ def cancel_reservation():
     
     event_id = int(input("취소할 이벤트 ID를 입력하세요: "))
     try:
-        response = requests.delete(f"{BASE_URL}/events/{event_id}/cancel", cookies={"session": token})
+        response = send_write("DELETE", f"/events/{event_id}/cancel")
         message = response.json().get("message", "티켓 예약 취소에 성공했습니다.")
         print(message)
         logging.info(f"티켓 예약 취소: 이벤트 ID {event_id} - {message}")
@@ -259,7 +420,7 @@ def get_my_reservations():
         return
     
     try:
-        response = requests.get(f"{BASE_URL}/my_reservations", cookies={"session": token})
+        response = session.get(f"{BASE_URL}/my_reservations")
         reservations = response.json().get("reservations", [])
         if reservations:
             print("\n나의 예약 목록:")
@@ -272,5 +433,103 @@ def get_my_reservations():
         print("예약 현황 조회 실패:", e)
         logging.error(f"예약 현황 조회 실패: {e}")
 
+# 스크립트 모드에서 사용할 수 있는 작업: op 이름 -> (HTTP 메서드, 경로, 본문에 넣을 필드)
+# GET과 register를 뺀 작업은 send_write로 보냄 (Idempotency-Key + 재시도)
+SCRIPT_OPERATIONS = {
+    "register": ("POST", "/register", ("username", "password", "is_admin")),
+    "get_events": ("GET", "/events", ()),
+    "create_event": ("POST", "/events", ("name", "tickets_left")),
+    "update_event": ("PUT", "/events/{event_id}", ("name", "tickets_left")),
+    "delete_event": ("DELETE", "/events/{event_id}", ()),
+    "get_users": ("GET", "/users", ()),
+    "delete_user": ("DELETE", "/users/{user_id}", ()),
+    "reserve": ("POST", "/events/{event_id}/reserve", ()),
+    "cancel": ("DELETE", "/events/{event_id}/cancel", ()),
+    "my_reservations": ("GET", "/my_reservations", ()),
+}
+
+# JSONL 한 줄({"op": ..., 필드...})을 실행하고 (op, 성공 여부, 소요 시간) 반환
+def run_operation(line_no, operation):
+    op = operation.get("op")
+    method, path, fields = SCRIPT_OPERATIONS[op]
+    body = {field: operation[field] for field in fields if field in operation}
+    start = time.perf_counter()
+    try:
+        if method == "GET" or op == "register":
+            response = session.request(method, BASE_URL + path.format(**operation), json=body if body else None, timeout=30)
+        else:
+            response = send_write(method, path.format(**operation), json=body if body else None)
+        ok = response.ok
+        if not ok:
+            logging.warning(f"스크립트 {line_no}행 {op} 실패: {response.status_code} {response.text.strip()}")
+    except (requests.RequestException, KeyError) as e:
+        ok = False
+        logging.error(f"스크립트 {line_no}행 {op} 실패: {e}")
+    return op, ok, time.perf_counter() - start
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+# 작업 종류별 지연 시간 요약 출력
+def print_summary(results, elapsed):
+    by_op = defaultdict(list)
+    failures = defaultdict(int)
+    for op, ok, latency in results:
+        by_op[op].append(latency)
+        if not ok:
+            failures[op] += 1
+    print(f"\n{'작업':<16}{'건수':>8}{'실패':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'최대(ms)':>10}")
+    for op in sorted(by_op):
+        latencies = sorted(by_op[op])
+        print(f"{op:<16}{len(latencies):>8}{failures[op]:>8}"
+              f"{percentile(latencies, 0.5) * 1000:>10.1f}{percentile(latencies, 0.95) * 1000:>10.1f}{latencies[-1] * 1000:>10.1f}")
+    print(f"\n총 {len(results)}건, {elapsed:.2f}초, 초당 {len(results) / elapsed if elapsed else 0:.1f}건")
+
+# 비대화형 모드: JSONL 파일의 작업을 스레드 풀로 동시에 실행
+def run_script(path, concurrency, username=None, password=None):
+    global token, is_admin
+    with open(path, encoding="utf-8") as f:
+        operations = [(line_no, json.loads(line)) for line_no, line in enumerate(f, 1) if line.strip()]
+    unknown = sorted({operation.get("op") for _, operation in operations} - SCRIPT_OPERATIONS.keys(), key=str)
+    if unknown:
+        print("알 수 없는 작업이 있습니다:", ", ".join(map(str, unknown)))
+        return 1
+
+    if username:
+        response = session.post(f"{BASE_URL}/login", json={"username": username, "password": password})
+        if response.status_code != 200:
+            print("로그인 실패:", response.json().get("message"))
+            return 1
+        token = response.cookies.get('session')
+        is_admin = response.json().get('is_admin', 0) == 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda item: run_operation(*item), operations))
+    elapsed = time.perf_counter() - start
+
+    print_summary(results, elapsed)
+    logging.info(f"스크립트 실행: {path} - {len(results)}건, {elapsed:.2f}초")
+    return 0 if all(ok for _, ok, _ in results) else 1
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="티켓 예약 클라이언트 (인자 없이 실행하면 메뉴 모드)")
+    parser.add_argument("--script", help="작업 목록 JSONL 파일 (한 줄에 {\"op\": ..., ...})")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시에 실행할 작업 수")
+    parser.add_argument("--username", help="스크립트 실행 전에 로그인할 사용자")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--url", default=BASE_URL, help="서버 주소")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="쓰기 요청 재시도 횟수 (같은 Idempotency-Key로 다시 보냄)")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="쓰기 요청 응답 대기 시간 (초)")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    BASE_URL = args.url
+    RETRIES = max(0, args.retries)
+    REQUEST_TIMEOUT = args.timeout
+    if args.script:
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max(POOL_SIZE, args.concurrency)))
+        sys.exit(run_script(args.script, args.concurrency, args.username, args.password))
     main_menu()
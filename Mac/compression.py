@@ -0,0 +1,75 @@
+# compression.py
+# 응답 본문 압축 (Accept-Encoding으로 gzip 또는 deflate 협상)
+# - COMPRESS_MIN_SIZE 바이트 이상인 JSON/텍스트 응답만 압축 (작은 응답은 압축해도 줄지 않고 CPU만 씀)
+# - 스트리밍 응답과 이미 Content-Encoding이 붙은 응답(내보내기의 gzip 등)은 그대로 둠
+#   (목록 전체 스트리밍은 pagination.stream_response가 compress_chunks로 직접 압축)
+# - 압축했을 때 ETag가 있으면 인코딩 이름을 붙임 (압축 전과 후는 다른 표현이므로 같은 강한 ETag를 쓰면 안 됨)
+import zlib
+
+from flask import current_app, request
+
+import metrics
+
+ENCODINGS = ('gzip', 'deflate')   # 클라이언트가 같은 q로 둘 다 받으면 앞쪽 사용
+WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+COMPRESSIBLE_TYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'}
+
+compressed_responses = metrics.registry.counter('http_compressed_responses_total', '압축해서 보낸 응답 수', ('encoding',))
+compression_bytes = metrics.registry.counter('http_compression_bytes_total', '압축한 응답의 압축 전(in)/후(out) 바이트 수', ('stage',))
+
+# 이 요청에 쓸 인코딩 (압축하지 않으면 None), size가 None이면 크기를 모르는 스트리밍 응답
+
+def choose_encoding(size=None):
+    config = current_app.config
+    if not config['COMPRESS_ENABLED'] or (size is not None and size < config['COMPRESS_MIN_SIZE']):
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+def compress(data, encoding, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+# 문자열 조각들을 이어서 압축하며 내보냄 (압축기가 모아 둔 것이 있을 때만 조각을 냄)
+
+def compress_chunks(chunks, encoding, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    size = compressed_size = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        size += len(data)
+        data = compressor.compress(data)
+        if data:
+            compressed_size += len(data)
+            yield data
+    data = compressor.flush()
+    compressed_size += len(data)
+    yield data
+    _record(encoding, size, compressed_size)
+
+def _record(encoding, size, compressed_size):
+    compressed_responses.inc((encoding,))
+    compression_bytes.inc(('in',), size)
+    compression_bytes.inc(('out',), compressed_size)
+
+def compress_response(response):
+    if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers \
+            or response.mimetype not in COMPRESSIBLE_TYPES or response.status_code not in (200, 201):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    encoding = choose_encoding(len(data))
+    if encoding is None:
+        return response
+    compressed = compress(data, encoding, current_app.config['COMPRESS_LEVEL'])
+    if len(compressed) >= len(data):
+        return response
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag('%s-%s' % (etag, encoding), weak)
+    _record(encoding, len(data), len(compressed))
+    return response
+
+def init_app(app):
+    app.after_request(compress_response)
@@ -0,0 +1,114 @@
+# config.py
+import json
+import os
+
+# 서버 기본 설정값 (같은 이름의 환경 변수로 덮어쓸 수 있음)
+DEFAULTS = {
+    'DATABASE': 'events.db',
+    'SECRET_KEY': 'your_secret_key',  # 세션/입장권 서명 키 (운영에서는 반드시 바꿔야 함, 모든 워커가 같은 값 사용)
+    'DEBUG': False,                   # python server.py로 띄울 때 디버거/리로더 사용 여부
+    'SERVER_HOST': '127.0.0.1',
+    'SERVER_PORT': 5000,
+    'SERVER_WORKERS': 0,              # serve.py가 띄울 워커 프로세스 수 (0이면 CPU 코어 수)
+    'WORKER_THREADS': 32,             # 워커 하나가 동시에 처리하는 연결 수
+    'KEEPALIVE_TIMEOUT': 5,           # 유휴 keep-alive 연결을 닫기까지 기다리는 시간 (초)
+    'GRACEFUL_TIMEOUT': 30,           # 종료/재시작 시 처리 중인 요청을 기다리는 최대 시간 (초)
+    'DB_POOL_ENABLED': True,          # False로 두면 요청마다 연결을 새로 여는 기존 방식으로 동작
+    'DB_POOL_SIZE': 16,               # 풀에 보관할 유휴 연결 최대 개수
+    'DB_BUSY_TIMEOUT_MS': 5000,
+    'DB_MMAP_SIZE': 256 * 1024 * 1024,
+    'DB_CACHED_STATEMENTS': 256,      # 연결별 prepared statement 캐시 크기
+    'METRICS_ENABLED': True,          # /metrics 엔드포인트와 요청/잠금 대기 지표 수집
+    'METRICS_SQL_TIMING': True,       # SQL 문마다 실행 시간/행 수 기록 (METRICS_ENABLED가 켜져 있을 때만 의미 있음)
+    'PAGE_MAX_LIMIT': 1000,           # 목록 조회 시 limit 최대값
+    'JSON_FAST_ENABLED': True,        # 빠른 JSON 인코더(orjson이 있으면 사용)와 목록 행 직접 인코딩 (False면 Flask 기본 인코더)
+    'COMPRESS_ENABLED': True,         # Accept-Encoding에 따라 응답을 gzip/deflate로 압축
+    'COMPRESS_MIN_SIZE': 1024,        # 이보다 작은 응답은 압축하지 않음 (바이트)
+    'COMPRESS_LEVEL': 6,              # zlib 압축 수준 (1: 빠름 ~ 9: 작음)
+    'RESERVE_LOCK_STRIPES': 64,       # 예약 시 이벤트별 락 스트라이프 개수 (0이면 사용 안 함)
+    'STORAGE_BACKEND': 'sqlite',      # sqlite 또는 memory (memory는 워커 하나 전용, 임시 예약/좌석 배치도/실시간 스트림 미지원)
+    'GROUP_COMMIT_ENABLED': False,    # True면 예약/취소를 전용 쓰기 스레드에서 모아서 커밋
+    'GROUP_COMMIT_MAX_BATCH': 64,     # 한 트랜잭션에 모을 최대 요청 수
+    'GROUP_COMMIT_MAX_WAIT_MS': 2,    # 첫 요청 이후 더 모으기 위해 기다리는 최대 시간 (ms)
+    'BATCH_MAX_ITEMS': 100,           # 일괄 예약/취소 한 번에 허용하는 항목 수
+    'BATCH_MAX_QUANTITY': 100,        # 항목 하나당 허용하는 최대 수량
+    'IMPORT_CHUNK_SIZE': 1000,        # 일괄 가져오기에서 한 트랜잭션으로 추가하는 행 수
+    'IMPORT_MAX_ERRORS': 1000,        # 일괄 가져오기 결과에 담는 행별 오류 최대 개수 (나머지는 개수만)
+    'IMPORT_MAX_LINE_LENGTH': 65536,  # NDJSON 한 행 최대 길이 (문자)
+    'HASH_WORKERS': 2,                # bcrypt 해시 전용 프로세스 수 (0이면 요청 스레드에서 실행)
+    'HASH_QUEUE_LIMIT': 32,           # 동시에 대기할 수 있는 해시 작업 수, 넘으면 503
+    'BCRYPT_ROUNDS': 0,               # bcrypt cost (0이면 시작 시 BCRYPT_TARGET_MS에 맞춰 계산)
+    'BCRYPT_TARGET_MS': 250,          # 해시 한 번에 목표로 하는 시간 (ms)
+    'SEAT_MAX_BLOCK': 10,             # 좌석 예약 한 번에 요청할 수 있는 연속 좌석 수
+    'SEAT_MAP_MAX_SEATS': 100000,     # 이벤트 하나의 좌석 배치도 최대 좌석 수
+    'MY_RESERVATIONS_CACHE_ENABLED': True,       # 사용자별 예약 목록 캐시 사용 여부
+    'MY_RESERVATIONS_CACHE_TTL': 30.0,           # 다른 워커의 이벤트 이름 변경/삭제가 늦게 반영되어도 되는 최대 시간 (초)
+    'MY_RESERVATIONS_CACHE_MAX_ITEMS': 200000,   # 캐시 전체 예약 항목 수 상한 (항목당 약 0.5KB)
+    'MY_RESERVATIONS_CACHE_MAX_PER_USER': 1000,  # 예약이 이보다 많은 사용자는 캐시하지 않음
+    'IDEMPOTENCY_TTL': 86400,         # Idempotency-Key 응답을 보관하는 시간 (초)
+    'IDEMPOTENCY_MAX_ENTRIES': 100000,    # 워커 메모리에 보관하는 응답 수 상한 (넘으면 오래 안 쓴 것부터 제거, 테이블에는 남음)
+    'IDEMPOTENCY_PENDING_TIMEOUT': 60,    # 처리 중으로 남은 키를 버려진 것으로 보는 시간 (초)
+    'RATE_LIMIT_ENABLED': True,       # 요청 속도 제한 사용 여부
+    'RATE_LIMIT_BACKEND': 'local',    # local(워커별 메모리) 또는 sqlite(RATE_LIMIT_DATABASE 파일을 모든 워커가 공유)
+    'RATE_LIMIT_DATABASE': '',        # sqlite 백엔드 파일 (비우면 DATABASE 경로 + '-ratelimit')
+    'RATE_LIMIT_MAX_KEYS': 100000,    # local 백엔드가 기억하는 키(사용자/주소) 수 상한
+    # 규칙별 [요청 수, 초] - 요청 수만큼 한꺼번에 보낼 수 있고 평균은 요청 수/초로 제한 (요청 수 0이면 끔)
+    # reserve: 로그인 사용자별 (예약/좌석/임시 예약/일괄 예약 합산), login/register: 접속 주소별
+    'RATE_LIMITS': {'reserve': [20, 1], 'login': [30, 60], 'register': [20, 60]},
+    'HOLD_DEFAULT_TTL': 300,          # 임시 예약(hold) 기본 유지 시간 (초, 이벤트별 hold_ttl로 바꿀 수 있음)
+    'HOLD_MAX_TTL': 3600,             # 이벤트에 설정할 수 있는 hold_ttl 최대값 (초)
+    'HOLD_REAPER_BATCH': 500,         # 만료된 hold를 한 트랜잭션에서 해제하는 최대 개수
+    'HOLD_SWEEP_INTERVAL': 30,        # 다른 워커가 만든 만료 hold를 DB에서 찾는 간격 (초)
+    'ADMISSION_DEFAULT_RATE': 50,     # 대기열 입장 속도 기본값 (초당 인원, 모든 워커 합계)
+    'ADMISSION_DATABASE': '',         # 모든 워커가 함께 쓰는 대기열 파일 (sqlite 저장소, 비우면 DATABASE 경로 + '-admission')
+    'ADMISSION_MAX_QUEUE': 100000,    # 이벤트별 최대 대기 인원
+    'ADMISSION_PASS_TTL': 120,        # 입장 후 예약에 사용할 수 있는 시간 (초)
+    'CATALOG_CACHE_TTL': 5.0,         # 이벤트 목록 스냅샷 최대 유지 시간 (초)
+    'CATALOG_CACHE_STALE_MS': 200,    # 예약/취소 후 남은 티켓 수가 늦게 반영되어도 되는 시간 (ms)
+    'INVENTORY_STREAM_COALESCE_MS': 100,   # 실시간 스트림에서 변경을 묶어 보내는 간격 (ms)
+    'INVENTORY_STREAM_HEARTBEAT': 15,      # 변경이 없을 때 heartbeat 간격 (초)
+    'INVENTORY_STREAM_POLL_MS': 1000,      # 다른 워커의 변경을 확인하는 간격 (ms)
+    'INVENTORY_STREAM_MAX_SUBSCRIBERS': 2000,  # 워커당 실시간 스트림 구독자 상한 (구독자마다 대기 스레드 하나, WORKER_THREADS와 별개)
+}
+
+# 환경 변수 문자열을 기본값의 타입에 맞게 변환
+
+def _coerce(raw, default):
+    if isinstance(default, dict):
+        return json.loads(raw)
+    if isinstance(default, bool):
+        return raw.strip().lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, int):
+        return int(raw)
+    if isinstance(default, float):
+        return float(raw)
+    return raw
+
+# JSON 설정 파일 읽기 (키는 DEFAULTS에 있는 이름만 허용)
+
+def read_config_file(path):
+    with open(path, encoding='utf-8') as f:
+        values = json.load(f)
+    unknown = sorted(set(values) - set(DEFAULTS))
+    if unknown:
+        raise ValueError('알 수 없는 설정 키: %s' % ', '.join(unknown))
+    return values
+
+# 기본값 -> 설정 파일(SERVER_CONFIG_FILE) -> 환경 변수 -> overrides 순서로 설정 dict 만들기
+
+def read_config(overrides=None):
+    config = dict(DEFAULTS)
+    path = (overrides or {}).get('SERVER_CONFIG_FILE') or os.environ.get('SERVER_CONFIG_FILE')
+    if path:
+        config.update(read_config_file(path))
+    for key, default in DEFAULTS.items():
+        raw = os.environ.get(key)
+        if raw is not None:
+            config[key] = _coerce(raw, default)
+    if overrides:
+        config.update((key, value) for key, value in overrides.items() if key != 'SERVER_CONFIG_FILE')
+    return config
+
+def load_config(app, overrides=None):
+    app.config.update(read_config(overrides))
+    return app.config
@@ -0,0 +1,234 @@
+# db.py
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+from flask import current_app, g
+
+import metrics
+
+sql_seconds = metrics.registry.histogram(
+    'sqlite_statement_duration_seconds', 'SQL 문 실행 시간 (SELECT는 첫 행까지)', ('op', 'table'))
+sql_rows = metrics.registry.counter(
+    'sqlite_rows_total', 'SQL 문이 읽거나 변경한 행 수', ('op', 'table'))
+begin_wait_seconds = metrics.registry.histogram(
+    'sqlite_begin_immediate_wait_seconds', 'BEGIN IMMEDIATE로 쓰기 잠금을 얻기까지 기다린 시간')
+busy_errors = metrics.registry.counter(
+    'sqlite_busy_errors_total', 'busy_timeout 안에 쓰기 잠금을 얻지 못한 횟수')
+
+# SQL 문에서 지표 라벨(문장 종류, 대상 테이블) 추출
+# 쿼리는 코드에 고정된 문자열이므로 결과를 캐시해 두고 재사용
+_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+(\w+)', re.IGNORECASE)
+_statement_labels = {}
+
+def statement_labels(sql):
+    labels = _statement_labels.get(sql)
+    if labels is None:
+        words = sql.split(None, 1)
+        match = _TABLE_RE.search(sql)
+        labels = (words[0].lower() if words else '', match.group(1).lower() if match else '')
+        if len(_statement_labels) < 1024:
+            _statement_labels[sql] = labels
+    return labels
+
+# 실행 시간과 행 수를 기록하는 커서 (SELECT 행 수는 fetch 할 때 셈)
+
+class TimedCursor(sqlite3.Cursor):
+    labels = ('', '')
+
+    def execute(self, sql, parameters=()):
+        self.labels = statement_labels(sql)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        self.labels = statement_labels(sql)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record(time.perf_counter() - start)
+
+    def _record(self, elapsed):
+        sql_seconds.observe(elapsed, self.labels)
+        if self.rowcount > 0:
+            sql_rows.inc(self.labels, self.rowcount)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            sql_rows.inc(self.labels)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        if rows:
+            sql_rows.inc(self.labels, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if rows:
+            sql_rows.inc(self.labels, len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        sql_rows.inc(self.labels)
+        return row
+
+# 모든 SQL 문이 TimedCursor를 거치도록 하는 연결 (commit/rollback 시간도 기록)
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        super().commit()
+        sql_seconds.observe(time.perf_counter() - start, ('commit', ''))
+
+    def rollback(self):
+        start = time.perf_counter()
+        super().rollback()
+        sql_seconds.observe(time.perf_counter() - start, ('rollback', ''))
+
+# 새 SQLite 연결을 열고 연결 단위 PRAGMA 적용
+# readonly=True면 쓰기가 불가능한 연결 (WAL 모드라 오래 읽어도 다른 연결의 쓰기를 막지 않음)
+
+def open_connection(config, readonly=False):
+    database = config['DATABASE']
+    if readonly:
+        database = 'file:%s?mode=ro' % pathname2url(os.path.abspath(database))
+    conn = sqlite3.connect(
+        database,
+        timeout=config['DB_BUSY_TIMEOUT_MS'] / 1000,
+        check_same_thread=False,
+        cached_statements=config['DB_CACHED_STATEMENTS'],
+        factory=TimedConnection if config['METRICS_ENABLED'] and config['METRICS_SQL_TIMING'] else sqlite3.Connection,
+        uri=readonly,
+    )
+    conn.row_factory = sqlite3.Row  # 딕셔너리 스타일로 데이터 가져오기
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA busy_timeout = %d' % config['DB_BUSY_TIMEOUT_MS'])
+    conn.execute('PRAGMA mmap_size = %d' % config['DB_MMAP_SIZE'])
+    return conn
+
+# 데이터베이스 파일 단위 설정 (WAL은 파일에 저장되므로 시작 시 한 번만 설정)
+
+def configure_database(conn):
+    conn.execute('PRAGMA journal_mode = WAL')
+
+# SQLite 쓰기 잠금 대기 통계 (BEGIN IMMEDIATE가 LOCK_WAIT_THRESHOLD 이상 걸리면 대기로 집계)
+LOCK_WAIT_THRESHOLD = 0.001
+lock_stats = {'waits': 0, 'wait_seconds': 0.0, 'busy_errors': 0}
+_lock_stats_lock = threading.Lock()
+
+def _record_lock_wait(waited, busy=False):
+    with _lock_stats_lock:
+        if busy:
+            lock_stats['busy_errors'] += 1
+        else:
+            lock_stats['waits'] += 1
+            lock_stats['wait_seconds'] += waited
+
+# BEGIN IMMEDIATE로 쓰기 잠금을 먼저 확보하는 트랜잭션
+# (읽은 뒤 쓰기로 승격하다 교착되는 일이 없고, 여러 워커 프로세스 사이에서도 직렬화됨)
+
+@contextmanager
+def immediate_transaction(conn):
+    start = time.perf_counter()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+    except sqlite3.OperationalError:
+        _record_lock_wait(time.perf_counter() - start, busy=True)
+        busy_errors.inc()
+        raise
+    waited = time.perf_counter() - start
+    begin_wait_seconds.observe(waited)
+    if waited >= LOCK_WAIT_THRESHOLD:
+        _record_lock_wait(waited)
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+# 워커 프로세스별로 재사용하는 연결 풀
+
+class ConnectionPool:
+    def __init__(self, config):
+        self.config = config
+        self.size = config['DB_POOL_SIZE']
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue(maxsize=self.size)
+
+    def _check_fork(self):
+        # fork 이후에는 부모 프로세스의 연결을 공유하면 안 되므로 풀을 새로 시작
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._idle = queue.LifoQueue(maxsize=self.size)
+
+    def acquire(self):
+        self._check_fork()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return open_connection(self.config)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if os.getpid() != self._pid:
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+# 요청(앱 컨텍스트)마다 연결 하나를 g에 보관
+
+def get_db():
+    if 'db' not in g:
+        pool = current_app.extensions.get('db_pool')
+        g.db = pool.acquire() if pool else open_connection(current_app.config)
+    return g.db
+
+# 앱 컨텍스트 종료 시 연결을 풀에 돌려주거나 닫기
+
+def close_db(exception=None):
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    pool = current_app.extensions.get('db_pool')
+    if pool:
+        pool.release(conn)
+    else:
+        conn.close()
+
+def init_app(app):
+    if app.config['DB_POOL_ENABLED']:
+        app.extensions['db_pool'] = ConnectionPool(app.config)
+    app.teardown_appcontext(close_db)
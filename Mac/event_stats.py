@@ -0,0 +1,156 @@
+# event_stats.py
+# 이벤트별 판매 통계 집계 테이블 (스키마와 트리거는 migrations.py 7번)
+# - event_stats      : 이벤트별 판매(sold), 누적 취소(cancelled), 구매자 수(buyers), 진행 중인 임시 예약(held)
+# - event_user_stats : (이벤트, 사용자)별 보유 예약 수 - 사용자별 최대치를 인덱스 끝 한 번으로 찾는 용도
+# reservations/holds 테이블의 트리거가 같은 트랜잭션 안에서 갱신하므로 어느 코드 경로로 예약/취소해도 맞게 유지됨
+# (예약 삭제는 취소뿐이므로 DELETE 트리거가 취소를 셈)
+#
+# python event_stats.py verify  [--config FILE] [--database PATH] : 예약/임시 예약 테이블에서 다시 계산해 집계와 다른 곳 출력 (다르면 종료 코드 1)
+# python event_stats.py rebuild [--config FILE] [--database PATH] : 다시 계산한 값으로 집계를 교체 (누적 취소 수는 이력이 없어 그대로 둠)
+import argparse
+import sys
+
+from db import immediate_transaction
+
+# 집계 테이블 기준으로 이벤트를 훑으므로 예약 수와 관계없이 이벤트 수만큼만 읽음
+STATS_SQL = '''
+    SELECT events.id, events.name, events.tickets_left,
+           COALESCE(event_stats.sold, 0) AS sold, COALESCE(event_stats.cancelled, 0) AS cancelled,
+           COALESCE(event_stats.buyers, 0) AS buyers, COALESCE(event_stats.held, 0) AS held,
+           COALESCE((SELECT MAX(reserved) FROM event_user_stats WHERE event_user_stats.event_id = events.id), 0) AS max_per_user
+    FROM events LEFT JOIN event_stats ON event_stats.event_id = events.id
+    WHERE events.id > ? ORDER BY events.id LIMIT ?
+'''
+
+# 예약에서 다시 계산한 값과 집계 테이블 비교 - 양쪽 중 한쪽에만 있는 이벤트도 포함
+EVENT_DRIFT_SQL = '''
+    WITH actual AS (
+        SELECT event_id, COUNT(*) AS sold, COUNT(DISTINCT user_id) AS buyers FROM reservations GROUP BY event_id
+    ), actual_held AS (
+        SELECT event_id, COUNT(*) AS held FROM holds GROUP BY event_id
+    ), ids AS (
+        SELECT event_id FROM event_stats UNION SELECT event_id FROM actual UNION SELECT event_id FROM actual_held
+    )
+    SELECT ids.event_id,
+           COALESCE(event_stats.sold, 0) AS stored_sold, COALESCE(actual.sold, 0) AS actual_sold,
+           COALESCE(event_stats.buyers, 0) AS stored_buyers, COALESCE(actual.buyers, 0) AS actual_buyers,
+           COALESCE(event_stats.held, 0) AS stored_held, COALESCE(actual_held.held, 0) AS actual_held
+    FROM ids
+    LEFT JOIN event_stats ON event_stats.event_id = ids.event_id
+    LEFT JOIN actual ON actual.event_id = ids.event_id
+    LEFT JOIN actual_held ON actual_held.event_id = ids.event_id
+    WHERE stored_sold != actual_sold OR stored_buyers != actual_buyers OR stored_held != actual_held
+    ORDER BY ids.event_id
+'''
+
+# 보유 수가 다른 (이벤트, 사용자) - 집계 값에서 실제 예약 수를 빼서 0이 아닌 것
+USER_DRIFT_SQL = '''
+    SELECT event_id, user_id FROM (
+        SELECT event_id, user_id, reserved FROM event_user_stats
+        UNION ALL
+        SELECT event_id, user_id, -COUNT(*) FROM reservations GROUP BY event_id, user_id
+    ) GROUP BY event_id, user_id HAVING SUM(reserved) != 0
+'''
+
+FIELDS = ('sold', 'buyers', 'held')
+
+# 통계 행 -> 응답 항목 (sell_through: 전체 좌석 중 팔린 비율, 좌석이 없으면 None)
+# 검증이 생기기 전에 저장된 정수가 아닌 tickets_left는 remaining/sell_through를 None으로 (목록 전체가 실패하지 않도록)
+
+def stats_item(row):
+    tickets_left = row['tickets_left'] if type(row['tickets_left']) is int else None
+    capacity = row['sold'] + row['held'] + tickets_left if tickets_left is not None else 0
+    return {
+        'id': row['id'], 'name': row['name'], 'sold': row['sold'], 'remaining': tickets_left,
+        'held': row['held'], 'cancelled': row['cancelled'], 'buyers': row['buyers'], 'max_per_user': row['max_per_user'],
+        'sell_through': round(row['sold'] / capacity, 4) if capacity else None,
+    }
+
+# 집계가 실제와 다른 이벤트 목록 [{'event_id', 'sold': (집계, 실제), ..., 'users': 보유 수가 다른 사용자 수}]
+# 두 쿼리가 같은 스냅샷을 보도록 호출한 쪽에서 트랜잭션을 열어 둘 것
+
+def find_drift(conn):
+    drift = {}
+    for row in conn.execute(EVENT_DRIFT_SQL):
+        entry = drift.setdefault(row['event_id'], {'event_id': row['event_id'], 'users': 0})
+        for field in FIELDS:
+            if row['stored_' + field] != row['actual_' + field]:
+                entry[field] = (row['stored_' + field], row['actual_' + field])
+    for row in conn.execute('SELECT event_id, COUNT(*) AS users FROM (%s) GROUP BY event_id' % USER_DRIFT_SQL):
+        drift.setdefault(row['event_id'], {'event_id': row['event_id'], 'users': 0})['users'] = row['users']
+    return [drift[event_id] for event_id in sorted(drift)]
+
+# 예약/임시 예약 테이블에서 집계를 다시 만듦 (트랜잭션 안에서 호출, 마이그레이션의 초기 채우기에도 사용)
+
+def rebuild_counters(conn):
+    conn.execute('DELETE FROM event_user_stats')
+    conn.execute('INSERT INTO event_user_stats (event_id, user_id, reserved) '
+                 'SELECT event_id, user_id, COUNT(*) FROM reservations GROUP BY event_id, user_id')
+    conn.execute('UPDATE event_stats SET sold = 0, buyers = 0, held = 0')
+    conn.execute('''
+        INSERT INTO event_stats (event_id, sold, buyers)
+        SELECT event_id, SUM(reserved), COUNT(*) FROM event_user_stats WHERE true GROUP BY event_id
+        ON CONFLICT(event_id) DO UPDATE SET sold = excluded.sold, buyers = excluded.buyers
+    ''')
+    conn.execute('''
+        INSERT INTO event_stats (event_id, held)
+        SELECT event_id, COUNT(*) FROM holds WHERE true GROUP BY event_id
+        ON CONFLICT(event_id) DO UPDATE SET held = excluded.held
+    ''')
+
+# 한 스냅샷에서 차이를 찾음 (읽기 전용)
+
+def verify(conn):
+    conn.execute('BEGIN')
+    try:
+        return find_drift(conn)
+    finally:
+        conn.rollback()
+
+# 쓰기 락을 잡고 차이를 찾은 뒤 다시 만들고, 고치기 전의 차이 목록 반환
+
+def rebuild(conn):
+    with immediate_transaction(conn):
+        drift = find_drift(conn)
+        rebuild_counters(conn)
+    return drift
+
+def _describe(entry):
+    parts = ['%s %d -> %d' % (field, entry[field][0], entry[field][1]) for field in FIELDS if field in entry]
+    if entry['users']:
+        parts.append('사용자별 보유 수 %d명 불일치' % entry['users'])
+    return 'event %d: %s' % (entry['event_id'], ', '.join(parts))
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='이벤트 판매 통계 집계 점검/재계산')
+    parser.add_argument('command', choices=('verify', 'rebuild'))
+    parser.add_argument('--config', help='JSON 설정 파일 경로 (SERVER_CONFIG_FILE과 같음)')
+    parser.add_argument('--database')
+    return parser.parse_args(argv)
+
+# 서버가 실행 중이어도 됨 (verify는 읽기만 하고, rebuild는 쓰기 락을 잡는 동안 예약/취소를 잠시 막음)
+
+def main(argv=None):
+    from config import read_config
+    from db import open_connection
+    from migrations import migrate
+
+    args = parse_args(argv)
+    options = {'SERVER_CONFIG_FILE': args.config, 'DATABASE': args.database}
+    config = read_config({key: value for key, value in options.items() if value is not None})
+    conn = open_connection(config)
+    try:
+        migrate(conn)
+        drift = verify(conn) if args.command == 'verify' else rebuild(conn)
+    finally:
+        conn.close()
+    for entry in drift:
+        print(_describe(entry))
+    if args.command == 'verify':
+        print('집계 불일치 이벤트 %d개' % len(drift))
+        return 1 if drift else 0
+    print('집계 다시 계산 완료 (고친 이벤트 %d개)' % len(drift))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
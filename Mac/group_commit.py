@@ -0,0 +1,145 @@
+# group_commit.py
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import reservations
+from db import immediate_transaction, open_connection
+
+log = logging.getLogger('group_commit')
+
+# 예약/취소 요청을 모아 한 트랜잭션(= 한 번의 fsync)으로 처리하는 전용 쓰기 스레드
+# 요청 스레드는 submit 후 커밋이 끝날 때까지 기다리므로 클라이언트가 보는 내구성은 기존과 같음
+
+class GroupCommitWriter:
+    OPERATIONS = {
+        'reserve': reservations.apply_reserve,
+        'cancel': reservations.apply_cancel,
+    }
+
+    def __init__(self, config, max_batch, max_wait_ms):
+        self.config = config
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.intents = 0
+        self.largest_batch = 0
+        self.failed_batches = 0
+
+    def _ensure_started(self):
+        # fork된 워커 프로세스에는 쓰기 스레드가 없으므로 프로세스마다 새로 시작
+        # 쓰기 스레드가 예상치 못하게 끝났으면 같은 큐로 다시 시작 (대기 중인 요청이 영원히 기다리지 않도록)
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            elif self._thread.is_alive():
+                return
+            else:
+                log.error('묶음 커밋 쓰기 스레드가 종료되어 다시 시작합니다.')
+            self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    # 결과를 1초씩 나눠 기다리며 쓰기 스레드가 살아 있는지 확인 (다른 요청이 없어도 죽은 스레드를 다시 시작)
+    def submit(self, operation, user_id, event_id):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((self.OPERATIONS[operation], user_id, event_id, future))
+        while True:
+            try:
+                return future.result(timeout=1)
+            except FutureTimeout:
+                self._ensure_started()
+
+    def reserve(self, user_id, event_id):
+        return self.submit('reserve', user_id, event_id)
+
+    def cancel(self, user_id, event_id):
+        return self.submit('cancel', user_id, event_id)
+
+    # 첫 요청이 들어온 뒤 max_wait 동안 또는 max_batch개가 찰 때까지 모음
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    # 연결 열기/모으기/커밋 중 어디서 예외가 나도 그 묶음의 요청만 실패시키고 계속 돎
+    # (연결이 문제일 수 있으므로 다음 묶음은 새 연결로 처리)
+    def _run(self):
+        conn = None
+        while True:
+            batch = []
+            try:
+                batch = self._collect()
+                if conn is None:
+                    conn = open_connection(self.config)
+                self._apply(conn, batch)
+            except Exception as e:
+                log.exception('묶음 커밋 쓰기 스레드 오류 (요청 %d개 실패 처리)', len(batch))
+                self.failed_batches += 1
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+                    conn = None
+                time.sleep(0.01)   # 연결을 열 수 없는 동안 빈 반복으로 CPU를 쓰지 않도록
+
+    def _apply(self, conn, batch):
+        results = []
+        try:
+            with immediate_transaction(conn):
+                for index, (apply, user_id, event_id, _) in enumerate(batch):
+                    # 요청 하나가 실패해도 나머지는 커밋되도록 요청마다 SAVEPOINT 사용
+                    conn.execute('SAVEPOINT intent_%d' % index)
+                    try:
+                        results.append((True, apply(conn, user_id, event_id)))
+                        conn.execute('RELEASE intent_%d' % index)
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO intent_%d' % index)
+                        conn.execute('RELEASE intent_%d' % index)
+                        results.append((False, e))
+        except Exception as e:
+            self.failed_batches += 1
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.intents += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for (ok, value), (*_, future) in zip(results, batch):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def stats(self):
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self.batches,
+            'intents': self.intents,
+            'average_batch': round(self.intents / self.batches, 2) if self.batches else 0,
+            'largest_batch': self.largest_batch,
+            'failed_batches': self.failed_batches,
+            'queued': self._queue.qsize(),
+        }
@@ -0,0 +1,133 @@
+# hashing.py
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+import metrics
+
+# bcrypt는 앞의 72바이트만 사용 (Flask-Bcrypt로 만든 기존 해시와 호환되도록 동일하게 자름)
+MAX_PASSWORD_BYTES = 72
+CALIBRATION_ROUNDS = 8
+MIN_ROUNDS = 4
+MAX_ROUNDS = 16
+
+def _password_bytes(password):
+    return password.encode('utf-8')[:MAX_PASSWORD_BYTES]
+
+# 워커 프로세스에서 실행되는 함수 (모듈 최상위에 있어야 pickle 가능)
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check(hashed, password):
+    try:
+        return bcrypt.checkpw(_password_bytes(password), hashed.encode('utf-8'))
+    except ValueError:
+        return False
+
+# 해시 문자열($2b$12$...)에 기록된 cost
+
+def hash_cost(hashed):
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+# 한 번 해시하는 데 target_ms 이하가 걸리는 가장 큰 cost 계산
+# (cost가 1 오를 때마다 시간이 두 배가 되므로 기준 cost 한 번만 측정)
+
+def calibrate(target_ms):
+    start = time.perf_counter()
+    _hash('calibration', CALIBRATION_ROUNDS)
+    elapsed_ms = max((time.perf_counter() - start) * 1000, 0.001)
+    rounds = CALIBRATION_ROUNDS
+    while rounds < MAX_ROUNDS and elapsed_ms * 2 <= target_ms:
+        elapsed_ms *= 2
+        rounds += 1
+    while rounds > MIN_ROUNDS and elapsed_ms > target_ms:
+        elapsed_ms /= 2
+        rounds -= 1
+    return rounds
+
+# 대기 중인 해시 작업이 queue_limit을 넘으면 바로 거절하기 위한 예외
+
+hash_seconds = metrics.registry.histogram(
+    'password_hash_duration_seconds', '비밀번호 해시/검증 시간 (풀 대기 포함)', ('op',))
+hash_rejected = metrics.registry.counter(
+    'password_hash_rejected_total', '해시 대기열이 가득 차서 거절한 요청 수')
+
+
+class HasherOverloaded(Exception):
+    pass
+
+# 비밀번호 해시/검증을 요청 스레드 대신 프로세스 풀에서 실행
+# workers가 0이면 요청 스레드에서 직접 실행 (기존 방식과 동일)
+
+class PasswordHasher:
+    def __init__(self, workers, queue_limit, rounds=0, target_ms=250):
+        self.workers = workers
+        self.rounds = rounds or calibrate(target_ms)
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # fork된 워커 프로세스는 부모의 풀을 쓸 수 없으므로 프로세스마다 새로 만듦
+        # 해시 프로세스는 spawn으로 시작 (스레드가 도는 서버를 fork하면 자식이 잠금을 물고 멈출 수 있음)
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, op, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            hash_rejected.inc()
+            raise HasherOverloaded()
+        start = time.perf_counter()
+        try:
+            if not self.workers:
+                return fn(*args)
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+            hash_seconds.observe(time.perf_counter() - start, (op,))
+
+    def hash(self, password):
+        return self._run('hash', _hash, password, self.rounds)
+
+    def check(self, hashed, password):
+        return self._run('check', _check, hashed, password)
+
+    # 여러 비밀번호를 해시 프로세스들에 나눠 해시 (일괄 가져오기용, 입력 순서대로 반환)
+    # 한 번에 workers개까지만 풀에 넣으므로 그동안 들어온 로그인 요청이 뒤에서 오래 기다리지 않음
+    def hash_many(self, passwords):
+        if not self.workers:
+            return [_hash(password, self.rounds) for password in passwords]
+        executor = self._get_executor()
+        results = []
+        in_flight = deque()
+        for password in passwords:
+            in_flight.append(executor.submit(_hash, password, self.rounds))
+            if len(in_flight) >= self.workers:
+                results.append(in_flight.popleft().result())
+        results.extend(future.result() for future in in_flight)
+        return results
+
+    # 저장된 해시의 cost가 현재 설정과 다르면 다시 해시해야 함
+    def needs_rehash(self, hashed):
+        return hash_cost(hashed) != self.rounds
+
+    # 해시 프로세스가 모두 끝날 때까지 기다림
+    # (wait=False로 두면 종료 중인 프로세스가 결과 큐에 막혀 부모 프로세스 종료가 멈출 수 있음)
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
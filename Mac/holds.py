@@ -0,0 +1,149 @@
+# holds.py
+import heapq
+import os
+import threading
+import time
+from collections import Counter
+
+import metrics
+import reservations
+from db import immediate_transaction, open_connection
+
+holds_created = metrics.registry.counter('holds_created_total', '만든 임시 예약(hold) 수')
+holds_confirmed = metrics.registry.counter('holds_confirmed_total', '확정된 임시 예약 수')
+holds_released = metrics.registry.counter(
+    'holds_released_total', '티켓을 돌려준 임시 예약 수 (reason: expired=만료, cancelled=사용자 취소)', ('reason',))
+reaper_batch_seconds = metrics.registry.histogram('hold_reaper_batch_seconds', '만료된 임시 예약 묶음 해제 트랜잭션 시간')
+
+# 임시 예약(hold): 티켓을 먼저 차감하고 만료 시각까지 확정(confirm)을 기다림
+# 확정하면 reservations로 옮기고, 만료되거나 취소하면 티켓을 돌려줌
+# (hold 행은 확정/해제 시 삭제되므로 holds 테이블에는 진행 중인 것만 남음)
+
+# 남은 티켓이 있으면 한 장 차감하고 hold를 만든 뒤 (hold_id, expires_at) 반환, 매진이면 None
+# (좌석 지정 이벤트는 임시 예약을 지원하지 않으므로 None)
+
+def create_hold(conn, user_id, event_id, default_ttl):
+    with immediate_transaction(conn):
+        row = conn.execute(
+            'UPDATE events SET tickets_left = tickets_left - 1 WHERE id = ? AND tickets_left > 0 AND seat_version IS NULL '
+            'RETURNING hold_ttl',
+            (event_id,)).fetchone()
+        if row is None:
+            return None
+        expires_at = time.time() + (row['hold_ttl'] or default_ttl)
+        cursor = conn.execute('INSERT INTO holds (user_id, event_id, expires_at) VALUES (?, ?, ?)',
+                              (user_id, event_id, expires_at))
+    holds_created.inc()
+    return cursor.lastrowid, expires_at
+
+# 만료 전인 본인 hold를 예약으로 확정하고 reservation_id 반환, 없거나 만료됐으면 None
+
+def confirm_hold(conn, user_id, hold_id):
+    with immediate_transaction(conn):
+        row = conn.execute('DELETE FROM holds WHERE id = ? AND user_id = ? AND expires_at > ? RETURNING event_id',
+                           (hold_id, user_id, time.time())).fetchone()
+        if row is None:
+            return None
+        cursor = conn.execute('INSERT INTO reservations (user_id, event_id, created_at) VALUES (?, ?, ?)',
+                              (user_id, row['event_id'], time.time()))
+        reservations.touch_user(conn, user_id)
+    holds_confirmed.inc()
+    return cursor.lastrowid
+
+# 만료 전인 본인 hold를 취소하고 티켓을 돌려준 뒤 event_id 반환, 없으면 None
+
+def release_hold(conn, user_id, hold_id):
+    with immediate_transaction(conn):
+        row = conn.execute('DELETE FROM holds WHERE id = ? AND user_id = ? AND expires_at > ? RETURNING event_id',
+                           (hold_id, user_id, time.time())).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE events SET tickets_left = tickets_left + 1 WHERE id = ?', (row['event_id'],))
+    holds_released.inc(('cancelled',))
+    return row['event_id']
+
+# 만료된 hold를 모아서 해제하는 백그라운드 스레드
+# - 이 프로세스에서 만든 hold는 만료 시각 기준 min-heap에 넣어 두고, 가장 빠른 만료 시각까지만 잠듦
+# - 다른 워커가 만든 hold(또는 재시작 전에 남은 hold)는 sweep_interval마다 expires_at 인덱스로 찾음
+# - 한 묶음은 한 트랜잭션으로 해제하며, 이미 확정/취소된 hold는 DELETE가 0행이라 건너뜀
+
+class HoldReaper:
+    def __init__(self, config, batch_size, sweep_interval, on_release=None):
+        self.config = config
+        self.batch_size = batch_size
+        self.sweep_interval = sweep_interval
+        self.on_release = on_release
+        self._cond = threading.Condition()
+        self._heap = []     # (expires_at, hold_id)
+        self._pid = None
+        self.released = 0
+        self.batches = 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._heap = []
+                threading.Thread(target=self._run, name='hold-reaper', daemon=True).start()
+
+    def start(self):
+        self._ensure_started()
+
+    def track(self, hold_id, expires_at):
+        self._ensure_started()
+        with self._cond:
+            heapq.heappush(self._heap, (expires_at, hold_id))
+            if self._heap[0][1] == hold_id:
+                self._cond.notify()  # 가장 먼저 만료되는 hold가 바뀌었으면 대기 시간을 다시 계산
+
+    def _run(self):
+        conn = open_connection(self.config)
+        next_sweep = 0
+        while True:
+            with self._cond:
+                wait = next_sweep - time.monotonic()
+                if self._heap:
+                    wait = min(wait, self._heap[0][0] - time.time())
+                if wait > 0:
+                    self._cond.wait(wait)
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                    due.append(heapq.heappop(self._heap)[1])
+            try:
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.sweep_interval
+                    due.extend(row[0] for row in conn.execute(
+                        'SELECT id FROM holds WHERE expires_at <= ? ORDER BY expires_at LIMIT ?', (now, self.batch_size)))
+                if due:
+                    self._release(conn, set(due), now)
+            except Exception:
+                # DB가 잠시 바쁘면 1초 뒤 sweep에서 다시 처리됨 (heap에서 꺼낸 hold도 sweep이 다시 찾음)
+                next_sweep = time.monotonic() + 1
+
+    def _release(self, conn, hold_ids, now):
+        start = time.perf_counter()
+        released = Counter()
+        with immediate_transaction(conn):
+            for hold_id in hold_ids:
+                row = conn.execute('DELETE FROM holds WHERE id = ? AND expires_at <= ? RETURNING event_id',
+                                   (hold_id, now)).fetchone()
+                if row is not None:
+                    released[row['event_id']] += 1
+            conn.executemany('UPDATE events SET tickets_left = tickets_left + ? WHERE id = ?',
+                             [(count, event_id) for event_id, count in released.items()])
+        reaper_batch_seconds.observe(time.perf_counter() - start)
+        count = sum(released.values())
+        self.batches += 1
+        self.released += count
+        if count:
+            holds_released.inc(('expired',), count)
+            if self.on_release:
+                self.on_release(list(released))
+
+    def stats(self):
+        with self._cond:
+            tracked = len(self._heap)
+        return {'tracked': tracked, 'released': self.released, 'batches': self.batches}
@@ -0,0 +1,170 @@
+# idempotency.py
+# Idempotency-Key 헤더로 쓰기 요청을 한 번만 실행하도록 하는 응답 저장소
+# - 키는 사용자별로 구분하고, 같은 키로 다시 오면 처음 응답(상태 코드 + JSON 본문)을 그대로 돌려줌
+#   (트랜잭션을 다시 실행하지 않고 쓰기 락도 잡지 않음)
+# - 같은 키로 메서드/경로/본문이 다른 요청이 오면 mismatch, 처음 요청이 아직 처리 중이면 in_progress
+# - 워커 메모리의 LRU(ttl, max_entries)를 먼저 보고, 없으면 idempotency_keys 테이블을 봄
+#   테이블에는 처리 시작 때 키를 먼저 등록(claim)하므로 다른 워커로 간 재시도도 중복 실행되지 않고,
+#   서버를 재시작해도 ttl 동안은 같은 응답을 돌려줌
+# - 5xx와 429는 요청이 처리되지 않은 것으로 보고 저장하지 않음 (같은 키로 다시 실행 가능)
+# - 처리 중에 워커가 죽어 남은 claim은 pending_timeout이 지나면 다음 요청이 가져감
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+MAX_KEY_LENGTH = 255
+
+# 결과: new=처음 실행, replayed=저장된 응답 재사용, in_progress=같은 키 요청이 처리 중, mismatch=같은 키로 다른 요청
+idempotency_requests = metrics.registry.counter(
+    'idempotency_requests_total', 'Idempotency-Key가 붙은 쓰기 요청 수 (result: new/replayed/in_progress/mismatch)', ('result',))
+
+NEW = 'new'
+REPLAYED = 'replayed'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'
+
+# 요청 지문 (메서드, 경로, 본문의 16바이트 해시)
+
+def fingerprint(method, path, body):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (method.encode(), path.encode(), body):
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.digest()
+
+def is_storable(status):
+    return status < 500 and status != 429
+
+# 저장된 응답 하나
+
+class StoredResponse:
+    __slots__ = ('fingerprint', 'status', 'body', 'created_at')
+
+    def __init__(self, fingerprint, status, body, created_at):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.body = body
+        self.created_at = created_at
+
+class IdempotencyStore:
+    def __init__(self, ttl, max_entries, pending_timeout, connect=None, purge_interval=60, purge_batch=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.pending_timeout = pending_timeout
+        self.connect = connect          # None이면 메모리에만 저장 (memory 저장소, 워커 하나)
+        self.purge_interval = purge_interval
+        self.purge_batch = purge_batch
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # (user_id, key) -> StoredResponse
+        self._pending = {}              # (user_id, key) -> (fingerprint, 시작 시각), connect가 없을 때만 사용
+        self._last_purge = time.time()
+        self.evictions = 0
+
+    # 처리 시작: (결과, StoredResponse 또는 None) 반환 - 결과가 NEW일 때만 요청을 실행하고 finish/abandon을 호출해야 함
+    def begin(self, user_id, key, request_fingerprint):
+        now = time.time()
+        state, stored = self._begin(user_id, key, request_fingerprint, now)
+        idempotency_requests.inc((state,))
+        return state, stored
+
+    def _begin(self, user_id, key, request_fingerprint, now):
+        stored = self._cached(user_id, key, now)
+        if stored is not None:
+            return (REPLAYED, stored) if stored.fingerprint == request_fingerprint else (MISMATCH, None)
+        if self.connect is None:
+            return self._claim_in_memory(user_id, key, request_fingerprint, now), None
+
+        conn = self.connect()
+        row = conn.execute('SELECT fingerprint, status, body, created_at FROM idempotency_keys WHERE user_id = ? AND key = ?',
+                           (user_id, key)).fetchone()
+        if row is not None and row['created_at'] > now - (self.ttl if row['status'] is not None else self.pending_timeout):
+            if row['fingerprint'] != request_fingerprint:
+                return MISMATCH, None
+            if row['status'] is None:
+                return IN_PROGRESS, None
+            stored = StoredResponse(row['fingerprint'], row['status'], row['body'], row['created_at'])
+            self._remember(user_id, key, stored)
+            return REPLAYED, stored
+        # 없거나, 만료됐거나, 처리하던 워커가 사라진 키만 가져옴 (그 사이 다른 워커가 가져갔으면 0행)
+        cursor = conn.execute('''
+            INSERT INTO idempotency_keys (user_id, key, fingerprint, created_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, key) DO UPDATE SET fingerprint = excluded.fingerprint, status = NULL, body = NULL,
+                created_at = excluded.created_at
+            WHERE idempotency_keys.created_at <= ? OR (idempotency_keys.status IS NULL AND idempotency_keys.created_at <= ?)
+        ''', (user_id, key, request_fingerprint, now, now - self.ttl, now - self.pending_timeout))
+        conn.commit()
+        return (NEW if cursor.rowcount == 1 else IN_PROGRESS), None
+
+    def _claim_in_memory(self, user_id, key, request_fingerprint, now):
+        with self._lock:
+            pending = self._pending.get((user_id, key))
+            if pending is not None and pending[1] > now - self.pending_timeout:
+                return IN_PROGRESS if pending[0] == request_fingerprint else MISMATCH
+            self._pending[(user_id, key)] = (request_fingerprint, now)
+        return NEW
+
+    # 처리 완료: 저장할 수 있는 응답이면 저장하고, 아니면 키를 풀어 같은 키로 다시 실행할 수 있게 함
+    def finish(self, user_id, key, request_fingerprint, status, body):
+        if not is_storable(status):
+            self.abandon(user_id, key)
+            return
+        now = time.time()
+        with self._lock:
+            created_at = self._pending.pop((user_id, key), (None, now))[1]
+        if self.connect is not None:
+            conn = self.connect()
+            row = conn.execute('UPDATE idempotency_keys SET status = ?, body = ? WHERE user_id = ? AND key = ? RETURNING created_at',
+                               (status, body, user_id, key)).fetchone()
+            conn.commit()
+            created_at = row['created_at'] if row else now
+            self._purge_expired(conn, now)
+        self._remember(user_id, key, StoredResponse(request_fingerprint, status, body, created_at))
+
+    # 요청이 실패해 응답을 저장하지 않음
+    def abandon(self, user_id, key):
+        with self._lock:
+            self._pending.pop((user_id, key), None)
+        if self.connect is not None:
+            conn = self.connect()
+            if conn.in_transaction:
+                conn.rollback()
+            conn.execute('DELETE FROM idempotency_keys WHERE user_id = ? AND key = ? AND status IS NULL', (user_id, key))
+            conn.commit()
+
+    def _cached(self, user_id, key, now):
+        with self._lock:
+            stored = self._entries.get((user_id, key))
+            if stored is None:
+                return None
+            if stored.created_at <= now - self.ttl:
+                del self._entries[(user_id, key)]
+                return None
+            self._entries.move_to_end((user_id, key))
+            return stored
+
+    def _remember(self, user_id, key, stored):
+        with self._lock:
+            self._entries[(user_id, key)] = stored
+            self._entries.move_to_end((user_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # 만료된 키를 purge_interval마다 한 묶음씩 지움 (created_at 인덱스 사용)
+    def _purge_expired(self, conn, now):
+        with self._lock:
+            if now - self._last_purge < self.purge_interval:
+                return
+            self._last_purge = now
+        conn.execute('''
+            DELETE FROM idempotency_keys WHERE (user_id, key) IN
+                (SELECT user_id, key FROM idempotency_keys WHERE created_at <= ? ORDER BY created_at LIMIT ?)
+        ''', (now - self.ttl, self.purge_batch))
+        conn.commit()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'pending': len(self._pending), 'evictions': self.evictions}
@@ -0,0 +1,183 @@
+# inventory_stream.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from db import open_connection
+
+log = logging.getLogger('inventory_stream')
+
+# 남은 티켓 수 변경을 구독자들에게 Server-Sent Events로 전달하는 브로드캐스터
+# - publish(): 변경된 이벤트 ID만 기록 (요청 스레드는 기다리지 않음)
+# - 전용 스레드 하나가 coalesce_ms 동안 모인 ID를 한 번의 SELECT로 읽어 묶음(seq)으로 기록
+# - 구독자는 하나의 Condition에서 새 seq를 기다리므로 구독자 수와 관계없이 DB 조회는 워커당 하나
+# - 다른 워커 프로세스의 변경은 poll_ms마다 PRAGMA data_version으로 감지하고,
+#   목록 버전(catalog_state.version)이 올라갔으면 그 뒤로 바뀐 이벤트와 삭제 기록만 읽음 (idx_events_version 사용)
+# - 구독자마다 요청 스레드 하나가 Condition에서 기다리므로 워커당 구독자 수는 max_subscribers까지
+#   (serve.py 워커에서는 구독이 시작되면 요청 슬롯을 돌려주므로 WORKER_THREADS와는 별개)
+# - DB 오류가 나도 스레드는 끝나지 않음: 오류를 기록하고 연결을 다시 연 뒤 전체 목록과 비교해 놓친 변경을 알림
+
+class InventoryBroadcaster:
+    def __init__(self, config, coalesce_ms, heartbeat_s, poll_ms, max_subscribers, history=256):
+        self.config = config
+        self.coalesce = coalesce_ms / 1000
+        self.heartbeat = heartbeat_s
+        self.poll = poll_ms / 1000
+        self.max_subscribers = max_subscribers
+        self._cond = threading.Condition()
+        self._pending = set()
+        self._log = deque(maxlen=history)   # (seq, [delta, ...])
+        self._seq = 0
+        self._subscribers = 0
+        self._pid = None
+        self._closed = False
+        self._known = None      # 구독자에게 마지막으로 알린 {event_id: tickets_left} (브로드캐스터 스레드만 사용)
+        self.published = 0
+        self.errors = 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pending = set()
+                threading.Thread(target=self._run, name='inventory-broadcaster', daemon=True).start()
+
+    def publish(self, event_ids):
+        self._ensure_started()
+        with self._cond:
+            self._pending.update(event_ids)
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            conn = None
+            try:
+                conn = open_connection(self.config)
+                self._follow(conn)
+            except Exception:
+                self.errors += 1
+                log.exception('실시간 스트림 브로드캐스터 오류 (연결을 다시 열고 계속합니다)')
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            time.sleep(self.poll)
+
+    # 연결 하나로 변경을 계속 따라감 (예외가 나면 _run이 새 연결로 다시 호출)
+    def _follow(self, conn):
+        catalog_version = conn.execute('SELECT version FROM catalog_state').fetchone()[0]
+        rows = dict(conn.execute('SELECT id, tickets_left FROM events'))
+        if self._known is None:
+            self._known = rows
+        else:
+            # 오류로 다시 시작한 경우: 처리하지 못한 변경과 그동안의 다른 워커 변경을 전체 목록 비교로 알림
+            latest = dict.fromkeys(self._known)
+            latest.update(rows)
+            self._known = self._emit(self._known, latest)
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        next_poll = time.monotonic() + self.poll
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending, timeout=max(0, next_poll - time.monotonic()))
+                has_pending = bool(self._pending)
+            if has_pending:
+                time.sleep(self.coalesce)  # 짧은 시간 동안 들어온 변경을 한 묶음으로
+                with self._cond:
+                    changed, self._pending = self._pending, set()
+                placeholders = ','.join('?' * len(changed))
+                rows = dict(conn.execute('SELECT id, tickets_left FROM events WHERE id IN (%s)' % placeholders, list(changed)))
+                latest = {event_id: rows.get(event_id) for event_id in changed}
+                self._known = self._emit(self._known, latest)
+
+            if time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + self.poll
+                current_version = conn.execute('PRAGMA data_version').fetchone()[0]
+                if current_version != data_version:
+                    # 다른 연결(다른 워커 포함)의 커밋이 있었으면 지난번 목록 버전 뒤로 바뀐 이벤트만 읽음
+                    # (버전을 먼저 읽으므로 그 사이 커밋된 변경은 다음 번에 한 번 더 읽힐 뿐 놓치지 않음)
+                    data_version = current_version
+                    version = conn.execute('SELECT version FROM catalog_state').fetchone()[0]
+                    if version != catalog_version:
+                        latest = dict(conn.execute('SELECT id, tickets_left FROM events WHERE version > ?', (catalog_version,)))
+                        for (event_id,) in conn.execute('SELECT event_id FROM event_tombstones WHERE version > ?', (catalog_version,)):
+                            latest.setdefault(event_id, None)
+                        catalog_version = version
+                        self._known = self._emit(self._known, latest)
+
+    # latest({event_id: tickets_left 또는 삭제 시 None}) 중 known과 다른 것만 묶어서 기록
+    def _emit(self, known, latest):
+        deltas = [self._delta(event_id, tickets_left) for event_id, tickets_left in sorted(latest.items())
+                  if known.get(event_id) != tickets_left]
+        known = dict(known)
+        for event_id, tickets_left in latest.items():
+            if tickets_left is None:
+                known.pop(event_id, None)
+            else:
+                known[event_id] = tickets_left
+        if deltas:
+            with self._cond:
+                self._seq += 1
+                self._log.append((self._seq, deltas))
+                self.published += len(deltas)
+                self._cond.notify_all()
+        return known
+
+    @staticmethod
+    def _delta(event_id, tickets_left):
+        if tickets_left is None:
+            return {'event_id': event_id, 'tickets_left': 0, 'sold_out': True, 'deleted': True}
+        return {'event_id': event_id, 'tickets_left': tickets_left, 'sold_out': tickets_left <= 0, 'deleted': False}
+
+    # 구독을 시작하고 SSE 메시지 문자열을 계속 만들어 내는 제너레이터 반환, 구독자가 너무 많으면 None
+    # 구독자 수는 제너레이터가 처음 돌 때 셈 (첫 메시지 전에 버려진 응답은 finally가 실행되지 않으므로
+    # 여기서 세면 자리가 영영 돌아오지 않음, 대신 동시에 시작하는 구독자 수만큼 상한을 잠깐 넘을 수 있음)
+    def subscribe(self):
+        self._ensure_started()
+        with self._cond:
+            if self._closed or self._subscribers >= self.max_subscribers:
+                return None
+            last = self._seq
+        return self._stream(last)
+
+    def _stream(self, last):
+        with self._cond:
+            self._subscribers += 1
+        try:
+            yield 'retry: 3000\nevent: ready\ndata: {"seq": %d}\n\n' % last
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq > last or self._closed, timeout=self.heartbeat)
+                    if self._closed:
+                        return
+                    batches = [(seq, deltas) for seq, deltas in self._log if seq > last]
+                    oldest = self._log[0][0] if self._log else None
+                    latest = self._seq
+                if latest == last:
+                    yield ': heartbeat\n\n'
+                    continue
+                if oldest is None or oldest > last + 1:
+                    # 너무 뒤처져 중간 변경을 잃었으면 목록을 다시 받아오도록 알림
+                    yield 'event: resync\ndata: {"seq": %d}\n\n' % latest
+                else:
+                    for seq, deltas in batches:
+                        yield 'id: %d\nevent: inventory\ndata: %s\n\n' % (seq, json.dumps(deltas))
+                last = latest
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+
+    # 워커 종료 시 열려 있는 스트림을 모두 끝냄 (클라이언트는 retry 간격 뒤 다른 워커로 재연결)
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        return {'subscribers': self._subscribers, 'seq': self._seq, 'published': self.published, 'errors': self.errors}
@@ -0,0 +1,373 @@
+# memory_storage.py
+import bisect
+import os
+import threading
+from collections import OrderedDict
+from itertools import count
+from operator import itemgetter
+
+from reservations import ReservationChange, reservation_item
+from storage import CatalogChanges, Storage
+
+# 이벤트 하나 (남은 티켓 수는 이벤트별 락 안에서만 바꿈, 판매 통계는 전역 락 안에서 바꿈)
+
+class _Event:
+    __slots__ = ('id', 'name', 'tickets_left', 'hold_ttl', 'lock', 'reservation_ids', 'cancelled', 'user_counts', 'count_users',
+                 'version')
+
+    def __init__(self, event_id, name, tickets_left, hold_ttl):
+        self.id = event_id
+        self.name = name
+        self.tickets_left = tickets_left
+        self.hold_ttl = hold_ttl
+        self.lock = threading.Lock()
+        self.reservation_ids = []   # 오름차순
+        self.cancelled = 0
+        self.user_counts = {}       # user_id -> 보유 예약 수
+        self.count_users = {}       # 보유 예약 수 -> 사용자 수 (사용자별 최대치를 바로 찾는 용도)
+        self.version = 0            # 마지막으로 바뀐 목록 버전
+
+    def row(self):
+        return {'id': self.id, 'name': self.name, 'tickets_left': self.tickets_left}
+
+    # 사용자의 보유 예약 수를 delta만큼 바꿈
+    def count_user(self, user_id, delta):
+        before = self.user_counts.get(user_id, 0)
+        after = before + delta
+        for reserved, change in ((before, -1), (after, 1)):
+            if reserved:
+                users = self.count_users.get(reserved, 0) + change
+                if users:
+                    self.count_users[reserved] = users
+                else:
+                    del self.count_users[reserved]
+        if after:
+            self.user_counts[user_id] = after
+        else:
+            del self.user_counts[user_id]
+
+    def stats_row(self):
+        return dict(self.row(), sold=len(self.reservation_ids), cancelled=self.cancelled, buyers=len(self.user_counts),
+                    held=0, max_per_user=max(self.count_users, default=0))
+
+# 프로세스 메모리에만 저장하는 저장소 (워커 프로세스 하나 전용)
+# - 예약/취소는 이벤트별 락으로 줄 세우고, 사용자/예약 색인은 짧게 잡는 전역 락 하나로 보호
+# - 락 순서는 항상 이벤트 락(ID 오름차순) -> 전역 락
+# - 예약 ID는 전역 락 안에서 증가하는 값이라 색인 목록 끝에 붙이기만 해도 오름차순이 유지됨
+# - SQLite와 마찬가지로 이벤트/사용자를 지워도 예약은 남고 목록에서만 빠짐
+
+class MemoryStorage(Storage):
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._user_ids = count(1)
+        self._event_ids = count(1)
+        self._reservation_ids = count(1)
+        self._users = {}            # user_id -> {'id', 'username', 'password', 'is_admin', 'reservations_version'}
+        self._usernames = {}        # username -> user_id
+        self._user_list = []        # user_id 오름차순
+        self._events = {}           # event_id -> _Event
+        self._event_list = []       # event_id 오름차순
+        self._reservations = {}     # reservation_id -> (user_id, event_id)
+        self._by_user = {}          # user_id -> [reservation_id, ...] 오름차순
+        self.catalog_id = os.urandom(8).hex()   # 재시작하면 목록이 비므로 클라이언트 캐시도 버리도록 매번 새 값
+        self._catalog_version = 1
+        self._changed = OrderedDict()   # event_id -> None, 마지막으로 바뀐 순서 (끝에서부터 버전 내림차순)
+        self._tombstones = []           # [(버전, 삭제된 event_id), ...] 버전 오름차순
+
+    def create_user(self, username, password, is_admin):
+        with self._lock:
+            if username in self._usernames:
+                return None
+            user_id = next(self._user_ids)
+            self._users[user_id] = {'id': user_id, 'username': username, 'password': password,
+                                    'is_admin': is_admin, 'reservations_version': 0}
+            self._usernames[username] = user_id
+            self._user_list.append(user_id)
+        return user_id
+
+    def find_user(self, username):
+        user = self._users.get(self._usernames.get(username))
+        if user is None:
+            return None
+        return {'id': user['id'], 'password': user['password'], 'is_admin': user['is_admin']}
+
+    def update_password(self, user_id, password):
+        with self._lock:
+            if user_id in self._users:
+                self._users[user_id]['password'] = password
+
+    def list_users(self, after_id, limit):
+        with self._lock:
+            user_ids = _page(self._user_list, after_id, limit)
+            return [{'id': user_id, 'username': self._users[user_id]['username'], 'is_admin': self._users[user_id]['is_admin']}
+                    for user_id in user_ids]
+
+    def delete_user(self, user_id):
+        with self._lock:
+            user = self._users.pop(user_id, None)
+            if user is None:
+                return False
+            del self._usernames[user['username']]
+            _remove_sorted(self._user_list, user_id)
+        return True
+
+    def existing_usernames(self, usernames):
+        with self._lock:
+            return {username for username in usernames if username in self._usernames}
+
+    def import_users(self, rows):
+        skipped = []
+        with self._lock:
+            for index, row in enumerate(rows):
+                if row['username'] in self._usernames:
+                    skipped.append(index)
+                    continue
+                user_id = next(self._user_ids)
+                self._users[user_id] = {'id': user_id, 'username': row['username'], 'password': row['password'],
+                                        'is_admin': row['is_admin'], 'reservations_version': 0}
+                self._usernames[row['username']] = user_id
+                self._user_list.append(user_id)
+        return skipped
+
+    def reservations_version(self, user_id):
+        user = self._users.get(user_id)
+        return user['reservations_version'] if user else None
+
+    def create_event(self, name, tickets_left, hold_ttl=None):
+        with self._lock:
+            event_id = next(self._event_ids)
+            self._events[event_id] = _Event(event_id, name, tickets_left, hold_ttl)
+            self._event_list.append(event_id)
+            self._touch_event(self._events[event_id])
+        return event_id
+
+    def get_event(self, event_id):
+        event = self._events.get(event_id)
+        return event.row() if event else None
+
+    def list_events(self, after_id, limit):
+        with self._lock:
+            return [self._events[event_id].row() for event_id in _page(self._event_list, after_id, limit)]
+
+    def update_event(self, event_id, fields):
+        event = self._events.get(event_id)
+        if event is None:
+            return
+        with event.lock:
+            changed = any(getattr(event, field) != fields[field] for field in ('name', 'tickets_left') if field in fields)
+            for field in ('name', 'tickets_left', 'hold_ttl'):
+                if field in fields:
+                    setattr(event, field, fields[field])
+            if changed:
+                with self._lock:
+                    self._touch_event(event)
+
+    def import_events(self, rows):
+        with self._lock:
+            for row in rows:
+                event_id = next(self._event_ids)
+                self._events[event_id] = _Event(event_id, row['name'], row['tickets_left'], row['hold_ttl'])
+                self._event_list.append(event_id)
+                self._touch_event(self._events[event_id])
+
+    def delete_event(self, event_id):
+        with self._lock:
+            if self._events.pop(event_id, None) is not None:
+                _remove_sorted(self._event_list, event_id)
+                del self._changed[event_id]
+                self._catalog_version += 1
+                self._tombstones.append((self._catalog_version, event_id))
+
+    def catalog_changes(self, since, catalog_id=None):
+        with self._lock:
+            version = self._catalog_version
+            if since <= 0 or since > version or catalog_id not in (None, self.catalog_id):
+                events = [self._events[event_id].row() for event_id in self._event_list]
+                return CatalogChanges(self.catalog_id, version, True, events, [])
+            events = []
+            for event_id in reversed(self._changed):
+                event = self._events[event_id]
+                if event.version <= since:
+                    break
+                events.append(event.row())
+            events.reverse()
+            start = bisect.bisect_right(self._tombstones, since, key=itemgetter(0))
+            deleted = [event_id for _, event_id in self._tombstones[start:]]
+        return CatalogChanges(self.catalog_id, version, False, events, deleted)
+
+    # 이벤트의 목록 버전을 올림 (전역 락을 잡은 상태에서, 값을 바꾼 뒤에 호출)
+    def _touch_event(self, event):
+        self._catalog_version += 1
+        event.version = self._catalog_version
+        self._changed[event.id] = None
+        self._changed.move_to_end(event.id)
+
+    # 아래 세 메서드는 전역 락을 잡은 상태에서 호출
+    def _add_reservations(self, user_id, event, quantity):
+        reservation_ids = []
+        for _ in range(quantity):
+            reservation_id = next(self._reservation_ids)
+            self._reservations[reservation_id] = (user_id, event.id)
+            self._by_user.setdefault(user_id, []).append(reservation_id)
+            event.reservation_ids.append(reservation_id)
+            reservation_ids.append(reservation_id)
+        event.count_user(user_id, quantity)
+        return reservation_ids
+
+    def _remove_reservations(self, user_id, event, limit=None):
+        mine = self._mine(user_id, event)
+        if limit is not None:
+            mine = mine[-limit:]   # SQLite 구현처럼 최근 예약부터
+        for reservation_id in mine:
+            del self._reservations[reservation_id]
+            _remove_sorted(self._by_user[user_id], reservation_id)
+            _remove_sorted(event.reservation_ids, reservation_id)
+        if mine:
+            event.cancelled += len(mine)
+            event.count_user(user_id, -len(mine))
+        return mine
+
+    # 사용자의 해당 이벤트 예약 ID (사용자 색인에서 찾으므로 인기 이벤트라도 사용자 예약 수만큼만 봄)
+    def _mine(self, user_id, event):
+        return [reservation_id for reservation_id in self._by_user.get(user_id, ())
+                if self._reservations[reservation_id][1] == event.id]
+
+    def _touch_user(self, user_id):
+        user = self._users.get(user_id)
+        if user is None:
+            return None
+        user['reservations_version'] += 1
+        return user['reservations_version']
+
+    def reserve(self, user_id, event_id):
+        event = self._events.get(event_id)
+        if event is None:
+            return None
+        with event.lock:
+            if event.tickets_left <= 0:
+                return None
+            event.tickets_left -= 1
+            with self._lock:
+                reservation_id, = self._add_reservations(user_id, event, 1)
+                version = self._touch_user(user_id)
+                self._touch_event(event)
+        return ReservationChange(user_id, version, [reservation_item(reservation_id, event_id, event.name)], [])
+
+    def cancel(self, user_id, event_id):
+        event = self._events.get(event_id)
+        if event is None:
+            return None
+        with event.lock:
+            with self._lock:
+                removed = self._remove_reservations(user_id, event)
+                if not removed:
+                    return None
+                version = self._touch_user(user_id)
+                event.tickets_left += len(removed)
+                self._touch_event(event)
+        return ReservationChange(user_id, version, [], removed)
+
+    # 관련 이벤트 락을 ID 순서로 모두 잡은 상태에서 fn 실행 (없는 이벤트는 None으로 전달)
+    def _with_events(self, event_ids, fn):
+        events = {event_id: self._events.get(event_id) for event_id in event_ids}
+        locks = [events[event_id].lock for event_id in sorted(events) if events[event_id] is not None]
+        for lock in locks:
+            lock.acquire()
+        try:
+            return fn(events)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def reserve_many(self, user_id, items):
+        def apply(events):
+            used = {}
+            results = []
+            for event_id, quantity in items:
+                event = events[event_id]
+                # 같은 이벤트가 여러 번 나오면 SQLite처럼 앞 항목이 차감한 뒤의 수량으로 판단
+                ok = event is not None and event.tickets_left - used.get(event_id, 0) >= quantity
+                if ok:
+                    used[event_id] = used.get(event_id, 0) + quantity
+                results.append({'event_id': event_id, 'quantity': quantity, 'ok': ok})
+            if not all(result['ok'] for result in results):
+                return False, results
+            with self._lock:
+                for event_id, quantity in items:
+                    events[event_id].tickets_left -= quantity
+                    self._add_reservations(user_id, events[event_id], quantity)
+                    self._touch_event(events[event_id])
+                self._touch_user(user_id)
+            return True, results
+        return self._with_events({event_id for event_id, _ in items}, apply)
+
+    def cancel_many(self, user_id, items):
+        def apply(events):
+            with self._lock:
+                mine = {}
+                for event_id in events:
+                    event = events[event_id]
+                    mine[event_id] = 0 if event is None else len(self._mine(user_id, event))
+                results = []
+                for event_id, quantity in items:
+                    results.append({'event_id': event_id, 'quantity': quantity, 'ok': mine[event_id] >= quantity})
+                    mine[event_id] = max(0, mine[event_id] - quantity)
+                if not all(result['ok'] for result in results):
+                    return False, results
+                for event_id, quantity in items:
+                    self._remove_reservations(user_id, events[event_id], quantity)
+                    events[event_id].tickets_left += quantity
+                    self._touch_event(events[event_id])
+                self._touch_user(user_id)
+            return True, results
+        return self._with_events({event_id for event_id, _ in items}, apply)
+
+    def list_user_reservations(self, user_id, after_id, limit):
+        rows = []
+        with self._lock:
+            for reservation_id in _after(self._by_user.get(user_id, []), after_id):
+                event = self._events.get(self._reservations[reservation_id][1])
+                if event is None:
+                    continue
+                rows.append({'reservation_id': reservation_id, 'id': event.id, 'name': event.name,
+                             'section': None, 'row_name': None, 'seat_no': None})
+                if limit is not None and len(rows) == limit:
+                    break
+        return rows
+
+    def list_event_reservations(self, event_id, after_id, limit):
+        rows = []
+        with self._lock:
+            event = self._events.get(event_id)
+            for reservation_id in _after(event.reservation_ids if event else [], after_id):
+                user = self._users.get(self._reservations[reservation_id][0])
+                if user is None:
+                    continue
+                rows.append({'reservation_id': reservation_id, 'id': user['id'], 'username': user['username']})
+                if limit is not None and len(rows) == limit:
+                    break
+        return rows
+
+    # 임시 예약을 지원하지 않으므로 held는 항상 0
+    def event_stats(self, after_id, limit):
+        with self._lock:
+            return [self._events[event_id].stats_row() for event_id in _page(self._event_list, after_id, limit)]
+
+# 오름차순 ID 목록에서 after_id 다음부터 limit개
+
+def _page(ids, after_id, limit):
+    start = bisect.bisect_right(ids, after_id)
+    return ids[start:] if limit is None else ids[start:start + limit]
+
+# 오름차순 ID 목록에서 after_id 다음부터 차례로 (목록을 복사하지 않음)
+
+def _after(ids, after_id):
+    for position in range(bisect.bisect_right(ids, after_id), len(ids)):
+        yield ids[position]
+
+def _remove_sorted(ids, value):
+    position = bisect.bisect_left(ids, value)
+    if position < len(ids) and ids[position] == value:
+        del ids[position]
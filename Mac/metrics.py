@@ -0,0 +1,216 @@
+# metrics.py
+import bisect
+import threading
+import time
+
+from flask import Response, g, request
+
+# 처리 시간 히스토그램 기본 버킷 (초)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 지표 저장소
+# 값은 스레드별 dict에 따로 쌓고 /metrics 조회 시에만 합치므로, 기록할 때는 잠금이 필요 없음
+# (끝난 스레드의 값은 주기적으로 _retired에 합쳐서 스레드가 계속 생겨도 목록이 커지지 않게 함)
+
+class Registry:
+    def __init__(self):
+        self.enabled = True
+        self._metrics = []
+        self._collectors = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = {}
+        self._sweep_at = 64
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(self, name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self, name, help_text, labelnames, buckets))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    # 조회 시점에 값을 만들어 주는 함수 등록
+    # fn()은 (이름, 종류, 설명, [(라벨 dict, 값), ...]) 를 차례로 돌려주면 됨
+    def add_collector(self, fn):
+        self._collectors.append(fn)
+
+    # 현재 스레드의 집계 dict (처음 기록하는 스레드면 새로 만들어 등록)
+    def shard(self):
+        try:
+            return self._local.data
+        except AttributeError:
+            pass
+        data = self._local.data = {}
+        with self._lock:
+            self._shards.append((threading.current_thread(), data))
+            if len(self._shards) >= self._sweep_at:
+                self._sweep()
+                self._sweep_at = max(64, len(self._shards) * 2)
+        return data
+
+    # 끝난 스레드의 값을 _retired로 옮김 (self._lock을 잡은 상태에서 호출)
+    def _sweep(self):
+        alive = []
+        for thread, data in self._shards:
+            if thread.is_alive():
+                alive.append((thread, data))
+            else:
+                _merge(self._retired, data)
+        self._shards = alive
+
+    def snapshot(self):
+        total = {}
+        with self._lock:
+            self._sweep()
+            _merge(total, self._retired)
+            for _, data in self._shards:
+                _merge(total, data)
+        return total
+
+    # Prometheus 텍스트 형식으로 출력
+    def render(self):
+        by_metric = {}
+        for (name, labels), values in self.snapshot().items():
+            by_metric.setdefault(name, []).append((labels, values))
+
+        lines = []
+        for metric in self._metrics:
+            _header(lines, metric.name, metric.kind, metric.help)
+            samples = by_metric.get(metric.name)
+            if not samples and not metric.labelnames:
+                samples = [((), metric.zero())]  # 라벨 없는 지표는 기록이 없어도 0으로 출력
+            for labels, values in sorted(samples or ()):
+                metric.render(lines, labels, values)
+        for collect in self._collectors:
+            for name, kind, help_text, samples in collect():
+                _header(lines, name, kind, help_text)
+                for labels, value in samples:
+                    lines.append('%s%s %s' % (name, _format_labels(labels.items()), _format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+# 다른 스레드가 쓰는 중인 dict도 읽을 수 있도록 항목 목록을 먼저 복사해서 합침
+
+def _merge(into, data):
+    for key, values in list(data.items()):
+        current = into.get(key)
+        if current is None:
+            into[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                current[i] += value
+
+def _header(lines, name, kind, help_text):
+    lines.append('# HELP %s %s' % (name, help_text))
+    lines.append('# TYPE %s %s' % (name, kind))
+
+def _format_labels(pairs):
+    pairs = ['%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+             for key, value in pairs]
+    return '{%s}' % ','.join(pairs) if pairs else ''
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(int(value))
+
+# 누적 카운터 (labels는 labelnames 순서의 값 튜플)
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, registry, name, help_text, labelnames):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+
+    def inc(self, labels=(), amount=1):
+        if not self.registry.enabled:
+            return
+        data = self.registry.shard()
+        key = (self.name, labels)
+        values = data.get(key)
+        if values is None:
+            data[key] = [amount]
+        else:
+            values[0] += amount
+
+    def zero(self):
+        return [0]
+
+    def render(self, lines, labels, values):
+        lines.append('%s%s %s' % (self.name, _format_labels(zip(self.labelnames, labels)), _format_value(values[0])))
+
+# 히스토그램 (값 목록은 버킷별 개수, +Inf 개수, 합계 순서)
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help_text, labelnames, buckets):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, labels=()):
+        if not self.registry.enabled:
+            return
+        data = self.registry.shard()
+        key = (self.name, labels)
+        values = data.get(key)
+        if values is None:
+            values = data[key] = self.zero()
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def zero(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def render(self, lines, labels, values):
+        pairs = list(zip(self.labelnames, labels))
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), values):
+            cumulative += count
+            le = bound if bound == '+Inf' else repr(float(bound))
+            lines.append('%s_bucket%s %d' % (self.name, _format_labels(pairs + [('le', le)]), cumulative))
+        lines.append('%s_sum%s %r' % (self.name, _format_labels(pairs), float(values[-1])))
+        lines.append('%s_count%s %d' % (self.name, _format_labels(pairs), cumulative))
+
+# 서버 전체에서 함께 쓰는 기본 저장소
+registry = Registry()
+
+http_request_seconds = registry.histogram(
+    'http_request_duration_seconds', '엔드포인트별 요청 처리 시간', ('endpoint', 'method'))
+http_requests = registry.counter(
+    'http_requests_total', '엔드포인트/상태 코드별 요청 수', ('endpoint', 'method', 'status'))
+
+# 요청 시작 시각 기록
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+# 응답 직전에 처리 시간과 상태 코드 기록 (스트리밍 응답은 첫 응답을 돌려줄 때까지의 시간)
+
+def _record_request(response):
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        endpoint = request.endpoint or 'unmatched'
+        http_request_seconds.observe(time.perf_counter() - start, (endpoint, request.method))
+        http_requests.inc((endpoint, request.method, str(response.status_code)))
+    return response
+
+def metrics_view():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+def init_app(app):
+    registry.enabled = app.config['METRICS_ENABLED']
+    if not registry.enabled:
+        return
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
@@ -0,0 +1,305 @@
+# migrations.py
+import sqlite3
+import sys
+
+import event_stats
+from config import DEFAULTS
+from db import immediate_transaction, open_connection
+from exports import EXPORT_SQL
+
+# 다른 스키마의 DB(Window 서버 DB는 users.is_admin이 없음)에 Mac 마이그레이션을 적용하지 않도록 먼저 확인
+
+def _check_schema(conn):
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+    if columns and 'is_admin' not in columns:
+        raise RuntimeError('Mac 서버 스키마가 아닌 DB입니다 (users.is_admin 없음). Window DB는 Window/migrations.py로 마이그레이션하세요.')
+
+# 같은 사용자 이름이 여러 개 있으면 UNIQUE 인덱스를 만들 수 없으므로 먼저 확인
+
+def _check_duplicate_usernames(conn):
+    duplicates = conn.execute(
+        'SELECT username FROM users GROUP BY username HAVING COUNT(*) > 1').fetchall()
+    if duplicates:
+        names = ', '.join(row[0] for row in duplicates)
+        raise RuntimeError('중복된 사용자 이름이 있어 마이그레이션할 수 없습니다: %s' % names)
+
+# (버전, 단계 목록) - 단계는 SQL 문자열 또는 conn을 받는 함수
+# PRAGMA user_version보다 높은 버전만 순서대로 적용됨
+MIGRATIONS = [
+    (1, [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL,
+            is_admin INTEGER DEFAULT 0  -- 관리자 여부를 나타내는 컬럼 (0: 일반 사용자, 1: 관리자)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            tickets_left INTEGER NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            event_id INTEGER,
+            FOREIGN KEY(user_id) REFERENCES users(id),
+            FOREIGN KEY(event_id) REFERENCES events(id)
+        )
+        ''',
+    ]),
+    (2, [
+        _check_duplicate_usernames,
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_users_username ON users(username)',
+        'CREATE INDEX IF NOT EXISTS idx_reservations_user ON reservations(user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_reservations_event ON reservations(event_id)',
+        'CREATE INDEX IF NOT EXISTS idx_reservations_user_event ON reservations(user_id, event_id)',
+    ]),
+    (3, [
+        'ALTER TABLE events ADD COLUMN hold_ttl INTEGER',  # 이벤트별 임시 예약 유지 시간 (초, NULL이면 HOLD_DEFAULT_TTL)
+        '''
+        CREATE TABLE IF NOT EXISTS holds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            event_id INTEGER NOT NULL,
+            expires_at REAL NOT NULL,  -- 만료 시각 (unix time)
+            FOREIGN KEY(user_id) REFERENCES users(id),
+            FOREIGN KEY(event_id) REFERENCES events(id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_holds_expires ON holds(expires_at)',
+    ]),
+    (4, [
+        'ALTER TABLE events ADD COLUMN seat_version INTEGER',  # 좌석 배치도가 있는 이벤트만 값이 있음 (seatmaps.py 참고)
+        '''
+        CREATE TABLE IF NOT EXISTS seat_rows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,  -- 등록 순서가 좌석 선호 순서
+            event_id INTEGER NOT NULL,
+            section TEXT NOT NULL,
+            name TEXT NOT NULL,
+            seats INTEGER NOT NULL,
+            taken BLOB NOT NULL,  -- 예약된 좌석 비트 (little-endian, 비트 i = i+1번 좌석)
+            FOREIGN KEY(event_id) REFERENCES events(id)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_seat_rows_event ON seat_rows(event_id)',
+        'ALTER TABLE reservations ADD COLUMN seat_row_id INTEGER REFERENCES seat_rows(id)',
+        'ALTER TABLE reservations ADD COLUMN seat_no INTEGER',
+    ]),
+    (5, [
+        # 예약/취소 트랜잭션마다 1씩 증가 (예약 목록 캐시가 DB와 같은지 확인하는 용도)
+        'ALTER TABLE users ADD COLUMN reservations_version INTEGER NOT NULL DEFAULT 0',
+    ]),
+    (6, [
+        # 예약 시각 (유닉스 시간 초, 내보내기의 시간 범위 조건용)
+        # ADD COLUMN에는 식 기본값을 쓸 수 없으므로 예약을 넣는 쪽에서 채우고, 이전 예약은 NULL로 남음
+        'ALTER TABLE reservations ADD COLUMN created_at REAL',
+    ]),
+    (7, [
+        # 이벤트별 판매 통계 집계 (event_stats.py 참고) - 아래 트리거가 예약/임시 예약과 같은 트랜잭션에서 갱신
+        '''
+        CREATE TABLE IF NOT EXISTS event_stats (
+            event_id INTEGER PRIMARY KEY,
+            sold INTEGER NOT NULL DEFAULT 0,       -- 현재 예약 수
+            cancelled INTEGER NOT NULL DEFAULT 0,  -- 누적 취소 수 (이 마이그레이션 이후부터 셈)
+            buyers INTEGER NOT NULL DEFAULT 0,     -- 예약을 하나 이상 가진 사용자 수
+            held INTEGER NOT NULL DEFAULT 0        -- 아직 확정/해제되지 않은 임시 예약 수
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS event_user_stats (
+            event_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            reserved INTEGER NOT NULL,  -- 0이 되면 행을 지움
+            PRIMARY KEY (event_id, user_id)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_event_user_stats_reserved ON event_user_stats(event_id, reserved)',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_stats_insert AFTER INSERT ON reservations BEGIN
+            INSERT INTO event_stats (event_id, sold, buyers)
+            VALUES (NEW.event_id, 1, NOT EXISTS (SELECT 1 FROM event_user_stats WHERE event_id = NEW.event_id AND user_id = NEW.user_id))
+            ON CONFLICT(event_id) DO UPDATE SET sold = sold + 1, buyers = buyers + excluded.buyers;
+            INSERT INTO event_user_stats (event_id, user_id, reserved) VALUES (NEW.event_id, NEW.user_id, 1)
+            ON CONFLICT(event_id, user_id) DO UPDATE SET reserved = reserved + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_reservations_stats_delete AFTER DELETE ON reservations BEGIN
+            UPDATE event_user_stats SET reserved = reserved - 1 WHERE event_id = OLD.event_id AND user_id = OLD.user_id;
+            UPDATE event_stats SET sold = sold - 1, cancelled = cancelled + 1,
+                buyers = buyers - EXISTS (SELECT 1 FROM event_user_stats WHERE event_id = OLD.event_id AND user_id = OLD.user_id AND reserved <= 0)
+            WHERE event_id = OLD.event_id;
+            DELETE FROM event_user_stats WHERE event_id = OLD.event_id AND user_id = OLD.user_id AND reserved <= 0;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_holds_stats_insert AFTER INSERT ON holds BEGIN
+            INSERT INTO event_stats (event_id, held) VALUES (NEW.event_id, 1)
+            ON CONFLICT(event_id) DO UPDATE SET held = held + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_holds_stats_delete AFTER DELETE ON holds BEGIN
+            UPDATE event_stats SET held = held - 1 WHERE event_id = OLD.event_id;
+        END
+        ''',
+        event_stats.rebuild_counters,
+    ]),
+    (8, [
+        # Idempotency-Key별 처음 응답 (idempotency.py 참고) - status가 NULL이면 처리 중
+        '''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            user_id INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            fingerprint BLOB NOT NULL,  -- 메서드/경로/본문 해시 (16바이트)
+            status INTEGER,
+            body BLOB,                  -- JSON 응답 본문
+            created_at REAL NOT NULL,   -- 처리를 시작한 시각 (유닉스 시간 초, 만료 기준)
+            PRIMARY KEY (user_id, key)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created ON idempotency_keys(created_at)',
+    ]),
+    (9, [
+        # 이벤트 목록 버전 (GET /events?changed_since=) - 이벤트가 생성/수정/삭제될 때마다 트리거가 1씩 올림
+        # catalog_id는 DB마다 다른 값이라 다른 DB에서 받은 버전으로 변경분을 요청하면 전체 목록을 돌려줌
+        '''
+        CREATE TABLE IF NOT EXISTS catalog_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            catalog_id TEXT NOT NULL,
+            version INTEGER NOT NULL
+        )
+        ''',
+        "INSERT OR IGNORE INTO catalog_state (id, catalog_id, version) VALUES (1, lower(hex(randomblob(8))), 1)",
+        # 이벤트가 마지막으로 바뀐 목록 버전 (기존 이벤트는 0 - 버전 1보다 앞이므로 변경분에는 나오지 않음)
+        # 버전을 직접 넣는 INSERT(일괄 가져오기는 묶음마다 버전 하나)는 아래 트리거가 건드리지 않음
+        'ALTER TABLE events ADD COLUMN version INTEGER NOT NULL DEFAULT 0',
+        'CREATE INDEX IF NOT EXISTS idx_events_version ON events(version)',
+        # 삭제된 이벤트 (이벤트 ID는 AUTOINCREMENT라 다시 쓰이지 않음)
+        '''
+        CREATE TABLE IF NOT EXISTS event_tombstones (
+            version INTEGER PRIMARY KEY,
+            event_id INTEGER NOT NULL
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_events_version_insert AFTER INSERT ON events WHEN NEW.version = 0 BEGIN
+            UPDATE catalog_state SET version = version + 1;
+            UPDATE events SET version = (SELECT version FROM catalog_state) WHERE id = NEW.id;
+        END
+        ''',
+        # 목록에 보이는 값(이름, 남은 티켓 수)이 실제로 바뀐 경우만 (좌석 배치도 버전 등은 제외)
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_events_version_update AFTER UPDATE OF name, tickets_left ON events
+        WHEN NEW.name IS NOT OLD.name OR NEW.tickets_left IS NOT OLD.tickets_left BEGIN
+            UPDATE catalog_state SET version = version + 1;
+            UPDATE events SET version = (SELECT version FROM catalog_state) WHERE id = NEW.id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_events_version_delete AFTER DELETE ON events BEGIN
+            UPDATE catalog_state SET version = version + 1;
+            INSERT INTO event_tombstones (version, event_id) SELECT version, OLD.id FROM catalog_state;
+        END
+        ''',
+    ]),
+]
+
+def current_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+# 아직 적용되지 않은 마이그레이션을 버전별 트랜잭션으로 적용하고 최종 버전 반환
+# (여러 워커가 동시에 실행해도 BEGIN IMMEDIATE 안에서 버전을 다시 확인하므로 한 번만 적용됨)
+
+def migrate(conn):
+    _check_schema(conn)
+    for version, steps in MIGRATIONS:
+        if version <= current_version(conn):
+            continue
+        with immediate_transaction(conn):
+            if version <= current_version(conn):
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute('PRAGMA user_version = %d' % version)
+    return current_version(conn)
+
+# 자주 호출되는 쿼리 - 모두 인덱스를 사용해야 함 (전체 테이블 SCAN 금지)
+HOT_QUERIES = {
+    'login': ('SELECT id, password, is_admin FROM users WHERE username = ?', ('x',)),
+    'cancel_reservation': ('DELETE FROM reservations WHERE user_id = ? AND event_id = ? RETURNING id, seat_row_id, seat_no', (1, 1)),
+    'reserve_ticket': ('UPDATE events SET tickets_left = tickets_left - 1 WHERE id = ? AND tickets_left > 0 AND seat_version IS NULL RETURNING name', (1,)),
+    'get_my_reservations': ('''
+        SELECT reservations.id AS reservation_id, events.id, events.name,
+               seat_rows.section, seat_rows.name AS row_name, reservations.seat_no FROM reservations
+        JOIN events ON reservations.event_id = events.id
+        LEFT JOIN seat_rows ON reservations.seat_row_id = seat_rows.id
+        WHERE reservations.user_id = ? AND reservations.id > ?
+        ORDER BY reservations.id LIMIT ?
+    ''', (1, 0, 100)),
+    'reap_holds': ('SELECT id FROM holds WHERE expires_at <= ? ORDER BY expires_at LIMIT ?', (0, 100)),
+    'load_seat_rows': ('SELECT id, section, name, seats, taken FROM seat_rows WHERE event_id = ? ORDER BY id', (1,)),
+    'active_holds': ('SELECT COUNT(*) FROM holds WHERE expires_at > ?', (0,)),
+    'get_event_reservations': ('''
+        SELECT reservations.id AS reservation_id, users.id, users.username FROM reservations
+        JOIN users ON reservations.user_id = users.id
+        WHERE reservations.event_id = ? AND reservations.id > ?
+        ORDER BY reservations.id LIMIT ?
+    ''', (1, 0, 100)),
+    'export_event_reservations': (EXPORT_SQL + ' AND reservations.created_at >= ? ORDER BY reservations.id', (1, 0, 0)),
+    'catalog_changes': ('SELECT id, name, tickets_left FROM events WHERE version > ? ORDER BY version', (1,)),
+    'idempotency_lookup': ('SELECT fingerprint, status, body, created_at FROM idempotency_keys WHERE user_id = ? AND key = ?', (1, 'x')),
+    'idempotency_purge': ('''
+        DELETE FROM idempotency_keys WHERE (user_id, key) IN
+            (SELECT user_id, key FROM idempotency_keys WHERE created_at <= ? ORDER BY created_at LIMIT ?)
+    ''', (0, 1000)),
+}
+
+# 전체 스캔, 임시 정렬, 기본 키 범위만으로 훑는 경우를 문제로 봄
+
+def _is_full_scan(detail):
+    return detail.startswith('SCAN') or 'TEMP B-TREE' in detail or '(rowid>?)' in detail
+
+# EXPLAIN QUERY PLAN 결과에서 인덱스를 쓰지 않는 쿼리를 찾아 ({이름: [계획]}, [없는 테이블/컬럼 때문에 건너뛴 이름]) 반환
+
+def check_query_plans(conn):
+    problems = {}
+    skipped = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        try:
+            plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        except sqlite3.OperationalError:
+            skipped.append(name)
+            continue
+        if any(_is_full_scan(detail) for detail in plan):
+            problems[name] = plan
+    return problems, skipped
+
+# python migrations.py [DB 경로] : 마이그레이션 적용 후 쿼리 계획 점검
+if __name__ == '__main__':
+    config = dict(DEFAULTS)
+    if len(sys.argv) > 1:
+        config['DATABASE'] = sys.argv[1]
+    conn = open_connection(config)
+    try:
+        before = current_version(conn)
+        after = migrate(conn)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(2)
+    print('schema version: %d -> %d' % (before, after))
+    problems, skipped = check_query_plans(conn)
+    for name, plan in problems.items():
+        print('%s: %s' % (name, ' / '.join(plan)))
+    for name in skipped:
+        print('%s: 건너뜀 (없는 테이블/컬럼)' % name)
+    conn.close()
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,86 @@
+# pagination.py
+from itertools import islice
+
+from flask import Response, current_app, jsonify, request, stream_with_context
+
+import compression
+from fast_json import RowEncoder
+
+STREAM_BATCH_SIZE = 500
+
+# limit / after_id 쿼리 파라미터 해석
+# limit이 없으면 None을 돌려주며, 이 경우 목록 전체를 스트리밍으로 내보냄
+
+def page_args():
+    limit = request.args.get('limit', type=int)
+    after_id = request.args.get('after_id', default=0, type=int)
+    if limit is not None:
+        limit = max(1, min(limit, current_app.config['PAGE_MAX_LIMIT']))
+    return limit, after_id
+
+# SQL의 LIMIT ? 자리에 넣을 값 (SQLite에서 -1은 제한 없음)
+
+def sql_limit(limit):
+    return -1 if limit is None else limit
+
+# 행 목록(SQLite 커서 또는 저장소가 돌려준 iterable)을 한 페이지(JSON) 또는 전체 스트리밍 응답으로 변환
+# 행은 반드시 키 컬럼 오름차순으로 정렬되어 있어야 함
+# to_dict가 RowEncoder면 (JSON_FAST_ENABLED일 때) 행마다 dict를 거치지 않고 바로 인코딩
+
+def list_response(key, rows, to_dict, limit, cursor_key='id'):
+    if limit is None:
+        return stream_response(key, rows, to_dict)
+
+    if not uses_row_encoder(to_dict):
+        items = [to_dict(row) for row in rows]
+        next_after_id = items[-1][cursor_key] if len(items) == limit else None
+        return jsonify({key: items, 'next_after_id': next_after_id}), 200
+
+    rows = list(rows)
+    next_after_id = rows[-1][cursor_key] if len(rows) == limit else None
+    body = '{%s:[%s],"next_after_id":%s}\n' % (current_app.json.dumps(key), to_dict.encode(rows), current_app.json.dumps(next_after_id))
+    return Response(body, status=200, mimetype='application/json')
+
+# {key: [행...]} 본문 전체 (목록 캐시처럼 본문을 미리 만들어 둘 때 사용), fields가 있으면 목록 앞에 같이 넣음
+
+def list_body(key, rows, to_dict, fields=None):
+    dumps = current_app.json.dumps
+    if not uses_row_encoder(to_dict):
+        return dumps(dict(fields or {}, **{key: [to_dict(row) for row in rows]})) + '\n'
+    head = dumps(fields)[1:-1] + ',' if fields else ''
+    return '{%s%s:[%s]}\n' % (head, dumps(key), to_dict.encode(list(rows)))
+
+def uses_row_encoder(to_dict):
+    return isinstance(to_dict, RowEncoder) and current_app.config['JSON_FAST_ENABLED']
+
+# STREAM_BATCH_SIZE개씩 읽어 JSON 배열을 조각조각 내보내는 응답 (커서면 전체 행을 메모리에 올리지 않음)
+# 첫 묶음에서 목록이 끝나면 한 번에 보내고 (크기에 따라 compression이 압축),
+# 그보다 길면 협상한 인코딩으로 스트림 자체를 압축
+
+def stream_response(key, rows, to_dict):
+    dumps = current_app.json.dumps
+    if uses_row_encoder(to_dict):
+        encode = to_dict.encode
+    else:
+        encode = lambda batch: ','.join(dumps(to_dict(row)) for row in batch)
+    rows = iter(rows)
+    first = list(islice(rows, STREAM_BATCH_SIZE))
+    head = '{%s:[%s' % (dumps(key), encode(first))
+    if len(first) < STREAM_BATCH_SIZE:
+        return Response(head + ']}\n', status=200, mimetype='application/json')
+
+    def generate():
+        yield head
+        while True:
+            batch = list(islice(rows, STREAM_BATCH_SIZE))
+            if not batch:
+                break
+            yield ',' + encode(batch)
+        yield ']}\n'
+
+    chunks = stream_with_context(generate())
+    encoding = compression.choose_encoding()
+    if encoding is None:
+        return Response(chunks, status=200, mimetype='application/json', headers={'Vary': 'Accept-Encoding'})
+    return Response(compression.compress_chunks(chunks, encoding, current_app.config['COMPRESS_LEVEL']), status=200,
+                    mimetype='application/json', headers={'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'})
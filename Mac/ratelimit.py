@@ -0,0 +1,203 @@
+# ratelimit.py
+# 요청 속도 제한 (토큰 버킷)
+# - 규칙 이름별로 [요청 수, 초]: 버킷 용량이 요청 수이고 초당 요청 수/초 만큼 다시 채워짐
+#   (처음이나 오래 쉰 뒤에는 요청 수만큼 한꺼번에 보낼 수 있고, 그 뒤로는 평균 속도로 제한)
+# - 키는 '규칙:user:<id>' 또는 '규칙:ip:<주소>'
+# - 거절된 요청은 토큰을 쓰지 않으므로 계속 보내도 기다리는 시간이 늘어나지는 않음
+#
+# 백엔드 (RATE_LIMIT_BACKEND)
+#   local  : 워커 메모리의 dict (워커마다 따로 세므로 실제 한도는 대략 한도 x 워커 수)
+#   sqlite : 모든 워커가 같은 SQLite 파일(RATE_LIMIT_DATABASE)의 버킷을 UPSERT 한 문장으로 갱신
+#            요청마다 작은 쓰기 트랜잭션이 생기므로 예약 DB와 쓰기 락을 나누지 않도록 별도 파일을 씀
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+from db import open_connection
+
+limited_requests = metrics.registry.counter('rate_limit_requests_total', '속도 제한 검사 결과별 요청 수', ('rule', 'result'))
+check_seconds = metrics.registry.histogram('rate_limit_check_seconds', '속도 제한 검사에 걸린 시간', ('backend',))
+
+# 토큰 버킷 규칙 하나
+
+class Rule:
+    __slots__ = ('name', 'capacity', 'rate')
+
+    def __init__(self, name, requests, seconds):
+        self.name = name
+        self.capacity = float(requests)
+        self.rate = requests / seconds   # 초당 채워지는 토큰 수
+
+    # 버킷이 가득 찰 때까지 걸리는 시간 (이보다 오래 안 쓴 키는 지워도 결과가 같음)
+    def idle_after(self):
+        return self.capacity / self.rate
+
+# 설정({이름: [요청 수, 초]}) -> {이름: Rule}, 요청 수나 초가 0 이하인 규칙은 끔
+
+def parse_rules(limits):
+    rules = {}
+    for name, (requests, seconds) in limits.items():
+        if requests > 0 and seconds > 0:
+            rules[name] = Rule(name, requests, seconds)
+    return rules
+
+# 버킷 갱신: (남은 토큰, 마지막 갱신 시각)과 현재 시각 -> (허용 여부, 새 토큰 수)
+
+def take(rule, tokens, updated_at, now):
+    tokens = min(rule.capacity, tokens + max(0.0, now - updated_at) * rule.rate)
+    if tokens >= 1:
+        return True, tokens - 1
+    return False, tokens
+
+# 거절됐을 때 토큰 하나가 찰 때까지 기다릴 시간 (초, Retry-After는 올림)
+
+def retry_after(rule, tokens):
+    return max(1, math.ceil((1 - tokens) / rule.rate))
+
+class RateLimiter:
+    backend = None
+
+    def __init__(self, rules):
+        self.rules = rules
+
+    # (허용 여부, Retry-After 초) - 없는 규칙이면 항상 허용
+    def check(self, rule_name, key):
+        rule = self.rules.get(rule_name)
+        if rule is None:
+            return True, 0
+        start = time.perf_counter()
+        allowed, tokens = self._take(rule, '%s:%s' % (rule_name, key), time.time())
+        check_seconds.observe(time.perf_counter() - start, (self.backend,))
+        limited_requests.inc((rule_name, 'allowed' if allowed else 'limited'))
+        return allowed, 0 if allowed else retry_after(rule, tokens)
+
+    def _take(self, rule, key, now):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+# 워커 메모리 백엔드
+# 키 -> [토큰, 갱신 시각]을 최근 사용 순서로 두고, 버킷이 가득 찰 만큼 쉰 키는 앞에서부터 지움
+# (max_keys를 넘으면 오래 안 쓴 키부터 지움 - 그 키는 다음 요청 때 가득 찬 버킷으로 다시 시작)
+
+class LocalRateLimiter(RateLimiter):
+    backend = 'local'
+
+    def __init__(self, rules, max_keys):
+        super().__init__(rules)
+        self.max_keys = max_keys
+        self.idle_after = max((rule.idle_after() for rule in rules.values()), default=0)
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+        self.evictions = 0
+
+    def _take(self, rule, key, now):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [rule.capacity, now]
+            else:
+                self._buckets.move_to_end(key)
+            allowed, bucket[0] = take(rule, bucket[0], bucket[1], now)
+            bucket[1] = now
+            self._evict(now)
+            return allowed, bucket[0]
+
+    def _evict(self, now):
+        buckets = self._buckets
+        while buckets:
+            key, bucket = next(iter(buckets.items()))
+            if len(buckets) <= self.max_keys and now - bucket[1] < self.idle_after:
+                break
+            del buckets[key]
+            self.evictions += 1
+
+    def stats(self):
+        return {'keys': len(self._buckets), 'evictions': self.evictions}
+
+# SQLite 공유 백엔드
+# MIN/MAX 계산을 UPSERT 안에서 해서 여러 워커가 동시에 써도 버킷 갱신이 한 문장으로 끝남
+# (SET의 식은 모두 갱신 전 값을 보므로 allowed와 tokens가 같은 채운 값을 기준으로 계산됨)
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS rate_limits (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        allowed INTEGER NOT NULL   -- 마지막 요청 허용 여부
+    ) WITHOUT ROWID
+'''
+
+TAKE_SQL = '''
+    INSERT INTO rate_limits (key, tokens, updated_at, allowed) VALUES (:key, :capacity - 1, :now, 1)
+    ON CONFLICT(key) DO UPDATE SET
+        allowed = MIN(:capacity, tokens + MAX(0, :now - updated_at) * :rate) >= 1,
+        tokens = MIN(:capacity, tokens + MAX(0, :now - updated_at) * :rate)
+                 - (MIN(:capacity, tokens + MAX(0, :now - updated_at) * :rate) >= 1),
+        updated_at = MAX(updated_at, :now)
+    RETURNING allowed, tokens
+'''
+
+class SqliteRateLimiter(RateLimiter):
+    backend = 'sqlite'
+
+    def __init__(self, rules, config, path, purge_interval=60):
+        super().__init__(rules)
+        self.config = dict(config, DATABASE=path)
+        self.idle_after = max((rule.idle_after() for rule in rules.values()), default=0)
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._purge_lock = threading.Lock()
+        self._purge_at = time.time() + purge_interval
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute(SCHEMA)
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_rate_limits_updated ON rate_limits(updated_at)')
+        conn.commit()
+
+    # 스레드별 연결 (fork 뒤에는 부모 프로세스의 연결을 쓰지 않음)
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._local.conn = open_connection(self.config)
+            self._local.pid = os.getpid()
+        return conn
+
+    def _take(self, rule, key, now):
+        conn = self._connect()
+        try:
+            row = conn.execute(TAKE_SQL, {'key': key, 'capacity': rule.capacity, 'rate': rule.rate, 'now': now}).fetchone()
+            conn.commit()
+        except sqlite3.OperationalError:
+            conn.rollback()
+            return True, 0   # 제한 DB가 잠겨 있으면 요청을 막지 않음
+        if now >= self._purge_at:
+            self._purge(conn, now)
+        return bool(row['allowed']), row['tokens']
+
+    # 버킷이 가득 찰 만큼 쉰 키를 purge_interval마다 지움 (updated_at 인덱스 사용)
+    def _purge(self, conn, now):
+        with self._purge_lock:
+            if now < self._purge_at:
+                return
+            self._purge_at = now + self.purge_interval
+        conn.execute('DELETE FROM rate_limits WHERE updated_at < ?', (now - self.idle_after,))
+        conn.commit()
+
+# 설정에 맞는 제한기 (RATE_LIMIT_ENABLED가 꺼져 있거나 규칙이 없으면 None)
+
+def create_limiter(config):
+    rules = parse_rules(config['RATE_LIMITS'])
+    if not config['RATE_LIMIT_ENABLED'] or not rules:
+        return None
+    backend = config['RATE_LIMIT_BACKEND']
+    if backend == 'local':
+        return LocalRateLimiter(rules, config['RATE_LIMIT_MAX_KEYS'])
+    if backend == 'sqlite':
+        return SqliteRateLimiter(rules, config, config['RATE_LIMIT_DATABASE'] or config['DATABASE'] + '-ratelimit')
+    raise ValueError('알 수 없는 RATE_LIMIT_BACKEND: %s' % backend)
@@ -0,0 +1,129 @@
+# reservation_cache.py
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+# 사용자 한 명의 예약 목록 (reservation_id 오름차순)
+
+class _Entry:
+    __slots__ = ('version', 'ids', 'items', 'loaded_at')
+
+    def __init__(self, version, items):
+        self.version = version
+        self.items = list(items)
+        self.ids = [item['reservation_id'] for item in self.items]
+        self.loaded_at = time.monotonic()
+
+    def event_ids(self):
+        return {item['event_id'] for item in self.items}
+
+# GET /my_reservations용 사용자별 예약 목록 캐시 (LRU)
+# - users.reservations_version은 사용자의 예약이 바뀌는 트랜잭션마다 1씩 증가하므로,
+#   조회 시 DB 버전과 같으면 캐시를 그대로 쓰고 다르면(다른 워커의 변경 등) 다시 읽음
+# - 이 워커의 예약/취소는 트랜잭션이 돌려준 버전이 캐시 버전 + 1일 때만 목록을 제자리에서 고침
+#   (그 사이에 다른 변경이 있었으면 항목을 버림)
+# - 이벤트 이름 변경/삭제는 예약 버전을 바꾸지 않으므로 이 워커에서는 바로 폐기하고,
+#   다른 워커의 캐시에는 ttl이 지나면 반영됨
+# - max_items: 모든 사용자 항목 수 합계 상한 (넘으면 오래 안 쓴 사용자부터 제거)
+#   max_per_user보다 예약이 많은 사용자는 캐시하지 않음
+
+class ReservationCache:
+    def __init__(self, ttl, max_items, max_per_user):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_per_user = max_per_user
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # user_id -> _Entry
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.updates = 0
+        self.evictions = 0
+
+    # DB 버전과 같고 ttl 안에 읽은 목록이면 반환, 아니면 None
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.version != version or time.monotonic() - entry.loaded_at >= self.ttl:
+                self.stale += 1
+                self._remove(user_id)
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry.items
+
+    # DB에서 읽은 목록 저장 (version은 목록보다 먼저 읽은 값이어야 함)
+    def store(self, user_id, version, items):
+        if len(items) > self.max_per_user or len(items) > self.max_items:
+            return
+        with self._lock:
+            self._remove(user_id)
+            self._entries[user_id] = _Entry(version, items)
+            self._size += len(items)
+            self._evict()
+
+    # 이 워커에서 커밋한 예약/취소 반영 (change: reservations.ReservationChange)
+    def apply(self, change):
+        with self._lock:
+            entry = self._entries.get(change.user_id)
+            if entry is None:
+                return
+            if change.added is None or entry.version != change.version - 1:
+                self._remove(change.user_id)
+                return
+            for item in change.added:
+                position = bisect.bisect_left(entry.ids, item['reservation_id'])
+                if position == len(entry.ids) or entry.ids[position] != item['reservation_id']:
+                    entry.ids.insert(position, item['reservation_id'])
+                    entry.items.insert(position, item)
+                    self._size += 1
+            for reservation_id in change.removed:
+                position = bisect.bisect_left(entry.ids, reservation_id)
+                if position < len(entry.ids) and entry.ids[position] == reservation_id:
+                    del entry.ids[position]
+                    del entry.items[position]
+                    self._size -= 1
+            entry.version = change.version
+            self.updates += 1
+            if len(entry.items) > self.max_per_user:
+                self._remove(change.user_id)
+            self._evict()
+
+    # 이벤트 이름 변경/삭제 시 그 이벤트 예약이 있는 사용자 항목 폐기
+    def invalidate_event(self, event_id):
+        with self._lock:
+            for user_id in [user_id for user_id, entry in self._entries.items() if event_id in entry.event_ids()]:
+                self._remove(user_id)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._remove(user_id)
+
+    # 합계 상한을 넘으면 가장 오래 안 쓴 사용자부터 제거
+    def _evict(self):
+        while self._size > self.max_items:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= len(entry.items)
+            self.evictions += 1
+
+    def _remove(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._size -= len(entry.items)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'updates': self.updates,
+                'evictions': self.evictions,
+                'users': len(self._entries),
+                'items': self._size,
+            }
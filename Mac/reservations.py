@@ -0,0 +1,172 @@
+# reservations.py
+import threading
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+
+import metrics
+import seatmaps
+from db import immediate_transaction
+
+lock_wait_seconds = metrics.registry.histogram(
+    'reserve_lock_wait_seconds', '예약 락 스트라이프를 얻기까지 기다린 시간')
+
+# 이벤트 ID별로 잠금을 나눠 갖는 락 스트라이프
+# 같은 프로세스 안에서 같은 이벤트 예약만 줄 세우고, 다른 이벤트는 병렬로 진행됨
+# (정합성은 조건부 UPDATE가 보장하므로 여기서는 SQLite 바쁜 대기만 줄이는 용도)
+
+class StripedLock:
+    def __init__(self, stripes):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def for_key(self, key):
+        if not self._locks:
+            return nullcontext()
+        return _TimedLock(self._locks[hash(key) % len(self._locks)])
+
+# 락을 얻기까지 기다린 시간을 기록하는 래퍼 (바로 얻으면 0으로 기록)
+
+class _TimedLock:
+    __slots__ = ('lock',)
+
+    def __init__(self, lock):
+        self.lock = lock
+
+    def __enter__(self):
+        if self.lock.acquire(blocking=False):
+            lock_wait_seconds.observe(0.0)
+        else:
+            start = time.perf_counter()
+            self.lock.acquire()
+            lock_wait_seconds.observe(time.perf_counter() - start)
+        return self.lock
+
+    def __exit__(self, *exc_info):
+        self.lock.release()
+
+# 커밋된 예약 변경 내용 (예약 목록 캐시를 제자리에서 고치는 데 사용)
+# version: 이 트랜잭션이 올린 users.reservations_version, added: 추가된 목록 항목, removed: 삭제된 reservation_id
+ReservationChange = namedtuple('ReservationChange', 'user_id version added removed')
+
+# GET /my_reservations 목록 항목
+
+def reservation_item(reservation_id, event_id, event_name, seat=None):
+    item = {'reservation_id': reservation_id, 'event_id': event_id, 'event_name': event_name}
+    if seat is not None:
+        item['seat'] = seat
+    return item
+
+# 사용자의 예약이 바뀌는 모든 트랜잭션에서 호출 (예약 목록 캐시가 다른 워커의 변경을 알아채는 기준)
+
+def touch_user(conn, user_id):
+    row = conn.execute('UPDATE users SET reservations_version = reservations_version + 1 WHERE id = ? '
+                       'RETURNING reservations_version', (user_id,)).fetchone()
+    return row[0] if row else None
+
+# 티켓 한 장 예약 (남은 티켓이 있을 때만 차감되는 단일 조건부 UPDATE), 성공하면 ReservationChange
+# 좌석 지정 이벤트(seat_version이 있는 이벤트)는 좌석 예약으로만 예약할 수 있으므로 여기서는 실패
+# apply_* 함수는 이미 열린 트랜잭션 안에서 호출해야 함
+
+def apply_reserve(conn, user_id, event_id):
+    row = conn.execute(
+        'UPDATE events SET tickets_left = tickets_left - 1 WHERE id = ? AND tickets_left > 0 AND seat_version IS NULL '
+        'RETURNING name',
+        (event_id,)).fetchone()
+    if row is None:
+        return None
+    cursor = conn.execute('INSERT INTO reservations (user_id, event_id, created_at) VALUES (?, ?, ?)',
+                          (user_id, event_id, time.time()))
+    return ReservationChange(user_id, touch_user(conn, user_id),
+                             [reservation_item(cursor.lastrowid, event_id, row['name'])], [])
+
+# 사용자의 해당 이벤트 예약을 취소하고 취소한 수만큼 티켓 복구 (좌석 예약이면 좌석도 비움)
+# 취소한 예약이 있으면 ReservationChange, 없으면 None
+
+def apply_cancel(conn, user_id, event_id):
+    rows = conn.execute('DELETE FROM reservations WHERE user_id = ? AND event_id = ? RETURNING id, seat_row_id, seat_no',
+                        (user_id, event_id)).fetchall()
+    if not rows:
+        return None
+    conn.execute('UPDATE events SET tickets_left = tickets_left + ? WHERE id = ?', (len(rows), event_id))
+    _release_seats(conn, event_id, rows)
+    return ReservationChange(user_id, touch_user(conn, user_id), [], [row['id'] for row in rows])
+
+def _release_seats(conn, event_id, rows):
+    seats = [(row['seat_row_id'], row['seat_no']) for row in rows if row['seat_row_id'] is not None]
+    if seats:
+        seatmaps.apply_release_seats(conn, event_id, seats)
+
+def reserve(conn, user_id, event_id):
+    with immediate_transaction(conn):
+        return apply_reserve(conn, user_id, event_id)
+
+def cancel(conn, user_id, event_id):
+    with immediate_transaction(conn):
+        return apply_cancel(conn, user_id, event_id)
+
+# 연속 좌석 예약, 성공하면 ReservationChange (added 항목마다 seat 정보가 있음), 빈 묶음이 없으면 None
+
+def reserve_seats(conn, user_id, event_id, quantity, section=None):
+    with immediate_transaction(conn):
+        seats = seatmaps.apply_reserve_seats(conn, user_id, event_id, quantity, section)
+        if seats is None:
+            return None
+        name = conn.execute('SELECT name FROM events WHERE id = ?', (event_id,)).fetchone()['name']
+        added = [reservation_item(reservation_id, event_id, name, {'section': section_name, 'row': row_name, 'seat': seat_no})
+                 for reservation_id, section_name, row_name, seat_no in seats]
+        return ReservationChange(user_id, touch_user(conn, user_id), added, [])
+
+# 일괄 예약/취소 중 하나라도 실패하면 트랜잭션 전체를 되돌리기 위한 예외
+
+class BatchRejected(Exception):
+    def __init__(self, results):
+        super().__init__('batch rejected')
+        self.results = results
+
+# 여러 이벤트의 여러 장을 한 트랜잭션에서 전부 예약 (all-or-nothing)
+# items: [(event_id, quantity), ...]
+
+def reserve_many(conn, user_id, items):
+    results = []
+    rows = []
+    now = time.time()
+    try:
+        with immediate_transaction(conn):
+            for event_id, quantity in items:
+                cursor = conn.execute(
+                    'UPDATE events SET tickets_left = tickets_left - ? WHERE id = ? AND tickets_left >= ? AND seat_version IS NULL',
+                    (quantity, event_id, quantity))
+                ok = cursor.rowcount == 1
+                results.append({'event_id': event_id, 'quantity': quantity, 'ok': ok})
+                rows.extend([(user_id, event_id, now)] * quantity)
+            if not all(result['ok'] for result in results):
+                raise BatchRejected(results)
+            conn.executemany('INSERT INTO reservations (user_id, event_id, created_at) VALUES (?, ?, ?)', rows)
+            touch_user(conn, user_id)
+    except BatchRejected as e:
+        return False, e.results
+    return True, results
+
+# 여러 이벤트의 예약을 지정한 수량만큼 한 트랜잭션에서 전부 취소 (all-or-nothing)
+
+def cancel_many(conn, user_id, items):
+    results = []
+    try:
+        with immediate_transaction(conn):
+            for event_id, quantity in items:
+                rows = conn.execute('''
+                    DELETE FROM reservations WHERE id IN (
+                        SELECT id FROM reservations WHERE user_id = ? AND event_id = ?
+                        ORDER BY id DESC LIMIT ?
+                    ) RETURNING seat_row_id, seat_no
+                ''', (user_id, event_id, quantity)).fetchall()
+                results.append({'event_id': event_id, 'quantity': quantity, 'ok': len(rows) == quantity})
+                _release_seats(conn, event_id, rows)
+            if not all(result['ok'] for result in results):
+                raise BatchRejected(results)
+            conn.executemany('UPDATE events SET tickets_left = tickets_left + ? WHERE id = ?',
+                             [(quantity, event_id) for event_id, quantity in items])
+            touch_user(conn, user_id)
+    except BatchRejected as e:
+        return False, e.results
+    return True, results
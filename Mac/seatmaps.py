@@ -0,0 +1,263 @@
+# seatmaps.py
+import random
+import time
+
+import metrics
+
+allocation_seconds = metrics.registry.histogram(
+    'seat_allocation_seconds', '좌석 인덱스에서 연속 좌석 묶음을 찾는 데 걸린 시간 (DB 시간 제외)',
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005))
+index_loads = metrics.registry.counter('seat_index_loads_total', 'DB에서 좌석 인덱스를 다시 만든 횟수')
+
+# 좌석 배치도 (구역 -> 열 -> 좌석)
+# - 열마다 seat_rows 한 행에 예약된 좌석을 비트로 저장 (taken BLOB, little-endian, 비트 i = i+1번 좌석)
+# - 열 순서(seat_rows.id)가 곧 선호 순서: 관리자가 좋은 구역/앞 열부터 등록
+# - events.seat_version은 좌석이 바뀔 때마다 새 난수로 바뀌며,
+#   프로세스별 메모리 인덱스가 DB와 같은 상태인지 확인하는 데 씀 (다른 워커가 바꿨거나 롤백됐으면 다시 읽음)
+# - 좌석 변경은 모두 BEGIN IMMEDIATE 트랜잭션 안에서 하므로 인덱스를 동시에 고치는 스레드는 없음
+
+# 배치도에 없는 구역을 지정한 경우 (빈 좌석이 없는 것과 구분해 400으로 응답하기 위함)
+
+class UnknownSection(Exception):
+    pass
+
+# 열의 빈 좌석 중 quantity개가 연속으로 비어 있는 시작 위치들을 비트로 반환
+# (비트 j가 켜져 있으면 j..j+quantity-1번 비트가 모두 빈 좌석)
+
+def _block_starts(free, quantity):
+    starts = free
+    span = 1
+    while span < quantity:
+        step = min(span, quantity - span)
+        starts &= starts >> step
+        span += step
+    return starts
+
+# 가장 긴 연속 빈 좌석 수
+
+def _longest_run(free):
+    run = 0
+    while free:
+        free &= free >> 1
+        run += 1
+    return run
+
+# 이벤트 하나의 좌석 인덱스
+# 열별 비트(int)와 열별 최장 연속 빈 좌석 수를 max 세그먼트 트리로 들고 있어서
+# "quantity석 이상 연속으로 빈 첫 번째 열"을 O(log 열 수)로 찾음
+
+class SeatIndex:
+    def __init__(self, version, rows):
+        self.version = version
+        self.row_ids = []
+        self.names = []
+        self.seats = []
+        self.taken = []
+        self.sections = {}      # 구역 이름 -> (첫 열 위치, 마지막 열 위치 + 1)
+        self.positions = {}     # seat_rows.id -> 열 위치
+        for row_id, section, name, seats, taken in rows:
+            lo, _ = self.sections.get(section, (len(self.row_ids), 0))
+            self.sections[section] = (lo, len(self.row_ids) + 1)
+            self.positions[row_id] = len(self.row_ids)
+            self.row_ids.append(row_id)
+            self.names.append((section, name))
+            self.seats.append(seats)
+            self.taken.append(int.from_bytes(taken, 'little'))
+        self.size = 1
+        while self.size < len(self.row_ids):
+            self.size *= 2
+        self.tree = [0] * (2 * self.size)
+        for position in range(len(self.row_ids)):
+            self.tree[self.size + position] = _longest_run(self.free(position))
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def free(self, position):
+        return ~self.taken[position] & ((1 << self.seats[position]) - 1)
+
+    def available(self, position):
+        return self.seats[position] - self.taken[position].bit_count()
+
+    # 최선의 연속 좌석 위치 (열 위치, 시작 비트) 또는 None
+    # 선호 순서상 가장 앞선 열에서, 열 가운데에 가장 가까운 묶음을 고름 (없는 구역이면 UnknownSection)
+    def find(self, quantity, section=None):
+        if section is None:
+            lo, hi = 0, len(self.row_ids)
+        elif section in self.sections:
+            lo, hi = self.sections[section]
+        else:
+            raise UnknownSection(section)
+        position = self._first(1, 0, self.size, lo, hi, quantity)
+        if position is None:
+            return None
+        starts = _block_starts(self.free(position), quantity)
+        center = (self.seats[position] - quantity) // 2
+        right = starts >> center
+        left = starts & ((1 << (center + 1)) - 1)
+        candidates = []
+        if right:
+            candidates.append(center + (right & -right).bit_length() - 1)
+        if left:
+            candidates.append(left.bit_length() - 1)
+        return position, min(candidates, key=lambda start: abs(2 * start + quantity - self.seats[position]))
+
+    def _first(self, node, node_lo, node_hi, lo, hi, quantity):
+        if node_hi <= lo or hi <= node_lo or self.tree[node] < quantity:
+            return None
+        if node_hi - node_lo == 1:
+            return node_lo
+        mid = (node_lo + node_hi) // 2
+        found = self._first(2 * node, node_lo, mid, lo, hi, quantity)
+        if found is None:
+            found = self._first(2 * node + 1, mid, node_hi, lo, hi, quantity)
+        return found
+
+    def set_taken(self, position, taken):
+        self.taken[position] = taken
+        node = self.size + position
+        self.tree[node] = _longest_run(self.free(position))
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def row_bytes(self, position):
+        return self.taken[position].to_bytes((self.seats[position] + 7) // 8, 'little')
+
+# 프로세스별 인덱스 캐시 {event_id: SeatIndex}
+_indexes = {}
+
+def _new_version():
+    return random.getrandbits(62)
+
+# 트랜잭션 안에서 이벤트의 좌석 인덱스를 가져옴 (DB와 버전이 다르면 다시 읽음), 좌석 지정 이벤트가 아니면 None
+
+def _current_index(conn, event_id):
+    row = conn.execute('SELECT seat_version FROM events WHERE id = ?', (event_id,)).fetchone()
+    if row is None or row['seat_version'] is None:
+        _indexes.pop(event_id, None)
+        return None
+    index = _indexes.get(event_id)
+    if index is None or index.version != row['seat_version']:
+        rows = conn.execute('SELECT id, section, name, seats, taken FROM seat_rows WHERE event_id = ? ORDER BY id',
+                            (event_id,)).fetchall()
+        index = _indexes[event_id] = SeatIndex(row['seat_version'], rows)
+        index_loads.inc()
+    return index
+
+# 바뀐 열을 저장하고 버전을 새로 발급 (트랜잭션이 롤백되면 DB 버전이 그대로라 다음에 인덱스를 다시 읽음)
+
+def _save_rows(conn, event_id, index, positions, tickets_delta):
+    conn.executemany('UPDATE seat_rows SET taken = ? WHERE id = ?',
+                     [(index.row_bytes(position), index.row_ids[position]) for position in positions])
+    index.version = _new_version()
+    conn.execute('UPDATE events SET seat_version = ?, tickets_left = tickets_left + ? WHERE id = ?',
+                 (index.version, tickets_delta, event_id))
+
+def is_seated(conn, event_id):
+    row = conn.execute('SELECT seat_version FROM events WHERE id = ?', (event_id,)).fetchone()
+    return row is not None and row['seat_version'] is not None
+
+# 배치도 요청 본문을 [(구역, 열 이름, 좌석 수), ...] 로 변환, 형식이 잘못되면 None
+# {"sections": [{"name": "A", "rows": [30, 30, {"name": "AA", "seats": 28}]}]}
+# (열을 숫자로만 주면 1, 2, 3... 순서로 이름을 붙임)
+
+def parse_layout(data, max_seats):
+    sections = (data or {}).get('sections')
+    if not isinstance(sections, list) or not sections:
+        return None
+    layout = []
+    names = set()
+    for section in sections:
+        if not isinstance(section, dict) or not isinstance(section.get('name'), str) or section['name'] in names:
+            return None
+        names.add(section['name'])
+        rows = section.get('rows')
+        if not isinstance(rows, list) or not rows:
+            return None
+        for number, row in enumerate(rows, 1):
+            if isinstance(row, dict):
+                name, seats = row.get('name'), row.get('seats')
+            else:
+                name, seats = str(number), row
+            if not isinstance(name, str) or type(seats) is not int or seats <= 0:
+                return None
+            layout.append((section['name'], name, seats))
+    if sum(seats for _, _, seats in layout) > max_seats:
+        return None
+    return layout
+
+# 이벤트의 배치도를 새로 만들고 남은 티켓 수를 전체 좌석 수로 맞춤
+# 예약/임시 예약이 하나라도 있으면 바꿀 수 없음 (False 반환)
+
+def replace_seat_map(conn, event_id, layout):
+    if conn.execute('SELECT 1 FROM reservations WHERE event_id = ? LIMIT 1', (event_id,)).fetchone() or \
+            conn.execute('SELECT 1 FROM holds WHERE event_id = ? LIMIT 1', (event_id,)).fetchone():
+        return False
+    conn.execute('DELETE FROM seat_rows WHERE event_id = ?', (event_id,))
+    conn.executemany('INSERT INTO seat_rows (event_id, section, name, seats, taken) VALUES (?, ?, ?, ?, ?)',
+                     [(event_id, section, name, seats, bytes((seats + 7) // 8)) for section, name, seats in layout])
+    conn.execute('UPDATE events SET tickets_left = ?, seat_version = ? WHERE id = ?',
+                 (sum(seats for _, _, seats in layout), _new_version(), event_id))
+    _indexes.pop(event_id, None)
+    return True
+
+def delete_seat_map(conn, event_id):
+    conn.execute('DELETE FROM seat_rows WHERE event_id = ?', (event_id,))
+    _indexes.pop(event_id, None)
+
+# 연속 좌석 quantity석을 찾아 예약 행과 함께 저장하고 [(reservation_id, 구역, 열, 좌석 번호), ...] 반환
+# 빈 묶음이 없으면 None, 없는 구역이면 UnknownSection (이미 열린 트랜잭션 안에서 호출해야 함)
+
+def apply_reserve_seats(conn, user_id, event_id, quantity, section=None):
+    index = _current_index(conn, event_id)
+    if index is None:
+        return None
+    start_time = time.perf_counter()
+    found = index.find(quantity, section)
+    allocation_seconds.observe(time.perf_counter() - start_time)
+    if found is None:
+        return None
+    position, start = found
+    index.set_taken(position, index.taken[position] | (((1 << quantity) - 1) << start))
+    _save_rows(conn, event_id, index, [position], -quantity)
+
+    row_id = index.row_ids[position]
+    section_name, row_name = index.names[position]
+    seats = []
+    now = time.time()
+    for seat_no in range(start + 1, start + quantity + 1):
+        cursor = conn.execute('INSERT INTO reservations (user_id, event_id, seat_row_id, seat_no, created_at) VALUES (?, ?, ?, ?, ?)',
+                              (user_id, event_id, row_id, seat_no, now))
+        seats.append((cursor.lastrowid, section_name, row_name, seat_no))
+    return seats
+
+# 취소된 예약의 좌석을 비움 (seats: [(seat_row_id, seat_no), ...], 남은 티켓 수는 호출한 쪽에서 복구)
+
+def apply_release_seats(conn, event_id, seats):
+    index = _current_index(conn, event_id)
+    if index is None:
+        return
+    changed = {}
+    for row_id, seat_no in seats:
+        position = index.positions.get(row_id)
+        if position is not None:
+            changed[position] = changed.get(position, index.taken[position]) & ~(1 << (seat_no - 1))
+    for position, taken in changed.items():
+        index.set_taken(position, taken)
+    _save_rows(conn, event_id, index, list(changed), 0)
+
+# 배치도 조회용 요약 (taken은 예약된 좌석 비트를 16진수로, 비트 i = i+1번 좌석)
+
+def describe(conn, event_id):
+    sections = []
+    by_name = {}
+    for row in conn.execute('SELECT section, name, seats, taken FROM seat_rows WHERE event_id = ? ORDER BY id',
+                            (event_id,)):
+        if row['section'] not in by_name:
+            by_name[row['section']] = []
+            sections.append({'name': row['section'], 'rows': by_name[row['section']]})
+        taken = int.from_bytes(row['taken'], 'little')
+        by_name[row['section']].append({'name': row['name'], 'seats': row['seats'],
+                                        'available': row['seats'] - taken.bit_count(), 'taken': format(taken, 'x')})
+    return sections
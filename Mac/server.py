@@ -1,54 +1,149 @@
 # server.py
-from flask import Flask, request, jsonify, session
-import sqlite3
-from flask_bcrypt import Bcrypt
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, session
+import bisect
+import math
+import time
 from flask import session
 from functools import wraps
-import threading
-
-app = Flask(__name__)
-app.secret_key = 'your_secret_key'  # 세션 관리를 위해 필요한 비밀 키 설정
-bcrypt = Bcrypt(app)
-
-# 데이터베이스 연결
-
-def connect_db():
-    conn = sqlite3.connect('events.db', check_same_thread=False)
-    conn.row_factory = sqlite3.Row  # 딕셔너리 스타일로 데이터 가져오기
-    return conn
-
-# 초기 데이터베이스 설정
-
-def init_db():
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL,
-            password TEXT NOT NULL,
-            is_admin INTEGER DEFAULT 0  -- 관리자 여부를 나타내는 컬럼 (0: 일반 사용자, 1: 관리자)
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            tickets_left INTEGER NOT NULL
-        )
-    ''')
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS reservations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            event_id INTEGER,
-            FOREIGN KEY(user_id) REFERENCES users(id),
-            FOREIGN KEY(event_id) REFERENCES events(id)
-        )
-    ''')
-    conn.commit()
+
+import bulk_import
+import compression
+import db
+import event_stats
+import exports
+import holds
+import idempotency
+import metrics
+import migrations
+import ratelimit
+import reservations
+import seatmaps
+from admission import QueueFull, create_admission_control
+from catalog_cache import CatalogCache
+from group_commit import GroupCommitWriter
+from inventory_stream import InventoryBroadcaster
+from reservation_cache import ReservationCache
+from fast_json import FastJSONProvider, RowEncoder
+from hashing import HasherOverloaded, PasswordHasher
+from idempotency import IdempotencyStore
+from pagination import STREAM_BATCH_SIZE, list_body, list_response, page_args
+from config import load_config
+from db import get_db
+from storage import create_storage
+
+bp = Blueprint('api', __name__)
+
+# create_app()이 설정에 맞춰 채우는 구성 요소 (프로세스마다 앱 하나)
+app = None
+storage = None
+hasher = None
+reserve_locks = None
+writer = None
+admission = None
+catalog_cache = None
+inventory_stream = None
+hold_reaper = None
+reservation_cache = None
+idempotency_store = None
+rate_limiter = None
+
+# 앱 생성 (설정은 기본값 -> 설정 파일 -> 환경 변수 -> overrides 순서로 적용)
+# serve.py로 여러 워커를 띄우면 각 워커 프로세스가 fork 이후에 한 번씩 호출함
+
+def create_app(overrides=None):
+    global app, storage, hasher, reserve_locks, writer, admission, catalog_cache, inventory_stream, hold_reaper, reservation_cache, idempotency_store, \
+        rate_limiter
+    app = Flask(__name__)
+    config = load_config(app, overrides)
+    if config['JSON_FAST_ENABLED']:
+        app.json = FastJSONProvider(app)
+    metrics.init_app(app)
+    db.init_app(app)
+    compression.init_app(app)
+    app.register_blueprint(bp)
+
+    # 사용자/이벤트/예약 저장소 (memory 저장소에서는 SQLite 전용 기능인 임시 예약, 좌석 배치도,
+    # 실시간 스트림, 묶음 커밋을 쓰지 않음)
+    storage = create_storage(config, connect=get_db)
+    uses_sqlite = storage.name == 'sqlite'
+
+    # 비밀번호 해시는 별도 프로세스 풀에서 실행 (요청 스레드가 bcrypt에 묶이지 않도록)
+    hasher = PasswordHasher(config['HASH_WORKERS'], config['HASH_QUEUE_LIMIT'],
+                            config['BCRYPT_ROUNDS'], config['BCRYPT_TARGET_MS'])
+
+    # 티켓 예약 시 같은 이벤트에 대한 경합을 줄이기 위한 이벤트별 락 스트라이프
+    # (프로세스 안에서만 유효하며, 여러 워커 사이의 정합성은 조건부 UPDATE가 보장)
+    reserve_locks = reservations.StripedLock(config['RESERVE_LOCK_STRIPES'])
+
+    # 예약/취소를 모아서 한 번에 커밋하는 쓰기 스레드 (설정으로 켰을 때만 사용)
+    writer = None
+    if config['GROUP_COMMIT_ENABLED'] and uses_sqlite:
+        writer = GroupCommitWriter(config, config['GROUP_COMMIT_MAX_BATCH'], config['GROUP_COMMIT_MAX_WAIT_MS'])
+
+    # 인기 이벤트 오픈 시 예약 요청을 일정 속도로만 들여보내는 대기열 (이벤트별로 선택 적용)
+    # SQLite 저장소면 모든 워커가 같은 대기열을 보도록 ADMISSION_DATABASE 파일에 둠
+    admission = create_admission_control(config, shared=uses_sqlite)
+
+    # 이벤트 목록 응답 캐시 (쓰기 시 폐기, 예약/취소 시 짧은 지연 허용)
+    catalog_cache = CatalogCache(config['CATALOG_CACHE_TTL'], config['CATALOG_CACHE_STALE_MS'])
+
+    # 사용자별 예약 목록 캐시 (GET /my_reservations, 설정으로 끌 수 있음)
+    reservation_cache = None
+    if config['MY_RESERVATIONS_CACHE_ENABLED']:
+        reservation_cache = ReservationCache(config['MY_RESERVATIONS_CACHE_TTL'], config['MY_RESERVATIONS_CACHE_MAX_ITEMS'],
+                                             config['MY_RESERVATIONS_CACHE_MAX_PER_USER'])
+
+    # 예약/로그인/가입 요청 속도 제한 (RATE_LIMITS 규칙별 토큰 버킷)
+    rate_limiter = ratelimit.create_limiter(config)
+
+    # Idempotency-Key 응답 저장소 (SQLite 저장소면 테이블에도 남겨 다른 워커/재시작 후에도 유지)
+    idempotency_store = IdempotencyStore(config['IDEMPOTENCY_TTL'], config['IDEMPOTENCY_MAX_ENTRIES'],
+                                         config['IDEMPOTENCY_PENDING_TIMEOUT'], connect=get_db if uses_sqlite else None)
+
+    inventory_stream = None
+    hold_reaper = None
+    if uses_sqlite:
+        # 남은 티켓 변경을 SSE로 구독자들에게 전달
+        inventory_stream = InventoryBroadcaster(config, config['INVENTORY_STREAM_COALESCE_MS'],
+                                                config['INVENTORY_STREAM_HEARTBEAT'], config['INVENTORY_STREAM_POLL_MS'],
+                                                config['INVENTORY_STREAM_MAX_SUBSCRIBERS'])
+
+        # 만료된 임시 예약(hold)을 해제하는 스레드 (다른 워커가 남긴 만료 hold도 주기적으로 정리하므로 바로 시작)
+        hold_reaper = holds.HoldReaper(config, config['HOLD_REAPER_BATCH'], config['HOLD_SWEEP_INTERVAL'],
+                                       on_release=inventory_changed)
+        hold_reaper.start()
+    return app
+
+# 초기 데이터베이스 설정 (스키마 마이그레이션 적용)
+# 여러 워커를 띄울 때는 fork 전에 마스터 프로세스에서 한 번만 실행
+
+def init_db(config=None):
+    config = config or app.config
+    if config['STORAGE_BACKEND'] != 'sqlite':
+        return
+    conn = db.open_connection(config)
+    db.configure_database(conn)
+    migrations.migrate(conn)
     conn.close()
 
+# 워커 종료 시 해시 프로세스 풀과 DB 연결 풀 정리
+
+def close_app():
+    hasher.shutdown()
+    pool = app.extensions.get('db_pool')
+    if pool:
+        pool.close_all()
+
+# SQLite 저장소에서만 쓸 수 있는 기능 (memory 저장소면 501)
+
+def sqlite_only(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if storage.name != 'sqlite':
+            return jsonify({'message': '현재 저장소(%s)에서는 지원하지 않는 기능입니다.' % storage.name}), 501
+        return f(*args, **kwargs)
+    return decorated_function
+
 # 로그인 필요 데코레이터
 
 def login_required(f):
@@ -59,15 +154,132 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# 티켓 예약 시 동시성 문제 방지를 위한 Lock 객체 생성
-reserve_lock = threading.Lock()
+# 요청 속도 제한: rule은 RATE_LIMITS의 규칙 이름, by='user'면 로그인한 사용자별(로그인 전이면 주소별), 'ip'면 접속 주소별
+# 한도를 넘으면 429와 토큰이 다시 찰 때까지의 Retry-After(초)
+
+def rate_limited(rule, by='user'):
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if rate_limiter is not None:
+                key = 'user:%d' % session['user_id'] if by == 'user' and 'user_id' in session else 'ip:%s' % request.remote_addr
+                allowed, wait = rate_limiter.check(rule, key)
+                if not allowed:
+                    return jsonify({'message': '요청이 너무 많습니다. 잠시 후 다시 시도해 주세요.'}), 429, {'Retry-After': str(wait)}
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+# 쓰기 요청에 Idempotency-Key 헤더가 있으면 같은 키의 재시도에는 처음 응답을 그대로 돌려줌
+# (login_required 뒤, rate_limited 앞에 둘 것 - 재시도는 속도 제한 토큰을 쓰지 않고 바로 응답, 429는 저장하지 않음)
+# 같은 키로 다른 요청이면 422, 처음 요청이 아직 처리 중이면 409
+
+def idempotent(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return f(*args, **kwargs)
+        if not 0 < len(key) <= idempotency.MAX_KEY_LENGTH:
+            return jsonify({'message': 'Idempotency-Key는 1~%d자여야 합니다.' % idempotency.MAX_KEY_LENGTH}), 400
+
+        user_id = session['user_id']
+        request_fingerprint = idempotency.fingerprint(request.method, request.path, request.get_data())
+        state, stored = idempotency_store.begin(user_id, key, request_fingerprint)
+        if state == idempotency.REPLAYED:
+            return Response(stored.body, status=stored.status, mimetype='application/json', headers={'Idempotent-Replayed': 'true'})
+        if state == idempotency.MISMATCH:
+            return jsonify({'message': '같은 Idempotency-Key로 다른 요청을 보냈습니다.'}), 422
+        if state == idempotency.IN_PROGRESS:
+            return jsonify({'message': '같은 Idempotency-Key의 요청을 처리하고 있습니다. 잠시 후 다시 시도해 주세요.'}), 409, {'Retry-After': '1'}
+
+        try:
+            response = current_app.make_response(f(*args, **kwargs))
+        except BaseException:
+            idempotency_store.abandon(user_id, key)
+            raise
+        idempotency_store.finish(user_id, key, request_fingerprint, response.status_code, response.get_data())
+        return response
+    return decorated_function
+
+# 이벤트 정보가 바뀐 뒤 호출: 목록 캐시 갱신 + 실시간 구독자 알림
+# structural=True는 이벤트 생성/수정/삭제, False는 예약/취소로 남은 티켓 수만 바뀐 경우
 
-@app.route('/', methods=['GET'])
+def inventory_changed(event_ids, structural=False):
+    if structural:
+        catalog_cache.invalidate()
+    else:
+        catalog_cache.mark_dirty()
+    if inventory_stream:
+        inventory_stream.publish(event_ids)
+
+# 사용자 예약이 바뀐 뒤 호출: change가 있으면 예약 목록 캐시를 제자리에서 고치고, 없으면 해당 사용자 항목 폐기
+
+def my_reservations_changed(user_id, change=None):
+    if reservation_cache is None:
+        return
+    if change is None:
+        reservation_cache.invalidate_user(user_id)
+    else:
+        reservation_cache.apply(change)
+
+# 캐시/쓰기 스레드/실시간 스트림/대기열 상태를 /metrics에 함께 노출
+
+def component_metrics():
+    cache = catalog_cache.stats()
+    yield ('catalog_cache_requests_total', 'counter', '이벤트 목록 캐시 조회 결과별 횟수',
+           [({'result': result}, cache[result]) for result in ('hits', 'misses', 'not_modified')])
+    if inventory_stream:
+        stream = inventory_stream.stats()
+        yield ('inventory_stream_subscribers', 'gauge', '실시간 스트림 구독자 수', [({}, stream['subscribers'])])
+        yield ('inventory_stream_published_total', 'counter', '실시간 스트림에 알린 변경 수', [({}, stream['published'])])
+        yield ('inventory_stream_errors_total', 'counter', '실시간 스트림 브로드캐스터가 DB 오류로 연결을 다시 연 횟수', [({}, stream['errors'])])
+    if writer:
+        writer_stats = writer.stats()
+        yield ('group_commit_batches_total', 'counter', '묶음 커밋 트랜잭션 수', [({}, writer_stats['batches'])])
+        yield ('group_commit_intents_total', 'counter', '묶음 커밋으로 처리한 예약/취소 수', [({}, writer_stats['intents'])])
+        yield ('group_commit_failed_batches_total', 'counter', '실패한 묶음 커밋 수', [({}, writer_stats['failed_batches'])])
+        yield ('group_commit_queued', 'gauge', '쓰기 스레드 대기 중인 요청 수', [({}, writer_stats['queued'])])
+    if reservation_cache:
+        my_cache = reservation_cache.stats()
+        yield ('my_reservations_cache_requests_total', 'counter', '예약 목록 캐시 조회 결과별 횟수 (stale: 버전/ttl 불일치로 다시 읽음)',
+               [({'result': result}, my_cache[result]) for result in ('hits', 'misses', 'stale')])
+        yield ('my_reservations_cache_updates_total', 'counter', '예약/취소를 캐시에 제자리 반영한 횟수', [({}, my_cache['updates'])])
+        yield ('my_reservations_cache_evictions_total', 'counter', '항목 수 상한 때문에 제거된 사용자 수', [({}, my_cache['evictions'])])
+        yield ('my_reservations_cache_items', 'gauge', '캐시에 들어 있는 예약 항목 수', [({}, my_cache['items'])])
+        yield ('my_reservations_cache_users', 'gauge', '캐시에 들어 있는 사용자 수', [({}, my_cache['users'])])
+    if rate_limiter and rate_limiter.backend == 'local':
+        limiter_stats = rate_limiter.stats()
+        yield ('rate_limit_keys', 'gauge', '이 워커의 속도 제한 버킷 수', [({}, limiter_stats['keys'])])
+        yield ('rate_limit_evictions_total', 'counter', '키 수 상한 때문에 지운 속도 제한 버킷 수', [({}, limiter_stats['evictions'])])
+    idempotency_stats = idempotency_store.stats()
+    yield ('idempotency_cached_responses', 'gauge', '이 워커 메모리에 보관 중인 Idempotency-Key 응답 수', [({}, idempotency_stats['entries'])])
+    yield ('idempotency_evictions_total', 'counter', '메모리 상한 때문에 제거된 Idempotency-Key 응답 수', [({}, idempotency_stats['evictions'])])
+    if hold_reaper:
+        active_holds = get_db().execute('SELECT COUNT(*) FROM holds WHERE expires_at > ?', (time.time(),)).fetchone()[0]
+        yield ('holds_active', 'gauge', '만료 전 임시 예약 수 (모든 워커 합계)', [({}, active_holds)])
+        yield ('hold_reaper_tracked', 'gauge', '이 워커의 reaper가 만료를 기다리는 임시 예약 수',
+               [({}, hold_reaper.stats()['tracked'])])
+    rooms = admission.stats()
+    yield ('admission_waiting', 'gauge', '이벤트별 대기열 인원',
+           [({'event_id': event_id}, room['waiting']) for event_id, room in rooms.items()])
+    yield ('admission_admitted_total', 'counter', '이벤트별 대기열 입장 인원',
+           [({'event_id': event_id}, room['admitted']) for event_id, room in rooms.items()])
+
+metrics.registry.add_collector(component_metrics)
+
+# 해시 작업이 밀려 있으면 오래 기다리게 하지 않고 바로 503 응답
+@bp.app_errorhandler(HasherOverloaded)
+def handle_hasher_overloaded(e):
+    return jsonify({'message': '요청이 많아 잠시 후 다시 시도해 주세요.'}), 503, {'Retry-After': '1'}
+
+@bp.route('/', methods=['GET'])
 def home():
     return "Welcome to the Flask server! This is the home page.", 200
 
 # 사용자 등록
-@app.route('/register', methods=['POST'])
+@bp.route('/register', methods=['POST'])
+@rate_limited('register', by='ip')
 def register():
     data = request.json
     username = data.get('username')
@@ -77,84 +289,91 @@ def register():
     if not username or not password:
         return jsonify({'message': '사용자 이름과 비밀번호가 필요합니다.'}), 400
 
-    hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+    hashed_password = hasher.hash(password)
 
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)', (username, hashed_password, is_admin))
-    conn.commit()
-    conn.close()
+    if storage.create_user(username, hashed_password, is_admin) is None:
+        return jsonify({'message': '이미 등록된 사용자입니다.'}), 400
 
     return jsonify({'message': '사용자 등록에 성공했습니다.'}), 201
 
 # 사용자 로그인
-@app.route('/login', methods=['POST'])
+@bp.route('/login', methods=['POST'])
+@rate_limited('login', by='ip')
 def login():
     data = request.json
     username = data['username']
     password = data['password']
     
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, password, is_admin FROM users WHERE username = ?', (username,))
-    user = cursor.fetchone()
-    conn.close()
+    user = storage.find_user(username)
     
-    if user and bcrypt.check_password_hash(user['password'], password):
+    if user and hasher.check(user['password'], password):
+        # 설정된 cost가 바뀌었으면 로그인 성공 시 새 cost로 다시 해시해서 저장
+        if hasher.needs_rehash(user['password']):
+            rehash_password(user['id'], password)
         session['user_id'] = user['id']
         session['is_admin'] = user['is_admin']
         return jsonify({'message': '로그인에 성공했습니다.', 'is_admin': user['is_admin']}), 200
     else:
         return jsonify({'message': '사용자 이름 또는 비밀번호가 잘못되었습니다.'}), 401
 
+def rehash_password(user_id, password):
+    try:
+        hashed_password = hasher.hash(password)
+    except HasherOverloaded:
+        return  # 다음 로그인 때 다시 시도
+    storage.update_password(user_id, hashed_password)
+
 # 사용자 로그아웃
-@app.route('/logout', methods=['POST'])
+@bp.route('/logout', methods=['POST'])
 @login_required
 def logout():
     session.clear()
     return jsonify({'message': '로그아웃되었습니다.'}), 200
 
+USER_ITEM = RowEncoder('id', 'username', 'is_admin')
+
 # 사용자 목록 조회 (관리자 전용)
-@app.route('/users', methods=['GET'])
+@bp.route('/users', methods=['GET'])
 @login_required
 def get_users():
     if not session.get('is_admin'):
         return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
     
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, username, is_admin FROM users')
-    users = cursor.fetchall()
-    conn.close()
+    limit, after_id = page_args()
+    rows = storage.list_users(after_id, limit)
 
-    users_list = [{'id': user['id'], 'username': user['username'], 'is_admin': user['is_admin']} for user in users]
-    return jsonify({'users': users_list}), 200
+    return list_response('users', rows, USER_ITEM, limit)
 
 # 사용자 삭제 (관리자 전용)
-@app.route('/users/<int:user_id>', methods=['DELETE'])
+@bp.route('/users/<int:user_id>', methods=['DELETE'])
 @login_required
+@idempotent
 def delete_user(user_id):
     if not session.get('is_admin'):
         return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
 
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-    user = cursor.fetchone()
-
-    if not user:
-        conn.close()
+    if not storage.delete_user(user_id):
         return jsonify({'message': '삭제할 사용자를 찾을 수 없습니다.'}), 404
-
-    cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
-    conn.commit()
-    conn.close()
+    my_reservations_changed(user_id)
 
     return jsonify({'message': '사용자 정보 삭제에 성공했습니다.'}), 200
 
+# 티켓 수량 확인 (bulk_import.validate_event와 같은 조건: 0 이상의 정수)
+
+def valid_tickets_left(tickets_left):
+    return type(tickets_left) is int and tickets_left >= 0
+
+# 이벤트별 임시 예약 유지 시간 확인 (None이면 기본값 사용)
+
+def valid_hold_ttl(hold_ttl):
+    if hold_ttl is None:
+        return True
+    return type(hold_ttl) is int and 0 < hold_ttl <= current_app.config['HOLD_MAX_TTL']
+
 # 이벤트 생성 (관리자 전용)
-@app.route('/events', methods=['POST'])
+@bp.route('/events', methods=['POST'])
 @login_required
+@idempotent
 def create_event():
     if not session.get('is_admin'):
         return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
@@ -163,82 +382,451 @@ def create_event():
     name = data.get('name')
     tickets_left = data.get('tickets_left')
     
+    hold_ttl = data.get('hold_ttl')
+
     if not name or tickets_left is None:
         return jsonify({'message': '이벤트 이름과 티켓 수량이 필요합니다.'}), 400
+    if not valid_tickets_left(tickets_left):
+        return jsonify({'message': '티켓 수량(tickets_left)은 0 이상의 정수여야 합니다.'}), 400
+    if not valid_hold_ttl(hold_ttl):
+        return jsonify({'message': '임시 예약 유지 시간(hold_ttl)이 올바르지 않습니다.'}), 400
     
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('INSERT INTO events (name, tickets_left) VALUES (?, ?)', (name, tickets_left))
-    conn.commit()
-    conn.close()
+    event_id = storage.create_event(name, tickets_left, hold_ttl)
+    inventory_changed([event_id], structural=True)
     
     return jsonify({'message': '이벤트가 성공적으로 생성되었습니다.'}), 201
 
-# 이벤트 목록 조회
-@app.route('/events', methods=['GET'])
-def get_events():
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM events')
-    events = cursor.fetchall()
-    conn.close()
+# 이벤트 일괄 가져오기 (관리자 전용, 요청 본문은 CSV 또는 NDJSON - 형식은 ?format= 또는 Content-Type)
+@bp.route('/events/import', methods=['POST'])
+@login_required
+def bulk_import_events():
+    if not session.get('is_admin'):
+        return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
+    # 새 이벤트는 묶음마다 목록 캐시에 반영 (실시간 스트림 구독자는 DB 변경 감지로 알아챔)
+    return bulk_import_response('events', lambda result: catalog_cache.invalidate())
 
-    events_list = [{'id': event['id'], 'name': event['name'], 'tickets_left': event['tickets_left']} for event in events]
-    return jsonify({'events': events_list}), 200
+# 사용자 일괄 가져오기 (관리자 전용, 형식은 이벤트 가져오기와 같음)
+@bp.route('/users/import', methods=['POST'])
+@login_required
+def bulk_import_users():
+    if not session.get('is_admin'):
+        return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
+    return bulk_import_response('users')
+
+def bulk_import_response(kind, on_chunk=None):
+    fmt = bulk_import.detect_format(request.args.get('format'), request.mimetype)
+    if fmt is None:
+        return jsonify({'message': '가져올 형식을 알 수 없습니다. format=csv 또는 format=ndjson을 지정해 주세요.'}), 400
+
+    result = bulk_import.run_import(kind, storage, hasher, request.stream, fmt, current_app.config, on_chunk)
+    if result.error:
+        return jsonify(dict(result.to_dict(), message=result.error)), 400
+    return jsonify(dict(result.to_dict(), message='일괄 가져오기를 마쳤습니다.')), 200
+
+# 이벤트 목록 조회 (캐시된 스냅샷 사용, If-None-Match가 일치하면 304)
+# limit/after_id가 있으면 캐시 대신 해당 페이지만 DB에서 조회
+# changed_since(목록 버전)가 있으면 그 뒤로 바뀐 이벤트만 (클라이언트 캐시 동기화용, catalog_changes_response 참고)
+@bp.route('/events', methods=['GET'])
+def get_events():
+    if 'changed_since' in request.args:
+        return catalog_changes_response()
+    if 'limit' in request.args or 'after_id' in request.args:
+        limit, after_id = page_args()
+        return list_response('events', storage.list_events(after_id, limit), EVENT_ITEM, limit)
+
+    # 압축한 본문도 스냅샷에 인코딩별로 한 번만 만들어 둠 (ETag는 인코딩마다 다름)
+    snapshot = catalog_cache.get(load_events_body)
+    encoding = compression.choose_encoding(len(snapshot.body))
+    etag = snapshot.etag if encoding is None else '%s-%s' % (snapshot.etag, encoding)
+    if etag in request.if_none_match:
+        catalog_cache.not_modified += 1
+        response = Response(status=304)
+    elif encoding is None:
+        response = Response(snapshot.body, status=200, mimetype='application/json')
+    else:
+        response = Response(snapshot.encoded(encoding, current_app.config['COMPRESS_LEVEL']), status=200, mimetype='application/json')
+        response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+EVENT_ITEM = RowEncoder('id', 'name', 'tickets_left')
+
+def load_events_body():
+    return list_body('events', storage.list_events(0, None), EVENT_ITEM).encode('utf-8')
+
+# 목록 버전 changed_since 이후 생성/수정된 이벤트(events)와 삭제된 이벤트 ID(deleted)
+# {'catalog_id', 'version', 'full', 'events', 'deleted'} - 클라이언트는 version을 다음 changed_since로,
+# catalog_id를 같이 보냄 (DB가 바뀌었거나 0을 보내면 full=true와 전체 목록)
+# 예약이 몰려도 바뀐 이벤트만 인덱스로 읽으므로 응답 크기와 DB 작업이 전체 목록과 관계없음
+def catalog_changes_response():
+    since = request.args.get('changed_since', type=int)
+    if since is None or since < 0:
+        return jsonify({'message': 'changed_since는 0 이상의 정수여야 합니다.'}), 400
+
+    changes = storage.catalog_changes(since, request.args.get('catalog_id'))
+    fields = {'catalog_id': changes.catalog_id, 'version': changes.version, 'full': changes.full, 'deleted': changes.deleted}
+    response = Response(list_body('events', changes.events, EVENT_ITEM, fields), status=200, mimetype='application/json')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# 남은 티켓 실시간 스트림 (text/event-stream)
+# 변경이 있으면 event: inventory 로 [{event_id, tickets_left, sold_out, deleted}] 묶음을 보내고,
+# 변경이 없으면 주기적으로 heartbeat 주석을 보냄
+@bp.route('/events/stream', methods=['GET'])
+@sqlite_only
+def stream_events():
+    stream = inventory_stream.subscribe()
+    if stream is None:
+        return jsonify({'message': '실시간 구독자가 너무 많습니다. 잠시 후 다시 시도해 주세요.'}), 503, {'Retry-After': '5'}
+    # serve.py 워커에서는 요청 슬롯을 돌려줌 (구독자 수는 INVENTORY_STREAM_MAX_SUBSCRIBERS로 따로 제한)
+    release_slot = request.environ.get('serve.release_slot')
+    if release_slot:
+        release_slot()
+    return Response(stream, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# 이벤트 목록 캐시 통계 (관리자 전용)
+@bp.route('/events/cache', methods=['GET'])
+@login_required
+def get_events_cache_stats():
+    if not session.get('is_admin'):
+        return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
+    return jsonify(catalog_cache.stats()), 200
 
 # 티켓 예약
-@app.route('/events/<int:event_id>/reserve', methods=['POST'])
+@bp.route('/events/<int:event_id>/reserve', methods=['POST'])
 @login_required
+@idempotent
+@rate_limited('reserve')
 def reserve_ticket(event_id):
     user_id = session['user_id']
-    with reserve_lock:
-        conn = connect_db()
-        cursor = conn.cursor()
-        cursor.execute('SELECT tickets_left FROM events WHERE id = ?', (event_id,))
-        event = cursor.fetchone()
-        if event and event['tickets_left'] > 0:
-            cursor.execute('INSERT INTO reservations (user_id, event_id) VALUES (?, ?)', (user_id, event_id))
-            cursor.execute('UPDATE events SET tickets_left = tickets_left - 1 WHERE id = ?', (event_id,))
-            conn.commit()
-            conn.close()
-            return jsonify({'message': '티켓 예약에 성공했습니다.'}), 200
-        else:
-            conn.close()
-            return jsonify({'message': '티켓이 매진되었습니다.'}), 400
+    if not admission.check_pass(event_id, user_id, request.headers.get('X-Admission-Pass')):
+        return jsonify({'message': '대기열을 통해 입장한 후 예약할 수 있습니다.'}), 403
+    if writer:
+        change = writer.reserve(user_id, event_id)
+    else:
+        with reserve_locks.for_key(event_id):
+            change = storage.reserve(user_id, event_id)
+    if change:
+        my_reservations_changed(user_id, change)
+        inventory_changed([event_id])
+        return jsonify({'message': '티켓 예약에 성공했습니다.'}), 200
+    else:
+        return sold_out_response(event_id)
+
+# 한 장 예약/임시 예약 실패 응답 (좌석 지정 이벤트라서 실패한 경우는 좌석 예약을 안내)
+
+def sold_out_response(event_id):
+    if storage.is_seated(event_id):
+        return jsonify({'message': '좌석 지정 이벤트입니다. 좌석 예약으로 예약해 주세요.'}), 400
+    return jsonify({'message': '티켓이 매진되었습니다.'}), 400
+
+# 연속 좌석 예약 (좌석 지정 이벤트 전용)
+# 요청: {"quantity": 2, "section": "A"} - section을 주지 않으면 전체에서 가장 좋은 자리
+@bp.route('/events/<int:event_id>/seats', methods=['POST'])
+@login_required
+@sqlite_only
+@idempotent
+@rate_limited('reserve')
+def reserve_seats(event_id):
+    user_id = session['user_id']
+    if not admission.check_pass(event_id, user_id, request.headers.get('X-Admission-Pass')):
+        return jsonify({'message': '대기열을 통해 입장한 후 예약할 수 있습니다.'}), 403
+    data = request.json or {}
+    quantity = data.get('quantity', 1)
+    section = data.get('section')
+    if type(quantity) is not int or not 0 < quantity <= current_app.config['SEAT_MAX_BLOCK'] or \
+            not (section is None or isinstance(section, str)):
+        return jsonify({'message': '좌석 수(quantity) 또는 구역(section)이 올바르지 않습니다.'}), 400
+    try:
+        with reserve_locks.for_key(event_id):
+            change = reservations.reserve_seats(get_db(), user_id, event_id, quantity, section)
+    except seatmaps.UnknownSection:
+        return jsonify({'message': '좌석 배치도에 없는 구역입니다.'}), 400
+    if change is None:
+        if not seatmaps.is_seated(get_db(), event_id):
+            return jsonify({'message': '좌석 배치도가 없는 이벤트입니다.'}), 404
+        return jsonify({'message': '연속으로 남은 좌석이 없습니다.'}), 409
+    my_reservations_changed(user_id, change)
+    inventory_changed([event_id])
+    return jsonify({'message': '좌석 예약에 성공했습니다.',
+                    'seats': [dict(item['seat'], reservation_id=item['reservation_id']) for item in change.added]}), 200
+
+# 좌석 배치도 조회 (열별 남은 좌석 수와 예약된 좌석 비트)
+@bp.route('/events/<int:event_id>/seatmap', methods=['GET'])
+@sqlite_only
+def get_seat_map(event_id):
+    conn = get_db()
+    if not seatmaps.is_seated(conn, event_id):
+        return jsonify({'message': '좌석 배치도가 없는 이벤트입니다.'}), 404
+    return jsonify({'event_id': event_id, 'sections': seatmaps.describe(conn, event_id)}), 200
+
+# 좌석 배치도 등록/교체 (관리자 전용, 예약이 없는 이벤트만)
+# 남은 티켓 수는 전체 좌석 수로 바뀜
+@bp.route('/events/<int:event_id>/seatmap', methods=['PUT'])
+@login_required
+@sqlite_only
+@idempotent
+def put_seat_map(event_id):
+    if not session.get('is_admin'):
+        return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
+    layout = seatmaps.parse_layout(request.json, current_app.config['SEAT_MAP_MAX_SEATS'])
+    if layout is None:
+        return jsonify({'message': '좌석 배치도 형식이 올바르지 않습니다.'}), 400
+    conn = get_db()
+    with db.immediate_transaction(conn):
+        if conn.execute('SELECT 1 FROM events WHERE id = ?', (event_id,)).fetchone() is None:
+            return jsonify({'message': '이벤트를 찾을 수 없습니다.'}), 404
+        replaced = seatmaps.replace_seat_map(conn, event_id, layout)
+    if not replaced:
+        return jsonify({'message': '예약이 있는 이벤트는 좌석 배치도를 바꿀 수 없습니다.'}), 409
+    inventory_changed([event_id], structural=True)
+    return jsonify({'message': '좌석 배치도가 등록되었습니다.', 'seats': sum(seats for _, _, seats in layout)}), 200
 
 # 티켓 예약 취소
-@app.route('/events/<int:event_id>/cancel', methods=['DELETE'])
+@bp.route('/events/<int:event_id>/cancel', methods=['DELETE'])
 @login_required
+@idempotent
 def cancel_reservation(event_id):
     user_id = session['user_id']
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM reservations WHERE user_id = ? AND event_id = ?', (user_id, event_id))
-    cursor.execute('UPDATE events SET tickets_left = tickets_left + 1 WHERE id = ?', (event_id,))
-    conn.commit()
-    conn.close()
+    change = writer.cancel(user_id, event_id) if writer else storage.cancel(user_id, event_id)
+    if not change:
+        return jsonify({'message': '취소할 예약이 없습니다.'}), 404
+    my_reservations_changed(user_id, change)
+    inventory_changed([event_id])
     return jsonify({'message': '티켓 예약 취소에 성공했습니다.'}), 200
 
-# 나의 예약 현황 조회
-@app.route('/my_reservations', methods=['GET'])
+# 티켓 임시 예약 (hold_ttl 안에 확정하지 않으면 자동으로 해제됨)
+@bp.route('/events/<int:event_id>/hold', methods=['POST'])
 @login_required
-def get_my_reservations():
+@sqlite_only
+@idempotent
+@rate_limited('reserve')
+def hold_ticket(event_id):
     user_id = session['user_id']
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT events.id, events.name FROM reservations
-        JOIN events ON reservations.event_id = events.id
-        WHERE reservations.user_id = ?
-    ''', (user_id,))
-    reservations = cursor.fetchall()
-    conn.close()
+    if not admission.check_pass(event_id, user_id, request.headers.get('X-Admission-Pass')):
+        return jsonify({'message': '대기열을 통해 입장한 후 예약할 수 있습니다.'}), 403
+    with reserve_locks.for_key(event_id):
+        hold = holds.create_hold(get_db(), user_id, event_id, current_app.config['HOLD_DEFAULT_TTL'])
+    if hold is None:
+        return sold_out_response(event_id)
+    hold_id, expires_at = hold
+    hold_reaper.track(hold_id, expires_at)
+    inventory_changed([event_id])
+    return jsonify({'message': '티켓을 임시로 확보했습니다. 만료 전에 확정해 주세요.',
+                    'hold_id': hold_id, 'expires_at': expires_at}), 201
+
+# 임시 예약 확정
+@bp.route('/holds/<int:hold_id>/confirm', methods=['POST'])
+@login_required
+@sqlite_only
+@idempotent
+def confirm_hold(hold_id):
+    reservation_id = holds.confirm_hold(get_db(), session['user_id'], hold_id)
+    if reservation_id is None:
+        return jsonify({'message': '확정할 임시 예약이 없거나 만료되었습니다.'}), 404
+    my_reservations_changed(session['user_id'])
+    return jsonify({'message': '티켓 예약에 성공했습니다.', 'reservation_id': reservation_id}), 200
+
+# 임시 예약 취소 (티켓을 바로 돌려줌)
+@bp.route('/holds/<int:hold_id>', methods=['DELETE'])
+@login_required
+@sqlite_only
+@idempotent
+def release_hold(hold_id):
+    event_id = holds.release_hold(get_db(), session['user_id'], hold_id)
+    if event_id is None:
+        return jsonify({'message': '취소할 임시 예약이 없거나 만료되었습니다.'}), 404
+    inventory_changed([event_id])
+    return jsonify({'message': '임시 예약을 취소했습니다.'}), 200
+
+# 대기열 등록 (대기열이 켜진 이벤트만)
+@bp.route('/events/<int:event_id>/queue', methods=['POST'])
+@login_required
+def join_queue(event_id):
+    room = admission.room(event_id)
+    if room is None:
+        return jsonify({'message': '대기열이 없는 이벤트입니다. 바로 예약하세요.'}), 404
+    user_id = session['user_id']
+    try:
+        token = room.join(user_id)
+    except QueueFull:
+        return jsonify({'message': '대기 인원이 너무 많습니다. 잠시 후 다시 시도해 주세요.'}), 503, {'Retry-After': '5'}
+    if token is None:
+        return jsonify({'message': '대기열이 없는 이벤트입니다. 바로 예약하세요.'}), 404
+    return queue_status_response(event_id, room, token, user_id, 202)
+
+# 대기 순번/예상 대기 시간 조회, 입장하면 예약에 쓸 입장권(pass) 발급
+@bp.route('/events/<int:event_id>/queue/<token>', methods=['GET'])
+@login_required
+def get_queue_status(event_id, token):
+    room = admission.room(event_id)
+    if room is None:
+        return jsonify({'message': '대기열이 없는 이벤트입니다. 바로 예약하세요.'}), 404
+    return queue_status_response(event_id, room, token, session['user_id'], 200)
+
+def queue_status_response(event_id, room, token, user_id, status_code):
+    status = room.status(token, user_id)
+    if status is None:
+        return jsonify({'message': '대기열 토큰을 찾을 수 없습니다.'}), 404
+    admitted, position, estimated_wait = status
+    body = {'token': token, 'admitted': admitted, 'position': position, 'estimated_wait_s': estimated_wait}
+    if admitted:
+        body['pass'] = admission.issue_pass(event_id, user_id, token)
+        return jsonify(body), 200
+    return jsonify(body), status_code, {'Retry-After': str(max(1, int(estimated_wait)))}
+
+# 대기열 입장 속도(초당 인원)/한 번에 입장시킬 인원 확인 (None이면 기본값 사용)
+# 인원이 1보다 작으면 토큰 버킷이 한 명도 입장시키지 못하므로 minimum=1
+
+def valid_queue_rate(value, minimum=0):
+    if value is None:
+        return True
+    return type(value) in (int, float) and math.isfinite(value) and value > 0 and value >= minimum
+
+# 대기열 켜기/설정 변경 (관리자 전용)
+@bp.route('/events/<int:event_id>/queue', methods=['PUT'])
+@login_required
+def enable_queue(event_id):
+    if not session.get('is_admin'):
+        return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
+    data = request.json or {}
+    rate, burst = data.get('rate'), data.get('burst')
+    if not valid_queue_rate(rate) or not valid_queue_rate(burst, minimum=1):
+        return jsonify({'message': '입장 속도(rate)는 양수, 인원(burst)은 1 이상이어야 합니다.'}), 400
+    room = admission.enable(event_id, rate, burst)
+    return jsonify({'message': '대기열이 설정되었습니다.', 'queue': room.stats()}), 200
+
+# 대기열 끄기 (관리자 전용)
+@bp.route('/events/<int:event_id>/queue', methods=['DELETE'])
+@login_required
+def disable_queue(event_id):
+    if not session.get('is_admin'):
+        return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
+    if not admission.disable(event_id):
+        return jsonify({'message': '대기열이 없는 이벤트입니다.'}), 404
+    return jsonify({'message': '대기열이 해제되었습니다.'}), 200
+
+# 일괄 예약/취소 요청 본문을 (event_id, quantity) 목록으로 변환, 형식이 잘못되면 None
+
+def parse_batch_items(data):
+    items = (data or {}).get('items')
+    if not isinstance(items, list) or not items or len(items) > current_app.config['BATCH_MAX_ITEMS']:
+        return None
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict):
+            return None
+        event_id = item.get('event_id')
+        quantity = item.get('quantity', 1)
+        if type(event_id) is not int or type(quantity) is not int:
+            return None
+        if not 0 < quantity <= current_app.config['BATCH_MAX_QUANTITY']:
+            return None
+        parsed.append((event_id, quantity))
+    return parsed
+
+# 여러 이벤트 티켓 일괄 예약 (전부 성공하거나 전부 실패)
+@bp.route('/reservations/batch', methods=['POST'])
+@login_required
+@idempotent
+@rate_limited('reserve')
+def reserve_batch():
+    items = parse_batch_items(request.json)
+    if items is None:
+        return jsonify({'message': '예약 항목 목록이 올바르지 않습니다.'}), 400
+    if any(admission.is_gated(event_id) for event_id, _ in items):
+        return jsonify({'message': '대기열이 적용된 이벤트는 일괄 예약할 수 없습니다.'}), 403
 
-    return jsonify({'reservations': [{'event_id': res['id'], 'event_name': res['name']} for res in reservations]}), 200
+    user_id = session['user_id']
+    reserved, results = storage.reserve_many(user_id, items)
+    if reserved:
+        my_reservations_changed(user_id)
+        inventory_changed([event_id for event_id, _ in items])
+        return jsonify({'message': '티켓 일괄 예약에 성공했습니다.', 'results': results}), 200
+    else:
+        return jsonify({'message': '남은 티켓이 부족한 이벤트가 있어 일괄 예약에 실패했습니다.', 'results': results}), 400
+
+# 여러 이벤트 티켓 일괄 취소 (전부 성공하거나 전부 실패)
+@bp.route('/reservations/batch', methods=['DELETE'])
+@login_required
+@idempotent
+def cancel_batch():
+    items = parse_batch_items(request.json)
+    if items is None:
+        return jsonify({'message': '취소 항목 목록이 올바르지 않습니다.'}), 400
+
+    user_id = session['user_id']
+    cancelled, results = storage.cancel_many(user_id, items)
+    if cancelled:
+        my_reservations_changed(user_id)
+        inventory_changed([event_id for event_id, _ in items])
+        return jsonify({'message': '티켓 일괄 취소에 성공했습니다.', 'results': results}), 200
+    else:
+        return jsonify({'message': '취소할 예약이 부족한 이벤트가 있어 일괄 취소에 실패했습니다.', 'results': results}), 400
+
+# 묶음 커밋 쓰기 스레드 통계 (관리자 전용)
+@bp.route('/reservations/writer', methods=['GET'])
+@login_required
+def get_writer_stats():
+    if not session.get('is_admin'):
+        return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
+    if not writer:
+        return jsonify({'enabled': False}), 200
+    return jsonify(dict(writer.stats(), enabled=True)), 200
+
+# 나의 예약 현황 조회 (사용자별 캐시가 있으면 예약 버전만 확인하고 캐시에서 응답)
+@bp.route('/my_reservations', methods=['GET'])
+@login_required
+def get_my_reservations():
+    user_id = session['user_id']
+    limit, after_id = page_args()
+    if reservation_cache is not None:
+        # 버전을 목록보다 먼저 읽어야 함 (그 사이 변경이 있으면 다음 조회에서 버전이 달라 다시 읽힘)
+        version = storage.reservations_version(user_id)
+        if version is not None:
+            items = reservation_cache.get(user_id, version)
+            if items is None:
+                items = load_my_reservations(user_id)
+                if items is not None:
+                    reservation_cache.store(user_id, version, items)
+            if items is not None:
+                return items_response('reservations', items, limit, after_id, 'reservation_id')
+
+    rows = storage.list_user_reservations(user_id, after_id, limit)
+    return list_response('reservations', rows, my_reservation_item, limit, cursor_key='reservation_id')
+
+# 캐시에 넣을 전체 목록 (MY_RESERVATIONS_CACHE_MAX_PER_USER보다 많으면 캐시하지 않으므로 None)
+
+def load_my_reservations(user_id):
+    max_per_user = current_app.config['MY_RESERVATIONS_CACHE_MAX_PER_USER']
+    rows = list(storage.list_user_reservations(user_id, 0, max_per_user + 1))
+    if len(rows) > max_per_user:
+        return None
+    return [my_reservation_item(row) for row in rows]
+
+def my_reservation_item(res):
+    seat = None
+    if res['seat_no'] is not None:
+        seat = {'section': res['section'], 'row': res['row_name'], 'seat': res['seat_no']}
+    return reservations.reservation_item(res['reservation_id'], res['id'], res['name'], seat)
+
+# 캐시된 목록(키 오름차순)을 list_response와 같은 형식으로 응답
+
+def items_response(key, items, limit, after_id, cursor_key):
+    start = bisect.bisect_right(items, after_id, key=lambda item: item[cursor_key])
+    if limit is None:
+        return jsonify({key: items[start:]}), 200
+    page = items[start:start + limit]
+    next_after_id = page[-1][cursor_key] if len(page) == limit else None
+    return jsonify({key: page, 'next_after_id': next_after_id}), 200
 
 # 이벤트 수정 (관리자 전용)
-@app.route('/events/<int:event_id>', methods=['PUT'])
+@bp.route('/events/<int:event_id>', methods=['PUT'])
 @login_required
+@idempotent
 def update_event(event_id):
     if not session.get('is_admin'):
         return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
@@ -246,52 +834,103 @@ def update_event(event_id):
     data = request.json
     name = data.get('name')
     tickets_left = data.get('tickets_left')
+    if tickets_left is not None and not valid_tickets_left(tickets_left):
+        return jsonify({'message': '티켓 수량(tickets_left)은 0 이상의 정수여야 합니다.'}), 400
+    if not valid_hold_ttl(data.get('hold_ttl')):
+        return jsonify({'message': '임시 예약 유지 시간(hold_ttl)이 올바르지 않습니다.'}), 400
     
-    conn = connect_db()
-    cursor = conn.cursor()
+    if tickets_left is not None and storage.is_seated(event_id):
+        return jsonify({'message': '좌석 지정 이벤트의 티켓 수량은 좌석 배치도로만 바꿀 수 있습니다.'}), 400
+    fields = {}
     if name:
-        cursor.execute('UPDATE events SET name = ? WHERE id = ?', (name, event_id))
+        fields['name'] = name
     if tickets_left is not None:
-        cursor.execute('UPDATE events SET tickets_left = ? WHERE id = ?', (tickets_left, event_id))
-    conn.commit()
-    conn.close()
+        fields['tickets_left'] = tickets_left
+    if 'hold_ttl' in data:
+        fields['hold_ttl'] = data['hold_ttl']
+    storage.update_event(event_id, fields)
+    if name and reservation_cache:
+        reservation_cache.invalidate_event(event_id)
+    inventory_changed([event_id], structural=True)
     
     return jsonify({'message': '이벤트가 성공적으로 수정되었습니다.'}), 200
 
 # 이벤트 삭제 (관리자 전용)
-@app.route('/events/<int:event_id>', methods=['DELETE'])
+@bp.route('/events/<int:event_id>', methods=['DELETE'])
 @login_required
+@idempotent
 def delete_event(event_id):
     if not session.get('is_admin'):
         return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
     
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('DELETE FROM events WHERE id = ?', (event_id,))
-    conn.commit()
-    conn.close()
+    storage.delete_event(event_id)
+    if reservation_cache:
+        reservation_cache.invalidate_event(event_id)
+    inventory_changed([event_id], structural=True)
     
     return jsonify({'message': '이벤트가 성공적으로 삭제되었습니다.'}), 200
 
+EVENT_RESERVATION_ITEM = RowEncoder('reservation_id', 'id', 'username')
+
 # 특정 이벤트의 예약자 목록 조회 (관리자 전용)
-@app.route('/events/<int:event_id>/reservations', methods=['GET'])
+@bp.route('/events/<int:event_id>/reservations', methods=['GET'])
 @login_required
 def get_event_reservations(event_id):
     if not session.get('is_admin'):
         return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
     
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT users.id, users.username FROM reservations
-        JOIN users ON reservations.user_id = users.id
-        WHERE reservations.event_id = ?
-    ''', (event_id,))
-    reservations = cursor.fetchall()
-    conn.close()
-    
-    return jsonify({'reservations': [{'id': res['id'], 'username': res['username']} for res in reservations]}), 200
+    limit, after_id = page_args()
+    rows = storage.list_event_reservations(event_id, after_id, limit)
+
+    return list_response('reservations', rows, EVENT_RESERVATION_ITEM, limit, cursor_key='reservation_id')
+
+# 특정 이벤트의 예약자 목록 내보내기 (관리자 전용, 읽기 전용 연결에서 CSV 또는 NDJSON으로 스트리밍)
+# format=csv(기본)|ndjson, after_id=이 예약 ID 다음부터 (끊긴 내보내기 이어받기),
+# since/until=예약 시각 범위 (유닉스 시간 초 또는 ISO 8601, until은 미포함)
+# Accept-Encoding에 gzip이 있으면 gzip으로 압축해서 보냄
+@bp.route('/events/<int:event_id>/reservations/export', methods=['GET'])
+@login_required
+@sqlite_only
+def export_event_reservations(event_id):
+    if not session.get('is_admin'):
+        return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return jsonify({'message': '내보내기 형식은 csv 또는 ndjson이어야 합니다.'}), 400
+    try:
+        after_id = int(request.args.get('after_id', 0))
+        since = exports.parse_time(request.args.get('since'))
+        until = exports.parse_time(request.args.get('until'))
+    except ValueError:
+        return jsonify({'message': 'after_id, since, until 값이 올바르지 않습니다.'}), 400
+    if storage.get_event(event_id) is None:
+        return jsonify({'message': '이벤트를 찾을 수 없습니다.'}), 404
+
+    compress = request.accept_encodings['gzip'] > 0
+    conn, cursor = exports.open_export(current_app.config, event_id, after_id, since, until)
+    response = Response(exports.generate(cursor, fmt, STREAM_BATCH_SIZE, compress), mimetype=exports.FORMATS[fmt])
+    response.call_on_close(conn.close)
+    response.headers['Content-Disposition'] = 'attachment; filename="event-%d-reservations.%s"' % (event_id, fmt)
+    response.vary.add('Accept-Encoding')
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+# 이벤트별 판매 통계 (관리자 전용)
+# 예약/취소 때 갱신되는 집계를 읽으므로 예약이 아무리 많아도 이벤트 수만큼만 읽음
+# limit/after_id로 페이지 단위 조회, limit이 없으면 전체를 스트리밍
+@bp.route('/stats', methods=['GET'])
+@login_required
+def get_stats():
+    if not session.get('is_admin'):
+        return jsonify({'message': '관리자 권한이 필요합니다.'}), 403
+
+    limit, after_id = page_args()
+    return list_response('events', storage.event_stats(after_id, limit), event_stats.stats_item, limit)
 
+# 개발용 단일 프로세스 실행 (운영에서는 serve.py 사용)
 if __name__ == '__main__':
+    create_app()
     init_db()
-    app.run(debug=True)
+    app.run(host=app.config['SERVER_HOST'], port=app.config['SERVER_PORT'], debug=app.config['DEBUG'])
@@ -0,0 +1,168 @@
+# sqlite_storage.py
+import json
+import sqlite3
+
+import event_stats
+import reservations
+import seatmaps
+from db import immediate_transaction
+from pagination import sql_limit
+from storage import CatalogChanges, Storage
+
+MY_RESERVATIONS_SQL = '''
+    SELECT reservations.id AS reservation_id, events.id, events.name,
+           seat_rows.section, seat_rows.name AS row_name, reservations.seat_no FROM reservations
+    JOIN events ON reservations.event_id = events.id
+    LEFT JOIN seat_rows ON reservations.seat_row_id = seat_rows.id
+    WHERE reservations.user_id = ? AND reservations.id > ?
+    ORDER BY reservations.id LIMIT ?
+'''
+
+EVENT_RESERVATIONS_SQL = '''
+    SELECT reservations.id AS reservation_id, users.id, users.username FROM reservations
+    JOIN users ON reservations.user_id = users.id
+    WHERE reservations.event_id = ? AND reservations.id > ?
+    ORDER BY reservations.id LIMIT ?
+'''
+
+# SQLite 저장소 (스키마는 migrations.py)
+# connect(): 현재 요청/스레드가 쓸 연결을 돌려주는 함수 (서버에서는 db.get_db)
+# 목록 조회는 커서를 그대로 돌려주므로 limit 없는 조회도 전체를 메모리에 올리지 않고 스트리밍됨
+
+class SqliteStorage(Storage):
+    name = 'sqlite'
+
+    def __init__(self, connect):
+        self.connect = connect
+
+    def create_user(self, username, password, is_admin):
+        conn = self.connect()
+        try:
+            cursor = conn.execute('INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)',
+                                  (username, password, is_admin))
+            conn.commit()
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return None
+        return cursor.lastrowid
+
+    def find_user(self, username):
+        return self.connect().execute('SELECT id, password, is_admin FROM users WHERE username = ?', (username,)).fetchone()
+
+    def update_password(self, user_id, password):
+        conn = self.connect()
+        conn.execute('UPDATE users SET password = ? WHERE id = ?', (password, user_id))
+        conn.commit()
+
+    def list_users(self, after_id, limit):
+        return self.connect().execute('SELECT id, username, is_admin FROM users WHERE id > ? ORDER BY id LIMIT ?',
+                                      (after_id, sql_limit(limit)))
+
+    def delete_user(self, user_id):
+        conn = self.connect()
+        cursor = conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+        conn.commit()
+        return cursor.rowcount == 1
+
+    # 이름 목록을 JSON 하나로 넘겨 바인딩 변수 개수 제한을 피함
+    def existing_usernames(self, usernames):
+        cursor = self.connect().execute('SELECT username FROM users WHERE username IN (SELECT value FROM json_each(?))',
+                                        (json.dumps(list(usernames)),))
+        return {row[0] for row in cursor}
+
+    def import_users(self, rows):
+        conn = self.connect()
+        with immediate_transaction(conn):
+            taken = {row[0] for row in conn.execute('SELECT username FROM users WHERE username IN (SELECT value FROM json_each(?))',
+                                                    (json.dumps([row['username'] for row in rows]),))}
+            skipped = []
+            values = []
+            for index, row in enumerate(rows):
+                if row['username'] in taken:
+                    skipped.append(index)
+                    continue
+                taken.add(row['username'])
+                values.append((row['username'], row['password'], row['is_admin']))
+            conn.executemany('INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)', values)
+        return skipped
+
+    def reservations_version(self, user_id):
+        row = self.connect().execute('SELECT reservations_version FROM users WHERE id = ?', (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def create_event(self, name, tickets_left, hold_ttl=None):
+        conn = self.connect()
+        cursor = conn.execute('INSERT INTO events (name, tickets_left, hold_ttl) VALUES (?, ?, ?)', (name, tickets_left, hold_ttl))
+        conn.commit()
+        return cursor.lastrowid
+
+    def get_event(self, event_id):
+        return self.connect().execute('SELECT id, name, tickets_left FROM events WHERE id = ?', (event_id,)).fetchone()
+
+    def list_events(self, after_id, limit):
+        return self.connect().execute('SELECT id, name, tickets_left FROM events WHERE id > ? ORDER BY id LIMIT ?',
+                                      (after_id, sql_limit(limit)))
+
+    def update_event(self, event_id, fields):
+        conn = self.connect()
+        for column in ('name', 'tickets_left', 'hold_ttl'):
+            if column in fields:
+                conn.execute('UPDATE events SET %s = ? WHERE id = ?' % column, (fields[column], event_id))
+        conn.commit()
+
+    def delete_event(self, event_id):
+        conn = self.connect()
+        conn.execute('DELETE FROM events WHERE id = ?', (event_id,))
+        seatmaps.delete_seat_map(conn, event_id)
+        conn.commit()
+
+    def import_events(self, rows):
+        conn = self.connect()
+        with immediate_transaction(conn):
+            # 한 묶음에 목록 버전 하나 (행마다 트리거로 올리면 가져오기가 두 배 느려짐)
+            version = conn.execute('UPDATE catalog_state SET version = version + 1 RETURNING version').fetchone()[0]
+            conn.executemany('INSERT INTO events (name, tickets_left, hold_ttl, version) VALUES (?, ?, ?, ?)',
+                             [(row['name'], row['tickets_left'], row['hold_ttl'], version) for row in rows])
+
+    # 버전 읽기와 변경분 조회가 같은 스냅샷을 보도록 읽기 트랜잭션 하나에서 실행
+    # (버전은 쓰기 트랜잭션 안에서 트리거가 매기므로 스냅샷의 버전 이하 변경은 빠짐없이 보임)
+    def catalog_changes(self, since, catalog_id=None):
+        conn = self.connect()
+        conn.execute('BEGIN')
+        try:
+            state = conn.execute('SELECT catalog_id, version FROM catalog_state').fetchone()
+            full = since <= 0 or since > state['version'] or catalog_id not in (None, state['catalog_id'])
+            if full:
+                events = conn.execute('SELECT id, name, tickets_left FROM events ORDER BY id').fetchall()
+                deleted = []
+            else:
+                events = conn.execute('SELECT id, name, tickets_left FROM events WHERE version > ? ORDER BY version',
+                                      (since,)).fetchall()
+                deleted = [row[0] for row in conn.execute('SELECT event_id FROM event_tombstones WHERE version > ?', (since,))]
+        finally:
+            conn.rollback()
+        return CatalogChanges(state['catalog_id'], state['version'], full, events, deleted)
+
+    def is_seated(self, event_id):
+        return seatmaps.is_seated(self.connect(), event_id)
+
+    def reserve(self, user_id, event_id):
+        return reservations.reserve(self.connect(), user_id, event_id)
+
+    def cancel(self, user_id, event_id):
+        return reservations.cancel(self.connect(), user_id, event_id)
+
+    def reserve_many(self, user_id, items):
+        return reservations.reserve_many(self.connect(), user_id, items)
+
+    def cancel_many(self, user_id, items):
+        return reservations.cancel_many(self.connect(), user_id, items)
+
+    def list_user_reservations(self, user_id, after_id, limit):
+        return self.connect().execute(MY_RESERVATIONS_SQL, (user_id, after_id, sql_limit(limit)))
+
+    def list_event_reservations(self, event_id, after_id, limit):
+        return self.connect().execute(EVENT_RESERVATIONS_SQL, (event_id, after_id, sql_limit(limit)))
+
+    def event_stats(self, after_id, limit):
+        return self.connect().execute(event_stats.STATS_SQL, (after_id, sql_limit(limit)))
@@ -0,0 +1,126 @@
+# storage.py
+# 사용자/이벤트/예약 저장소 인터페이스 (STORAGE_BACKEND 설정으로 구현 선택)
+#   sqlite : sqlite_storage.SqliteStorage - 기본값, 여러 워커 프로세스가 같은 DB 파일을 공유
+#   memory : memory_storage.MemoryStorage - 프로세스 메모리에만 저장 (워커 하나 전용, 재시작하면 사라짐)
+#            HTTP/직렬화 부하만 측정하거나 빠르게 동작을 확인할 때 사용
+#
+# 목록 조회 메서드는 키 오름차순으로 정렬된 행(row['컬럼'] 으로 읽을 수 있는 객체)들의 iterable을 반환
+# limit이 None이면 after_id 이후 전부
+#   사용자 행        : id, username, is_admin
+#   이벤트 행        : id, name, tickets_left
+#   내 예약 행       : reservation_id, id(이벤트), name(이벤트), section, row_name, seat_no (좌석이 없으면 None)
+#   이벤트 예약자 행 : reservation_id, id(사용자), username
+#   판매 통계 행     : id, name, tickets_left, sold, cancelled, buyers, held, max_per_user
+# 삭제된 이벤트/사용자의 예약은 목록에 나오지 않음
+#
+# 두 구현은 storage_conformance.py의 점검을 모두 통과해야 함
+from collections import namedtuple
+
+# 이벤트 목록 변경분 (catalog_changes 결과)
+# catalog_id: 저장소마다 다른 값 (DB를 새로 만들거나 memory 저장소가 재시작하면 바뀜)
+# version: 이 결과 시점의 목록 버전, full: True면 events가 전체 목록 (이전 캐시를 버려야 함)
+# events: 바뀐 이벤트 행들, deleted: 삭제된 이벤트 ID들
+CatalogChanges = namedtuple('CatalogChanges', 'catalog_id version full events deleted')
+
+class Storage:
+    name = None
+
+    # 새 사용자 ID, 이미 있는 이름이면 None
+    def create_user(self, username, password, is_admin):
+        raise NotImplementedError
+
+    # {'id', 'password', 'is_admin'} 또는 None
+    def find_user(self, username):
+        raise NotImplementedError
+
+    def update_password(self, user_id, password):
+        raise NotImplementedError
+
+    def list_users(self, after_id, limit):
+        raise NotImplementedError
+
+    # 삭제했으면 True, 없는 사용자면 False
+    def delete_user(self, user_id):
+        raise NotImplementedError
+
+    # usernames 중 이미 등록된 이름의 set
+    def existing_usernames(self, usernames):
+        raise NotImplementedError
+
+    # 일괄 가져오기: rows([{'username', 'password'(해시), 'is_admin'}, ...])를 한 트랜잭션으로 추가
+    # 그 사이 다른 요청이 먼저 등록해 건너뛴 행의 위치(rows 기준) 목록 반환
+    def import_users(self, rows):
+        raise NotImplementedError
+
+    # 예약이 바뀔 때마다 1씩 오르는 값 (예약 목록 캐시 확인용), 없는 사용자면 None
+    def reservations_version(self, user_id):
+        raise NotImplementedError
+
+    # 새 이벤트 ID
+    def create_event(self, name, tickets_left, hold_ttl=None):
+        raise NotImplementedError
+
+    # 이벤트 행 또는 None
+    def get_event(self, event_id):
+        raise NotImplementedError
+
+    def list_events(self, after_id, limit):
+        raise NotImplementedError
+
+    # fields: name / tickets_left / hold_ttl 중 바꿀 값만 담은 dict
+    def update_event(self, event_id, fields):
+        raise NotImplementedError
+
+    def delete_event(self, event_id):
+        raise NotImplementedError
+
+    # 일괄 가져오기: rows([{'name', 'tickets_left', 'hold_ttl'}, ...])를 한 트랜잭션으로 추가
+    def import_events(self, rows):
+        raise NotImplementedError
+
+    # 목록 버전 since 이후 생성/수정(이름, 남은 티켓 수)/삭제된 이벤트 (CatalogChanges)
+    # 이벤트가 바뀔 때마다 목록 버전이 1씩 오르고 그 이벤트에 새 버전이 붙음 (삭제는 버전과 ID를 따로 남김)
+    # since가 0이거나, 현재 버전보다 크거나, catalog_id가 주어졌는데 다르면 전체 목록(full)
+    def catalog_changes(self, since, catalog_id=None):
+        raise NotImplementedError
+
+    # 좌석 배치도가 있는 이벤트인지 (좌석 배치도를 지원하지 않는 저장소는 항상 False)
+    def is_seated(self, event_id):
+        return False
+
+    # 한 장 예약, 성공하면 reservations.ReservationChange, 매진이면 None
+    def reserve(self, user_id, event_id):
+        raise NotImplementedError
+
+    # 해당 이벤트의 내 예약 전부 취소, 취소했으면 ReservationChange, 없으면 None
+    def cancel(self, user_id, event_id):
+        raise NotImplementedError
+
+    # items: [(event_id, quantity), ...] 전부 성공하거나 전부 실패, (성공 여부, 항목별 결과)
+    def reserve_many(self, user_id, items):
+        raise NotImplementedError
+
+    def cancel_many(self, user_id, items):
+        raise NotImplementedError
+
+    def list_user_reservations(self, user_id, after_id, limit):
+        raise NotImplementedError
+
+    def list_event_reservations(self, event_id, after_id, limit):
+        raise NotImplementedError
+
+    # 이벤트별 판매 통계 - 예약/취소 때 갱신해 둔 집계를 읽으므로 예약 수와 관계없이 이벤트 수만큼만 읽음
+    def event_stats(self, after_id, limit):
+        raise NotImplementedError
+
+# 설정에 맞는 저장소 생성
+
+def create_storage(config, connect=None):
+    backend = config['STORAGE_BACKEND']
+    if backend == 'sqlite':
+        from sqlite_storage import SqliteStorage
+        return SqliteStorage(connect)
+    if backend == 'memory':
+        from memory_storage import MemoryStorage
+        return MemoryStorage()
+    raise ValueError('알 수 없는 STORAGE_BACKEND: %s' % backend)
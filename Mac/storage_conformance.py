@@ -0,0 +1,360 @@
+# storage_conformance.py
+# 저장소 구현이 storage.py에 적힌 동작을 똑같이 지키는지 점검
+#   python storage_conformance.py [sqlite|memory|all]
+# SQLite는 점검마다 임시 DB 파일을 새로 만들어 마이그레이션한 뒤 스레드별 연결로 사용
+import os
+import random
+import sys
+import tempfile
+import threading
+import traceback
+
+from config import DEFAULTS
+from storage import create_storage
+
+CHECKS = []
+
+def check(fn):
+    CHECKS.append(fn)
+    return fn
+
+def expect(condition, message, *args):
+    if not condition:
+        raise AssertionError(message % args if args else message)
+
+def as_dicts(rows):
+    return [{key: row[key] for key in row.keys()} for row in rows]
+
+def new_storage(backend):
+    config = dict(DEFAULTS, STORAGE_BACKEND=backend)
+    if backend != 'sqlite':
+        return create_storage(config)
+
+    import db
+    import migrations
+    config['DATABASE'] = os.path.join(tempfile.mkdtemp(prefix='storage-check-'), 'events.db')
+    conn = db.open_connection(config)
+    db.configure_database(conn)
+    migrations.migrate(conn)
+    conn.close()
+
+    local = threading.local()
+
+    def connect():
+        if not hasattr(local, 'conn'):
+            local.conn = db.open_connection(config)
+        return local.conn
+    return create_storage(config, connect)
+
+@check
+def users(storage):
+    alice = storage.create_user('alice', 'hash-a', 0)
+    bob = storage.create_user('bob', 'hash-b', 1)
+    expect(alice and bob and alice < bob, '사용자 ID가 오름차순이 아님: %s, %s', alice, bob)
+    expect(storage.create_user('alice', 'other', 0) is None, '중복 사용자 이름이 만들어짐')
+    user = storage.find_user('bob')
+    expect(user['id'] == bob and user['password'] == 'hash-b' and user['is_admin'] == 1, '사용자 조회 결과가 다름: %s', as_dicts([user]))
+    expect(storage.find_user('nobody') is None, '없는 사용자가 조회됨')
+    storage.update_password(alice, 'hash-a2')
+    expect(storage.find_user('alice')['password'] == 'hash-a2', '비밀번호가 바뀌지 않음')
+    expect(storage.reservations_version(alice) == 0, '새 사용자의 예약 버전이 0이 아님')
+
+    carol = storage.create_user('carol', 'hash-c', 0)
+    page = as_dicts(storage.list_users(alice, 1))
+    expect(page == [{'id': bob, 'username': 'bob', 'is_admin': 1}], '사용자 목록 페이지가 다름: %s', page)
+    expect([row['id'] for row in storage.list_users(0, None)] == [alice, bob, carol], '전체 사용자 목록이 다름')
+
+    expect(storage.delete_user(bob) is True, '사용자 삭제 실패')
+    expect(storage.delete_user(bob) is False, '없는 사용자 삭제가 성공함')
+    expect(storage.find_user('bob') is None and storage.reservations_version(bob) is None, '삭제한 사용자가 남아 있음')
+    expect([row['id'] for row in storage.list_users(0, None)] == [alice, carol], '삭제 후 사용자 목록이 다름')
+    expect(storage.create_user('bob', 'hash-b', 0) is not None, '삭제한 이름으로 다시 가입할 수 없음')
+
+@check
+def events(storage):
+    ids = [storage.create_event('event %d' % index, index * 10) for index in range(5)]
+    expect(ids == sorted(ids), '이벤트 ID가 오름차순이 아님: %s', ids)
+    expect(as_dicts([storage.get_event(ids[2])]) == [{'id': ids[2], 'name': 'event 2', 'tickets_left': 20}], '이벤트 조회 결과가 다름')
+    expect(storage.get_event(ids[-1] + 100) is None, '없는 이벤트가 조회됨')
+    expect([row['id'] for row in storage.list_events(ids[0], 2)] == ids[1:3], '이벤트 목록 페이지가 다름')
+
+    storage.update_event(ids[1], {'name': 'renamed', 'tickets_left': 7, 'hold_ttl': 60})
+    storage.update_event(ids[2], {'tickets_left': 0})
+    expect(as_dicts([storage.get_event(ids[1])]) == [{'id': ids[1], 'name': 'renamed', 'tickets_left': 7}], '이벤트 수정이 반영되지 않음')
+    expect(storage.get_event(ids[2])['name'] == 'event 2', '바꾸지 않은 필드가 바뀜')
+
+    storage.delete_event(ids[3])
+    expect(storage.get_event(ids[3]) is None, '삭제한 이벤트가 남아 있음')
+    expect([row['id'] for row in storage.list_events(0, None)] == ids[:3] + ids[4:], '삭제 후 이벤트 목록이 다름')
+    expect(storage.is_seated(ids[0]) is False, '좌석 배치도가 없는 이벤트가 좌석 지정으로 나옴')
+
+@check
+def imports(storage):
+    alice = storage.create_user('alice', 'hash-a', 0)
+    expect(storage.existing_usernames(['alice', 'bob']) == {'alice'}, '이미 있는 이름 조회 결과가 다름')
+    rows = [{'username': name, 'password': 'hash-' + name, 'is_admin': 0} for name in ('bob', 'alice', 'carol', 'bob')]
+    skipped = storage.import_users(rows)
+    expect(skipped == [1, 3], '건너뛴 사용자 위치가 다름: %s', skipped)
+    users = [(row['id'], row['username']) for row in storage.list_users(0, None)]
+    expect([name for _, name in users] == ['alice', 'bob', 'carol'] and users[0][0] == alice, '가져온 사용자 목록이 다름: %s', users)
+    expect(storage.find_user('carol')['password'] == 'hash-carol', '가져온 사용자의 비밀번호 해시가 다름')
+
+    storage.import_events([{'name': 'event %d' % index, 'tickets_left': index, 'hold_ttl': None} for index in range(3)])
+    events = as_dicts(storage.list_events(0, None))
+    expect([(row['name'], row['tickets_left']) for row in events] == [('event 0', 0), ('event 1', 1), ('event 2', 2)],
+           '가져온 이벤트 목록이 다름: %s', events)
+    expect(storage.reserve(alice, events[2]['id']) is not None, '가져온 이벤트를 예약할 수 없음')
+
+@check
+def reserve_and_cancel(storage):
+    alice = storage.create_user('alice', '', 0)
+    bob = storage.create_user('bob', '', 0)
+    event_id = storage.create_event('concert', 2)
+
+    change = storage.reserve(alice, event_id)
+    expect(change.user_id == alice and change.version == 1 and change.removed == [], '예약 결과가 다름: %s', change)
+    expect([(item['event_id'], item['event_name']) for item in change.added] == [(event_id, 'concert')], '추가된 예약 항목이 다름: %s', change.added)
+    first = change.added[0]['reservation_id']
+    expect(storage.reserve(bob, event_id) is not None, '남은 티켓이 있는데 예약 실패')
+    expect(storage.reserve(alice, event_id) is None, '매진인데 예약 성공')
+    expect(storage.get_event(event_id)['tickets_left'] == 0, '남은 티켓 수가 0이 아님')
+    expect(storage.reservations_version(alice) == 1, '매진 시도로 예약 버전이 바뀜')
+
+    change = storage.cancel(alice, event_id)
+    expect(change.version == 2 and change.added == [] and list(change.removed) == [first], '취소 결과가 다름: %s', change)
+    expect(storage.cancel(alice, event_id) is None, '예약이 없는데 취소 성공')
+    expect(storage.get_event(event_id)['tickets_left'] == 1, '취소한 티켓이 돌아오지 않음')
+    expect(storage.reserve(alice, event_id + 100) is None, '없는 이벤트 예약이 성공함')
+    expect(storage.cancel(alice, event_id + 100) is None, '없는 이벤트 취소가 성공함')
+
+@check
+def batches(storage):
+    alice = storage.create_user('alice', '', 0)
+    small = storage.create_event('small', 1)
+    large = storage.create_event('large', 3)
+
+    ok, results = storage.reserve_many(alice, [(large, 2), (small, 2)])
+    expect(not ok and [result['ok'] for result in results] == [True, False], '일부만 가능한 일괄 예약 결과가 다름: %s', results)
+    ok, results = storage.reserve_many(alice, [(large, 2), (large, 2)])
+    expect(not ok and [result['ok'] for result in results] == [True, False], '같은 이벤트 중복 일괄 예약 결과가 다름: %s', results)
+    ok, _ = storage.reserve_many(alice, [(large, 1), (small + large + 100, 1)])
+    expect(not ok, '없는 이벤트가 섞인 일괄 예약이 성공함')
+    expect(storage.get_event(large)['tickets_left'] == 3 and storage.reservations_version(alice) == 0, '실패한 일괄 예약이 일부 반영됨')
+
+    ok, results = storage.reserve_many(alice, [(large, 2), (small, 1)])
+    expect(ok and all(result['ok'] for result in results), '가능한 일괄 예약이 실패함: %s', results)
+    expect(storage.reservations_version(alice) == 1, '일괄 예약 한 번에 예약 버전이 1 오르지 않음')
+    expect((storage.get_event(large)['tickets_left'], storage.get_event(small)['tickets_left']) == (1, 0), '일괄 예약 후 남은 티켓이 다름')
+
+    ok, results = storage.cancel_many(alice, [(large, 3)])
+    expect(not ok and not results[0]['ok'], '예약보다 많은 일괄 취소가 성공함')
+    ok, results = storage.cancel_many(alice, [(large, 1), (large, 2)])
+    expect(not ok and [result['ok'] for result in results] == [True, False], '같은 이벤트 중복 일괄 취소 결과가 다름: %s', results)
+    ok, _ = storage.cancel_many(alice, [(large, 1), (small, 1)])
+    expect(ok, '가능한 일괄 취소가 실패함')
+    expect((storage.get_event(large)['tickets_left'], storage.get_event(small)['tickets_left']) == (2, 1), '일괄 취소 후 남은 티켓이 다름')
+    remaining = [row['id'] for row in storage.list_user_reservations(alice, 0, None)]
+    expect(remaining == [large], '일괄 취소 후 남은 예약이 다름: %s', remaining)
+    expect(storage.reservations_version(alice) == 2, '일괄 취소 후 예약 버전이 다름')
+
+@check
+def reservation_lists(storage):
+    alice = storage.create_user('alice', '', 0)
+    bob = storage.create_user('bob', '', 0)
+    first = storage.create_event('first', 10)
+    second = storage.create_event('second', 10)
+    ids = []
+    for user_id, event_id in [(alice, first), (bob, first), (alice, second), (alice, first)]:
+        ids.append(storage.reserve(user_id, event_id).added[0]['reservation_id'])
+
+    mine = as_dicts(storage.list_user_reservations(alice, 0, None))
+    expect([(row['reservation_id'], row['id'], row['name']) for row in mine] == [(ids[0], first, 'first'), (ids[2], second, 'second'), (ids[3], first, 'first')],
+           '내 예약 목록이 다름: %s', mine)
+    expect(all(row['section'] is None and row['row_name'] is None and row['seat_no'] is None for row in mine), '좌석 없는 예약에 좌석 정보가 있음')
+    expect([row['reservation_id'] for row in storage.list_user_reservations(alice, ids[0], 1)] == [ids[2]], '내 예약 목록 페이지가 다름')
+
+    attendees = as_dicts(storage.list_event_reservations(first, 0, None))
+    expect([(row['reservation_id'], row['id'], row['username']) for row in attendees] == [(ids[0], alice, 'alice'), (ids[1], bob, 'bob'), (ids[3], alice, 'alice')],
+           '이벤트 예약자 목록이 다름: %s', attendees)
+    expect([row['reservation_id'] for row in storage.list_event_reservations(first, ids[1], 5)] == [ids[3]], '이벤트 예약자 목록 페이지가 다름')
+
+    storage.delete_event(second)
+    expect([row['reservation_id'] for row in storage.list_user_reservations(alice, 0, None)] == [ids[0], ids[3]], '삭제한 이벤트의 예약이 목록에 나옴')
+    storage.delete_user(bob)
+    expect([row['reservation_id'] for row in storage.list_event_reservations(first, 0, None)] == [ids[0], ids[3]], '삭제한 사용자의 예약이 목록에 나옴')
+
+@check
+def concurrent_reserve(storage):
+    tickets = 50
+    event_id = storage.create_event('hot', tickets)
+    user_ids = [storage.create_user('user %d' % index, '', 0) for index in range(8)]
+    successes = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(user_ids))
+
+    def work(user_id):
+        barrier.wait()
+        count = sum(1 for _ in range(20) if storage.reserve(user_id, event_id) is not None)
+        with lock:
+            successes.append(count)
+
+    run_threads(work, user_ids)
+    expect(sum(successes) == tickets, '동시 예약 성공 수가 티켓 수와 다름: %d', sum(successes))
+    expect(storage.get_event(event_id)['tickets_left'] == 0, '동시 예약 후 남은 티켓이 0이 아님')
+    expect(sum(1 for _ in storage.list_event_reservations(event_id, 0, None)) == tickets, '동시 예약 후 예약 행 수가 다름')
+
+@check
+def churn(storage):
+    initial = 20
+    event_ids = [storage.create_event('event %d' % index, initial) for index in range(3)]
+    user_ids = [storage.create_user('user %d' % index, '', 0) for index in range(8)]
+
+    def work(user_id):
+        rng = random.Random(user_id)
+        for _ in range(150):
+            event_id = rng.choice(event_ids)
+            roll = rng.random()
+            if roll < 0.5:
+                storage.reserve(user_id, event_id)
+            elif roll < 0.7:
+                storage.cancel(user_id, event_id)
+            elif roll < 0.85:
+                storage.reserve_many(user_id, [(event_id, 2), (rng.choice(event_ids), 1)])
+            else:
+                storage.cancel_many(user_id, [(event_id, 1)])
+
+    run_threads(work, user_ids)
+    for event_id in event_ids:
+        tickets_left = storage.get_event(event_id)['tickets_left']
+        reserved = sum(1 for _ in storage.list_event_reservations(event_id, 0, None))
+        expect(tickets_left >= 0 and tickets_left + reserved == initial, '이벤트 %d: 남은 티켓 %d + 예약 %d != %d', event_id, tickets_left, reserved, initial)
+    for row in as_dicts(storage.event_stats(0, None)):
+        holders = {}
+        for reservation in storage.list_event_reservations(row['id'], 0, None):
+            holders[reservation['id']] = holders.get(reservation['id'], 0) + 1
+        expect((row['sold'], row['buyers'], row['max_per_user']) == (sum(holders.values()), len(holders), max(holders.values(), default=0)),
+               '경쟁 후 판매 통계가 예약과 다름: %s', row)
+
+@check
+def stats(storage):
+    alice = storage.create_user('alice', '', 0)
+    bob = storage.create_user('bob', '', 0)
+    first = storage.create_event('first', 10)
+    second = storage.create_event('second', 5)
+    storage.reserve(alice, first)
+    storage.reserve_many(alice, [(first, 2), (second, 1)])
+    storage.reserve(bob, first)
+    storage.cancel_many(alice, [(first, 1)])
+    storage.cancel(alice, second)
+
+    rows = as_dicts(storage.event_stats(0, None))
+    fields = ('id', 'tickets_left', 'sold', 'cancelled', 'buyers', 'held', 'max_per_user')
+    expect([tuple(row[field] for field in fields) for row in rows] == [(first, 7, 3, 1, 2, 0, 2), (second, 5, 0, 1, 0, 0, 0)],
+           '판매 통계가 다름: %s', rows)
+    storage.cancel(alice, first)
+    row, = as_dicts(storage.event_stats(0, 1))
+    expect((row['sold'], row['cancelled'], row['buyers'], row['max_per_user']) == (1, 3, 1, 1), '전부 취소한 뒤 판매 통계가 다름: %s', row)
+    expect([row['id'] for row in storage.event_stats(first, 10)] == [second], '판매 통계 페이지가 다름')
+
+@check
+def catalog_changes(storage):
+    first = storage.create_event('first', 10)
+    second = storage.create_event('second', 5)
+    full = storage.catalog_changes(0)
+    expect(full.full and [row['id'] for row in full.events] == [first, second] and full.deleted == [], '전체 목록이 다름: %s', full)
+    expect(not storage.catalog_changes(full.version, full.catalog_id).events, '변경이 없는데 변경분이 있음')
+
+    alice = storage.create_user('alice', '', 0)
+    storage.reserve(alice, first)
+    storage.update_event(second, {'hold_ttl': 60})   # 목록에 보이지 않는 값만 바뀌면 변경 아님
+    changes = storage.catalog_changes(full.version, full.catalog_id)
+    expect(not changes.full and [(row['id'], row['tickets_left']) for row in changes.events] == [(first, 9)],
+           '예약 후 변경분이 다름: %s', as_dicts(changes.events))
+
+    third = storage.create_event('third', 1)
+    storage.update_event(second, {'name': 'renamed'})
+    storage.delete_event(first)
+    later = storage.catalog_changes(changes.version)
+    expect([row['id'] for row in later.events] == [third, second] and later.deleted == [first] and later.version > changes.version,
+           '생성/수정/삭제 후 변경분이 다름: %s %s', as_dicts(later.events), later.deleted)
+    expect(storage.catalog_changes(later.version + 1).full, '현재보다 큰 버전인데 전체 목록이 아님')
+    expect(storage.catalog_changes(later.version, 'other').full, '다른 catalog_id인데 전체 목록이 아님')
+
+# 예약/취소가 몰리는 동안 변경분만 받아 고친 캐시가 마지막에 전체 목록과 같은지
+@check
+def catalog_sync(storage):
+    event_ids = [storage.create_event('event %d' % index, 30) for index in range(6)]
+    user_ids = [storage.create_user('user %d' % index, '', 0) for index in range(6)]
+    cache = {}
+    state = {'version': 0, 'catalog_id': None, 'running': len(user_ids)}
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def sync():
+        changes = storage.catalog_changes(state['version'], state['catalog_id'])
+        if changes.full:
+            cache.clear()
+        for row in changes.events:
+            cache[row['id']] = (row['name'], row['tickets_left'])
+        for event_id in changes.deleted:
+            cache.pop(event_id, None)
+        state.update(version=changes.version, catalog_id=changes.catalog_id)
+
+    def work(user_id):
+        if user_id is None:
+            while not done.is_set():
+                sync()
+            return
+        rng = random.Random(user_id)
+        try:
+            for index in range(120):
+                event_id = rng.choice(event_ids)
+                if rng.random() < 0.6:
+                    storage.reserve(user_id, event_id)
+                else:
+                    storage.cancel_many(user_id, [(event_id, 1)])
+                if user_id == user_ids[0] and index == 60:
+                    storage.delete_event(event_ids[-1])
+                    storage.create_event('late', 3)
+        finally:
+            with lock:
+                state['running'] -= 1
+                if not state['running']:
+                    done.set()
+
+    run_threads(work, user_ids + [None])
+    sync()
+    actual = {row['id']: (row['name'], row['tickets_left']) for row in storage.list_events(0, None)}
+    expect(cache == actual, '변경분으로 맞춘 캐시가 전체 목록과 다름: %s != %s', cache, actual)
+
+def run_threads(fn, args):
+    errors = []
+
+    def target(arg):
+        try:
+            fn(arg)
+        except Exception:
+            errors.append(traceback.format_exc())
+
+    threads = [threading.Thread(target=target, args=(arg,)) for arg in args]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    expect(not errors, '작업 스레드 오류:\n%s', ''.join(errors))
+
+def main(argv):
+    backends = ['sqlite', 'memory'] if not argv or argv[0] == 'all' else argv
+    failures = 0
+    for backend in backends:
+        for fn in CHECKS:
+            try:
+                fn(new_storage(backend))
+                print('ok    %s %s' % (backend, fn.__name__))
+            except Exception as e:
+                failures += 1
+                print('FAIL  %s %s: %s' % (backend, fn.__name__, e))
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
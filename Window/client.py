@@ -1,46 +1,12 @@
+import json
+import os
+
 import requests
 
 BASE_URL = "http://127.0.0.1:5000"
+EVENT_CACHE_FILE = "events_cache.json"
 
 def register_user():
-<<<<<<< HEAD
-    while True:
-        print("\n1. 사용자 등록\n2. 등록자 확인\n3. 목록으로 돌아가기")
-        choice = input("원하는 기능의 번호를 입력하세요: ")
-
-        if choice == '1':
-            username = input("사용자 이름을 입력하세요: ")
-            password = input("비밀번호를 입력하세요: ")
-            try:
-                response = requests.post(f"{BASE_URL}/register", json={'username': username, 'password': password})
-                response.raise_for_status()
-                print(response.json().get("message", "등록에 성공했습니다."))
-            except requests.RequestException as e:
-                print("사용자 등록 실패:", e)
-        
-        elif choice == '2':
-            view_registered_users()  # 등록된 사용자 목록을 조회하는 기능을 호출
-        
-        elif choice == '3':
-            return  # 목록으로 돌아가기
-        
-        else:
-            print("잘못된 입력입니다. 다시 시도하세요.")
-
-def view_registered_users():
-    try:
-        response = requests.get(f"{BASE_URL}/users")  # 서버에서 등록된 사용자 목록을 가져오는 API
-        response.raise_for_status()
-        users = response.json().get("users", [])
-        if users:
-            print("\n등록된 사용자 목록:")
-            for user in users:
-                print(f"ID: {user['id']}, 사용자 이름: {user['username']}")
-        else:
-            print("등록된 사용자가 없습니다.")
-    except requests.RequestException as e:
-        print("사용자 목록 조회 실패:", e)
-=======
     username = input("사용자 이름을 입력하세요: ")
     password = input("비밀번호를 입력하세요: ")
     try:
@@ -49,7 +15,6 @@ def view_registered_users():
         print(response.json().get("message", "등록에 성공했습니다."))
     except requests.RequestException as e:
         print("사용자 등록 실패:", e)
->>>>>>> 719c53c26b6c3eef8fe6b3e8413b22469dd604f7
 
 def login_user():
     username = input("사용자 이름을 입력하세요: ")
@@ -61,20 +26,74 @@ def login_user():
     except requests.RequestException as e:
         print("로그인 실패:", e)
 
+# 이벤트 목록 캐시 (실행 사이에도 유지, 다시 조회할 때는 지난 조회 이후 바뀐 이벤트만 받음)
+# {"url", "catalog_id", "version", "events": {ID: 이벤트}}
+def load_event_cache():
+    try:
+        with open(EVENT_CACHE_FILE, encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache["url"] == BASE_URL:
+            cache["events"] = {int(event_id): event for event_id, event in cache["events"].items()}
+            return cache
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+    return {"url": BASE_URL, "catalog_id": None, "version": 0, "events": {}}
+
+def save_event_cache(cache):
+    temp_file = EVENT_CACHE_FILE + ".tmp"
+    try:
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(temp_file, EVENT_CACHE_FILE)
+    except OSError as e:
+        print("이벤트 캐시 저장 실패:", e)
+
+def print_event(event):
+    print(f"ID: {event['id']}, 이름: {event['name']}, 남은 티켓: {event['tickets_left']}")
+
+# 처음(또는 서버 DB가 바뀌었을 때)은 전체 목록, 그 뒤로는 바뀐 이벤트만 출력
 def view_events():
+    cache = load_event_cache()
+    params = {"changed_since": cache["version"]}
+    if cache["catalog_id"]:
+        params["catalog_id"] = cache["catalog_id"]
     try:
-        response = requests.get(f"{BASE_URL}/events")
+        response = requests.get(f"{BASE_URL}/events", params=params)
         response.raise_for_status()
-        events = response.json().get("events", [])
+        data = response.json()
+    except (requests.RequestException, ValueError) as e:
+        print("이벤트 조회 실패:", e)
+        return
+
+    full = data.get("full", True)   # 목록 버전을 모르는 서버는 항상 전체 목록
+    changed = data.get("events", [])
+    events = cache["events"]
+    if full:
+        events.clear()
+    for event in changed:
+        events[event["id"]] = event
+    deleted = [event_id for event_id in data.get("deleted", []) if events.pop(event_id, None) is not None]
+    if full or changed or deleted or data.get("version", 0) != cache["version"]:
+        cache["catalog_id"] = data.get("catalog_id")
+        cache["version"] = data.get("version", 0)
+        save_event_cache(cache)
+
+    if full:
         if events:
-            for event in events:
-                print(f"ID: {event['id']}, 이름: {event['name']}, 남은 티켓: {event['tickets_left']}")
+            for event_id in sorted(events):
+                print_event(events[event_id])
         else:
             print("이벤트가 없습니다.")
-    except requests.RequestException as e:
-        print("이벤트 조회 실패:", e)
+    elif changed or deleted:
+        print("지난 조회 이후 바뀐 이벤트:")
+        for event in changed:
+            print_event(event)
+        for event_id in deleted:
+            print(f"ID: {event_id} - 삭제된 이벤트입니다.")
+        print(f"전체 이벤트 {len(events)}개")
+    else:
+        print(f"지난 조회 이후 바뀐 이벤트가 없습니다. (전체 이벤트 {len(events)}개)")
 
-<<<<<<< HEAD
 def add_event():
     name = input("이벤트 이름을 입력하세요: ")
     tickets_left = input("이벤트의 남은 티켓 수를 입력하세요: ")
@@ -85,8 +104,6 @@ def add_event():
     except requests.RequestException as e:
         print("이벤트 추가 실패:", e)
 
-=======
->>>>>>> 719c53c26b6c3eef8fe6b3e8413b22469dd604f7
 def reserve_ticket():
     user_id = input("사용자 ID를 입력하세요: ")
     event_id = input("예약할 이벤트의 ID를 입력하세요: ")
@@ -110,13 +127,6 @@ def view_reservations():
     except requests.RequestException as e:
         print("예약 조회 실패:", e)
 
-<<<<<<< HEAD
-def main():
-    while True:
-        print("\n메뉴:\n1. 사용자 등록\n2. 사용자 로그인\n3. 이벤트 조회\n4. 티켓 예약\n5. 예약 현황 조회\n6. 이벤트 추가\n7. 종료")
-        choice = input("원하는 기능의 번호를 입력하세요: ")
-
-=======
 def view_registered_users():
     try:
         response = requests.get(f"{BASE_URL}/users")  # 서버에서 등록된 사용자 목록을 가져오는 API
@@ -149,10 +159,9 @@ def show_user_menu():
 
 def main():
     while True:
-        print("\n메뉴:\n1. 사용자 등록\n2. 사용자 로그인\n3. 이벤트 조회\n4. 티켓 예약\n5. 예약 현황 조회\n6. 종료")
+        print("\n메뉴:\n1. 사용자 등록\n2. 사용자 로그인\n3. 이벤트 조회\n4. 티켓 예약\n5. 예약 현황 조회\n6. 이벤트 추가\n7. 사용자 메뉴\n8. 종료")
         choice = input("원하는 기능의 번호를 입력하세요: ")
         
->>>>>>> 719c53c26b6c3eef8fe6b3e8413b22469dd604f7
         if choice == '1':
             register_user()
         elif choice == '2':
@@ -164,17 +173,12 @@ def main():
         elif choice == '5':
             view_reservations()
         elif choice == '6':
-<<<<<<< HEAD
             add_event()
         elif choice == '7':
+            show_user_menu()  # 사용자 메뉴로 가기
+        elif choice == '8':
             print("프로그램을 종료합니다.")
             break
-=======
-            print("프로그램을 종료합니다.")
-            break
-        elif choice == '7':
-            show_user_menu()  # 사용자 메뉴로 가기
->>>>>>> 719c53c26b6c3eef8fe6b3e8413b22469dd604f7
         else:
             print("잘못된 입력입니다. 다시 시도하세요.")
 
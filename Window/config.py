@@ -0,0 +1,62 @@
+# config.py
+import json
+import os
+
+# 서버 기본 설정값 (같은 이름의 환경 변수로 덮어쓸 수 있음)
+DEFAULTS = {
+    'DATABASE': 'events.db',
+    'SECRET_KEY': 'your_secret_key',  # Flask 세션 쿠키 서명 키 (지금은 세션을 쓰지 않지만, 쓰게 되면 모든 워커가 같은 값이어야 함)
+    'DEBUG': False,                   # python server.py로 띄울 때 디버거/리로더 사용 여부
+    'SERVER_HOST': '127.0.0.1',
+    'SERVER_PORT': 5000,
+    'SERVER_WORKERS': 0,              # serve.py가 띄울 워커 프로세스 수 (0이면 CPU 코어 수)
+    'WORKER_THREADS': 32,             # 워커 하나가 동시에 처리하는 연결 수
+    'KEEPALIVE_TIMEOUT': 5,           # 유휴 keep-alive 연결을 닫기까지 기다리는 시간 (초)
+    'GRACEFUL_TIMEOUT': 30,           # 종료/재시작 시 처리 중인 요청을 기다리는 최대 시간 (초)
+    'DB_POOL_ENABLED': True,          # False로 두면 요청마다 연결을 새로 여는 기존 방식으로 동작
+    'DB_POOL_SIZE': 16,               # 풀에 보관할 유휴 연결 최대 개수
+    'DB_BUSY_TIMEOUT_MS': 5000,
+    'DB_MMAP_SIZE': 256 * 1024 * 1024,
+    'DB_CACHED_STATEMENTS': 256,      # 연결별 prepared statement 캐시 크기
+    'PAGE_MAX_LIMIT': 1000,           # 목록 조회 시 limit 최대값
+}
+
+# 환경 변수 문자열을 기본값의 타입에 맞게 변환
+
+def _coerce(raw, default):
+    if isinstance(default, bool):
+        return raw.strip().lower() in ('1', 'true', 'yes', 'on')
+    if isinstance(default, int):
+        return int(raw)
+    if isinstance(default, float):
+        return float(raw)
+    return raw
+
+# JSON 설정 파일 읽기 (키는 DEFAULTS에 있는 이름만 허용)
+
+def read_config_file(path):
+    with open(path, encoding='utf-8') as f:
+        values = json.load(f)
+    unknown = sorted(set(values) - set(DEFAULTS))
+    if unknown:
+        raise ValueError('알 수 없는 설정 키: %s' % ', '.join(unknown))
+    return values
+
+# 기본값 -> 설정 파일(SERVER_CONFIG_FILE) -> 환경 변수 -> overrides 순서로 설정 dict 만들기
+
+def read_config(overrides=None):
+    config = dict(DEFAULTS)
+    path = (overrides or {}).get('SERVER_CONFIG_FILE') or os.environ.get('SERVER_CONFIG_FILE')
+    if path:
+        config.update(read_config_file(path))
+    for key, default in DEFAULTS.items():
+        raw = os.environ.get(key)
+        if raw is not None:
+            config[key] = _coerce(raw, default)
+    if overrides:
+        config.update((key, value) for key, value in overrides.items() if key != 'SERVER_CONFIG_FILE')
+    return config
+
+def load_config(app, overrides=None):
+    app.config.update(read_config(overrides))
+    return app.config
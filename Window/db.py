@@ -0,0 +1,104 @@
+# db.py
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+from flask import current_app, g
+
+# 새 SQLite 연결을 열고 연결 단위 PRAGMA 적용
+
+def open_connection(config):
+    conn = sqlite3.connect(
+        config['DATABASE'],
+        timeout=config['DB_BUSY_TIMEOUT_MS'] / 1000,
+        check_same_thread=False,
+        cached_statements=config['DB_CACHED_STATEMENTS'],
+    )
+    conn.row_factory = sqlite3.Row  # 딕셔너리 스타일로 데이터 가져오기
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA busy_timeout = %d' % config['DB_BUSY_TIMEOUT_MS'])
+    conn.execute('PRAGMA mmap_size = %d' % config['DB_MMAP_SIZE'])
+    return conn
+
+# 데이터베이스 파일 단위 설정 (WAL은 파일에 저장되므로 시작 시 한 번만 설정)
+
+def configure_database(conn):
+    conn.execute('PRAGMA journal_mode = WAL')
+
+# BEGIN IMMEDIATE로 쓰기 잠금을 먼저 확보하는 트랜잭션
+# (읽은 뒤 쓰기로 승격하다 교착되는 일이 없고, 여러 워커 프로세스 사이에서도 직렬화됨)
+
+@contextmanager
+def immediate_transaction(conn):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+# 워커 프로세스별로 재사용하는 연결 풀
+
+class ConnectionPool:
+    def __init__(self, config):
+        self.config = config
+        self.size = config['DB_POOL_SIZE']
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue(maxsize=self.size)
+
+    def _check_fork(self):
+        # fork 이후에는 부모 프로세스의 연결을 공유하면 안 되므로 풀을 새로 시작
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._idle = queue.LifoQueue(maxsize=self.size)
+
+    def acquire(self):
+        self._check_fork()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return open_connection(self.config)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if os.getpid() != self._pid:
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+# 요청(앱 컨텍스트)마다 연결 하나를 g에 보관
+
+def get_db():
+    if 'db' not in g:
+        pool = current_app.extensions.get('db_pool')
+        g.db = pool.acquire() if pool else open_connection(current_app.config)
+    return g.db
+
+# 앱 컨텍스트 종료 시 연결을 풀에 돌려주거나 닫기
+
+def close_db(exception=None):
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    pool = current_app.extensions.get('db_pool')
+    if pool:
+        pool.release(conn)
+    else:
+        conn.close()
+
+def init_app(app):
+    if app.config['DB_POOL_ENABLED']:
+        app.extensions['db_pool'] = ConnectionPool(app.config)
+    app.teardown_appcontext(close_db)
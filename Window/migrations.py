@@ -0,0 +1,147 @@
+# migrations.py
+# Window 서버 스키마 버전 관리 (PRAGMA user_version, Mac/migrations.py와 같은 방식)
+import sqlite3
+import sys
+
+from config import DEFAULTS
+from db import immediate_transaction, open_connection
+
+# Mac 서버 DB(users.is_admin이 있음)에 Window 마이그레이션을 적용하지 않도록 먼저 확인
+
+def _check_schema(conn):
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(users)')}
+    if 'is_admin' in columns:
+        raise RuntimeError('Mac 서버 DB입니다. Mac/migrations.py로 마이그레이션하세요.')
+
+# 이벤트 목록 버전 (GET /events?changed_since=버전 으로 그 뒤에 바뀐 이벤트만 조회)
+# - 이벤트를 추가/변경/삭제할 때마다 트리거가 catalog_state.version을 1 올리고 이벤트에 그 버전을 기록
+# - 삭제된 이벤트는 event_tombstones에 남김
+# - catalog_id는 DB마다 다른 무작위 값 (DB를 새로 만들면 클라이언트 캐시를 통째로 다시 받게 함)
+# - 기존 이벤트는 버전 0 (버전 1보다 앞이므로 변경분에는 나오지 않음)
+#   (마이그레이션 전에 init_db가 이미 만든 DB도 있으므로 컬럼이 있는지 확인)
+
+def _add_catalog_version(conn):
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(events)')]
+    if 'version' not in columns:
+        conn.execute('ALTER TABLE events ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+
+# (버전, 단계 목록) - 단계는 SQL 문자열 또는 conn을 받는 함수
+# PRAGMA user_version보다 높은 버전만 순서대로 적용됨
+MIGRATIONS = [
+    (1, [
+        '''CREATE TABLE IF NOT EXISTS users (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        username TEXT UNIQUE,
+                        password TEXT)''',
+        '''CREATE TABLE IF NOT EXISTS events (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        name TEXT,
+                        tickets_left INTEGER)''',
+        '''CREATE TABLE IF NOT EXISTS reservations (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER,
+                        event_id INTEGER,
+                        FOREIGN KEY(user_id) REFERENCES users(id),
+                        FOREIGN KEY(event_id) REFERENCES events(id))''',
+    ]),
+    (2, [
+        'CREATE INDEX IF NOT EXISTS idx_reservations_user ON reservations(user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_reservations_event ON reservations(event_id)',
+        'CREATE INDEX IF NOT EXISTS idx_reservations_user_event ON reservations(user_id, event_id)',
+    ]),
+    (3, [
+        '''CREATE TABLE IF NOT EXISTS catalog_state (
+                        id INTEGER PRIMARY KEY CHECK (id = 1),
+                        catalog_id TEXT NOT NULL,
+                        version INTEGER NOT NULL)''',
+        "INSERT OR IGNORE INTO catalog_state (id, catalog_id, version) VALUES (1, lower(hex(randomblob(8))), 1)",
+        '''CREATE TABLE IF NOT EXISTS event_tombstones (
+                        version INTEGER PRIMARY KEY,
+                        event_id INTEGER NOT NULL)''',
+        _add_catalog_version,
+        'CREATE INDEX IF NOT EXISTS idx_events_version ON events(version)',
+        '''CREATE TRIGGER IF NOT EXISTS trg_events_version_insert AFTER INSERT ON events BEGIN
+                        UPDATE catalog_state SET version = version + 1;
+                        UPDATE events SET version = (SELECT version FROM catalog_state) WHERE id = NEW.id;
+                      END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_events_version_update AFTER UPDATE OF name, tickets_left ON events
+                      WHEN NEW.name IS NOT OLD.name OR NEW.tickets_left IS NOT OLD.tickets_left BEGIN
+                        UPDATE catalog_state SET version = version + 1;
+                        UPDATE events SET version = (SELECT version FROM catalog_state) WHERE id = NEW.id;
+                      END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_events_version_delete AFTER DELETE ON events BEGIN
+                        UPDATE catalog_state SET version = version + 1;
+                        INSERT INTO event_tombstones (version, event_id) SELECT version, OLD.id FROM catalog_state;
+                      END''',
+    ]),
+]
+
+def current_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+# 아직 적용되지 않은 마이그레이션을 버전별 트랜잭션으로 적용하고 최종 버전 반환
+# (여러 워커가 동시에 실행해도 BEGIN IMMEDIATE 안에서 버전을 다시 확인하므로 한 번만 적용됨)
+
+def migrate(conn):
+    _check_schema(conn)
+    for version, steps in MIGRATIONS:
+        if version <= current_version(conn):
+            continue
+        with immediate_transaction(conn):
+            if version <= current_version(conn):
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute('PRAGMA user_version = %d' % version)
+    return current_version(conn)
+
+# 자주 호출되는 쿼리 - 모두 인덱스를 사용해야 함 (전체 테이블 SCAN 금지)
+HOT_QUERIES = {
+    'login': ('SELECT * FROM users WHERE username=? AND password=?', ('x', 'x')),
+    'reserve_ticket': ('UPDATE events SET tickets_left=tickets_left-1 WHERE id=? AND tickets_left>0', (1,)),
+    'user_event_reservations': ('SELECT id FROM reservations WHERE user_id = ? AND event_id = ?', (1, 1)),
+    'event_reservations': ('SELECT id FROM reservations WHERE event_id = ?', (1,)),
+    'catalog_changes': ('SELECT id, name, tickets_left FROM events WHERE version > ? ORDER BY version', (1,)),
+}
+
+def _is_full_scan(detail):
+    return detail.startswith('SCAN') or 'TEMP B-TREE' in detail or '(rowid>?)' in detail
+
+# EXPLAIN QUERY PLAN 결과에서 인덱스를 쓰지 않는 쿼리를 찾아 ({이름: [계획]}, [없는 테이블/컬럼 때문에 건너뛴 이름]) 반환
+
+def check_query_plans(conn):
+    problems = {}
+    skipped = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        try:
+            plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        except sqlite3.OperationalError:
+            skipped.append(name)
+            continue
+        if any(_is_full_scan(detail) for detail in plan):
+            problems[name] = plan
+    return problems, skipped
+
+# python migrations.py [DB 경로] : 마이그레이션 적용 후 쿼리 계획 점검
+if __name__ == '__main__':
+    config = dict(DEFAULTS)
+    if len(sys.argv) > 1:
+        config['DATABASE'] = sys.argv[1]
+    conn = open_connection(config)
+    try:
+        before = current_version(conn)
+        after = migrate(conn)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(2)
+    print('schema version: %d -> %d' % (before, after))
+    problems, skipped = check_query_plans(conn)
+    for name, plan in problems.items():
+        print('%s: %s' % (name, ' / '.join(plan)))
+    for name in skipped:
+        print('%s: 건너뜀 (없는 테이블/컬럼)' % name)
+    conn.close()
+    sys.exit(1 if problems else 0)
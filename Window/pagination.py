@@ -0,0 +1,48 @@
+# pagination.py
+from flask import Response, current_app, jsonify, request, stream_with_context
+
+STREAM_BATCH_SIZE = 500
+
+# limit / after_id 쿼리 파라미터 해석
+# limit이 없으면 None을 돌려주며, 이 경우 목록 전체를 스트리밍으로 내보냄
+
+def page_args():
+    limit = request.args.get('limit', type=int)
+    after_id = request.args.get('after_id', default=0, type=int)
+    if limit is not None:
+        limit = max(1, min(limit, current_app.config['PAGE_MAX_LIMIT']))
+    return limit, after_id
+
+# SQL의 LIMIT ? 자리에 넣을 값 (SQLite에서 -1은 제한 없음)
+
+def sql_limit(limit):
+    return -1 if limit is None else limit
+
+# 커서 결과를 한 페이지(JSON) 또는 전체 스트리밍 응답으로 변환
+# 쿼리는 반드시 키 컬럼 오름차순으로 정렬되어 있어야 함
+
+def list_response(key, cursor, to_dict, limit, cursor_key='id'):
+    if limit is None:
+        return stream_response(key, cursor, to_dict)
+
+    items = [to_dict(row) for row in cursor.fetchall()]
+    next_after_id = items[-1][cursor_key] if len(items) == limit else None
+    return jsonify({key: items, 'next_after_id': next_after_id}), 200
+
+# fetchmany 단위로 읽어 JSON 배열을 조각조각 내보내는 응답 (전체 행을 메모리에 올리지 않음)
+
+def stream_response(key, cursor, to_dict):
+    dumps = current_app.json.dumps
+
+    def generate():
+        yield '{%s: [' % dumps(key)
+        separator = ''
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            yield separator + ','.join(dumps(to_dict(row)) for row in rows)
+            separator = ','
+        yield ']}\n'
+
+    return Response(stream_with_context(generate()), status=200, mimetype='application/json')
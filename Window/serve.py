@@ -0,0 +1,232 @@
+# serve.py
+# 운영용 실행 진입점: 마스터 프로세스가 DB를 한 번 초기화하고 소켓을 연 뒤 워커 프로세스들을 fork
+#
+#   python serve.py --workers 4 --threads 32 --port 5000
+#   python serve.py --config server.json
+#
+# 시그널
+#   SIGTERM / SIGINT : 처리 중인 요청을 마친 뒤 종료 (GRACEFUL_TIMEOUT이 지나면 강제 종료)
+#   SIGHUP           : 설정 파일/환경 변수를 다시 읽어 새 워커를 띄우고 기존 워커를 순서대로 종료
+#                      (호스트/포트는 바꿀 수 없고, 코드 변경은 재시작해야 반영됨)
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+import server
+from config import read_config
+
+log = logging.getLogger('serve')
+
+# 워커가 바로 죽으면 다시 띄우기 전에 잠시 기다림 (설정 오류로 fork를 무한 반복하지 않도록)
+RESPAWN_DELAY = 1.0
+
+# 동시에 처리하는 연결 수를 threads개로 제한하는 WSGI 서버
+# 빈 자리가 없으면 accept 하지 않으므로 대기 중인 연결은 여유 있는 다른 워커가 가져감
+
+class WorkerServer(ThreadedWSGIServer):
+    daemon_threads = False
+    block_on_close = True   # server_close()에서 처리 중인 요청 스레드가 끝날 때까지 기다림
+
+    def __init__(self, host, port, app, threads, keepalive_timeout, fd, on_close=None):
+        handler = type('WorkerRequestHandler', (WSGIRequestHandler,), {'timeout': keepalive_timeout})
+        self._on_close = None   # 부모 __init__에서도 server_close()를 부르므로 먼저 비워 둠
+        super().__init__(host, port, app, handler=handler, fd=fd)
+        self._slots = threading.BoundedSemaphore(threads)
+        self._slot_taken = False
+        self._on_close = on_close
+
+    # serve_forever()가 끝나면 호출됨
+    # 요청 스레드를 기다리기 전에 스스로 끝나지 않는 응답(실시간 스트림 등)을 먼저 정리
+    def server_close(self):
+        if self._on_close:
+            self._on_close()
+        super().server_close()
+
+    def _handle_request_noblock(self):
+        if not self._slots.acquire(timeout=0.5):
+            return
+        self._slot_taken = False
+        try:
+            super()._handle_request_noblock()
+        finally:
+            if not self._slot_taken:   # 다른 워커가 먼저 accept 했거나 연결이 거부된 경우
+                self._slots.release()
+
+    def process_request(self, request, client_address):
+        self._slot_taken = True
+        super().process_request(request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._slots.release()
+
+# 워커 프로세스 본체 (fork 직후 호출되며 반환하지 않음)
+
+def run_worker(sock, config):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)   # 준비 중에 받은 SIGTERM은 바로 종료
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # Ctrl+C는 마스터가 받아서 SIGTERM으로 전달
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    status = 0
+    try:
+        app = server.create_app(config)
+        httpd = WorkerServer(config['SERVER_HOST'], config['SERVER_PORT'], app, config['WORKER_THREADS'],
+                             config['KEEPALIVE_TIMEOUT'], sock.fileno())
+        # serve_forever()가 도는 스레드에서 shutdown()을 부르면 멈추므로 별도 스레드에서 호출
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=httpd.shutdown, daemon=True).start())
+        log.info('워커 %d 시작', os.getpid())
+        httpd.serve_forever()   # 끝날 때 server_close()로 처리 중인 요청까지 기다림
+        server.close_app()
+        log.info('워커 %d 종료', os.getpid())
+    except Exception:
+        log.exception('워커 %d 오류로 종료', os.getpid())
+        status = 1
+    finally:
+        os._exit(status)
+
+# 워커 fork/감시, 재시작, 종료를 담당하는 마스터 프로세스
+
+class Master:
+    def __init__(self, sock, config, overrides):
+        self.sock = sock
+        self.config = config
+        self.overrides = overrides
+        self.workers = {}       # pid -> (세대, 시작 시각)
+        self.generation = 0
+        self._stopping = False
+        self._reloading = False
+
+    def worker_count(self):
+        return self.config['SERVER_WORKERS'] or os.cpu_count() or 1
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.sock, self.config)
+        self.workers[pid] = (self.generation, time.monotonic())
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGHUP, self._request_reload)
+        log.info('http://%s:%d 에서 대기 중 (워커 %d개 x 스레드 %d개)', self.config['SERVER_HOST'],
+                 self.config['SERVER_PORT'], self.worker_count(), self.config['WORKER_THREADS'])
+        while not self._stopping:
+            if self._reloading:
+                self._reloading = False
+                self.reload()
+            self.reap()
+            self.maintain()
+            time.sleep(0.2)
+        self.stop()
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _request_reload(self, signum, frame):
+        self._reloading = True
+
+    # 종료된 워커를 정리하고, 현재 세대 워커가 예기치 않게 죽었으면 기록
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation, started = self.workers.pop(pid, (None, 0))
+            if generation == self.generation and not self._stopping:
+                log.warning('워커 %d 비정상 종료 (status %d), 다시 시작합니다', pid, status)
+                if time.monotonic() - started < RESPAWN_DELAY:
+                    time.sleep(RESPAWN_DELAY)
+
+    # 현재 세대 워커 수를 설정값에 맞춤
+    def maintain(self):
+        current = sum(1 for generation, _ in self.workers.values() if generation == self.generation)
+        for _ in range(self.worker_count() - current):
+            self.spawn()
+
+    # 새 설정으로 새 세대 워커를 먼저 띄운 뒤 이전 세대에 SIGTERM
+    def reload(self):
+        config = read_config(self.overrides)
+        if (config['SERVER_HOST'], config['SERVER_PORT']) != (self.config['SERVER_HOST'], self.config['SERVER_PORT']):
+            log.warning('SERVER_HOST/SERVER_PORT 변경은 재시작해야 반영됩니다 (기존 소켓 유지)')
+        config['SERVER_HOST'], config['SERVER_PORT'] = self.config['SERVER_HOST'], self.config['SERVER_PORT']
+        old = [pid for pid, (generation, _) in self.workers.items() if generation == self.generation]
+        self.config = config
+        self.generation += 1
+        self.maintain()
+        log.info('설정을 다시 읽었습니다. 이전 워커 %d개를 종료합니다', len(old))
+        self._signal(old, signal.SIGTERM)
+
+    # 모든 워커에 SIGTERM을 보내고 GRACEFUL_TIMEOUT 동안 기다린 뒤 남은 워커는 SIGKILL
+    def stop(self):
+        log.info('워커 %d개 종료 중', len(self.workers))
+        self._signal(list(self.workers), signal.SIGTERM)
+        deadline = time.monotonic() + self.config['GRACEFUL_TIMEOUT']
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        if self.workers:
+            log.warning('%d초 안에 끝나지 않은 워커 %d개를 강제 종료합니다', self.config['GRACEFUL_TIMEOUT'], len(self.workers))
+            self._signal(list(self.workers), signal.SIGKILL)
+            while self.workers:
+                pid, _ = os.waitpid(-1, 0)
+                self.workers.pop(pid, None)
+        self.sock.close()
+
+    def _signal(self, pids, signum):
+        for pid in pids:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+# 모든 워커가 함께 accept 하는 리스닝 소켓
+# non-blocking으로 두어야 다른 워커가 먼저 가져간 연결을 기다리며 accept()에서 멈추지 않음
+
+def listen(config):
+    sock = socket.create_server((config['SERVER_HOST'], config['SERVER_PORT']), backlog=1024)
+    sock.setblocking(False)
+    return sock
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='티켓 예약 서버 (멀티 프로세스)')
+    parser.add_argument('--config', help='JSON 설정 파일 경로 (SERVER_CONFIG_FILE과 같음)')
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--workers', type=int, help='워커 프로세스 수 (0이면 CPU 코어 수)')
+    parser.add_argument('--threads', type=int, help='워커당 동시 처리 연결 수')
+    parser.add_argument('--database')
+    return parser.parse_args()
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(levelname)s %(message)s')
+    args = parse_args()
+    options = {'SERVER_CONFIG_FILE': args.config, 'SERVER_HOST': args.host, 'SERVER_PORT': args.port,
+               'SERVER_WORKERS': args.workers, 'WORKER_THREADS': args.threads, 'DATABASE': args.database}
+    overrides = {key: value for key, value in options.items() if value is not None}
+    config = read_config(overrides)
+
+    # 테이블 생성은 fork 전에 한 번만
+    server.init_db(config)
+
+    try:
+        sock = listen(config)
+    except OSError as e:
+        log.error('%s:%d 에서 대기할 수 없습니다: %s', config['SERVER_HOST'], config['SERVER_PORT'], e)
+        return 1
+    Master(sock, config, overrides).run()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
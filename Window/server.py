@@ -1,67 +1,66 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request
 import sqlite3
 
-app = Flask(__name__)
-
-# 데이터베이스 연결
-def connect_db():
-    conn = sqlite3.connect('events.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-# 데이터베이스 초기화
-def init_db():
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('''CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        username TEXT UNIQUE,
-                        password TEXT)''')
-    cursor.execute('''CREATE TABLE IF NOT EXISTS events (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT,
-                        tickets_left INTEGER)''')
-    cursor.execute('''CREATE TABLE IF NOT EXISTS reservations (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        event_id INTEGER,
-                        FOREIGN KEY(user_id) REFERENCES users(id),
-                        FOREIGN KEY(event_id) REFERENCES events(id))''')
-    conn.commit()
+import db
+import migrations
+from config import load_config
+from db import get_db, immediate_transaction
+from pagination import list_response, page_args, sql_limit
+
+bp = Blueprint('api', __name__)
+
+# create_app()이 만든 앱 (프로세스마다 앱 하나)
+app = None
+
+# 앱 생성 (설정은 기본값 -> 설정 파일 -> 환경 변수 -> overrides 순서로 적용)
+def create_app(overrides=None):
+    global app
+    app = Flask(__name__)
+    load_config(app, overrides)
+    db.init_app(app)
+    app.register_blueprint(bp)
+    return app
+
+# 데이터베이스 초기화 (스키마 마이그레이션 적용, 여러 워커를 띄울 때는 fork 전에 한 번만 실행)
+def init_db(config=None):
+    conn = db.open_connection(config or app.config)
+    db.configure_database(conn)
+    migrations.migrate(conn)
     conn.close()
 
+# 워커 종료 시 DB 연결 풀 정리
+def close_app():
+    pool = app.extensions.get('db_pool')
+    if pool:
+        pool.close_all()
+
 
 # 이벤트 추가
-@app.route('/event', methods=['POST'])
+@bp.route('/event', methods=['POST'])
 def add_event():
     data = request.json
     name = data['name']
     tickets_left = data['tickets_left']
     
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute('INSERT INTO events (name, tickets_left) VALUES (?, ?)', (name, tickets_left))
     conn.commit()
-    conn.close()
     
     return jsonify({'message': '이벤트가 추가되었습니다.'})
 
 
-<<<<<<< HEAD
-=======
-
->>>>>>> 719c53c26b6c3eef8fe6b3e8413b22469dd604f7
-@app.route('/')
+@bp.route('/')
 def index():
     return '서버가 정상적으로 작동 중입니다!'
 
-@app.route('/register', methods=['POST'])
+@bp.route('/register', methods=['POST'])
 def register():
     data = request.json
     username = data['username']
     password = data['password']
     
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     try:
         cursor.execute('INSERT INTO users (username, password) VALUES (?, ?)', (username, password))
@@ -69,93 +68,104 @@ def register():
         return jsonify({'message': '사용자가 등록되었습니다.'}), 201
     except sqlite3.IntegrityError:
         return jsonify({'message': '이미 등록된 사용자입니다.'}), 400
-    finally:
-        conn.close()
 
-@app.route('/login', methods=['POST'])
+@bp.route('/login', methods=['POST'])
 def login():
     data = request.json
     username = data['username']
     password = data['password']
     
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM users WHERE username=? AND password=?', (username, password))
     user = cursor.fetchone()
-    conn.close()
 
     if user:
         return jsonify({'message': '로그인 성공'}), 200
     else:
         return jsonify({'message': '사용자 이름 또는 비밀번호가 잘못되었습니다.'}), 400
 
-<<<<<<< HEAD
 # 이벤트 조회
-=======
->>>>>>> 719c53c26b6c3eef8fe6b3e8413b22469dd604f7
-@app.route('/events', methods=['GET'])
+# changed_since=버전 이 있으면 그 버전 뒤로 추가/변경된 이벤트와 삭제된 이벤트 ID만 응답
+#   (0이거나, 서버 버전보다 크거나, catalog_id가 이 DB와 다르면 full=true로 전체 목록)
+@bp.route('/events', methods=['GET'])
 def get_events():
-    conn = connect_db()
+    if 'changed_since' in request.args:
+        return get_event_changes()
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM events')
+    cursor.execute('SELECT id, name, tickets_left FROM events')
     events = cursor.fetchall()
-    conn.close()
     
     return jsonify({'events': [dict(event) for event in events]}), 200
 
-<<<<<<< HEAD
+def get_event_changes():
+    since = request.args.get('changed_since', type=int)
+    if since is None or since < 0:
+        return jsonify({'message': 'changed_since는 0 이상의 정수여야 합니다.'}), 400
+
+    conn = get_db()
+    conn.execute('BEGIN')   # 목록 버전과 변경분을 같은 스냅샷에서 읽음
+    try:
+        state = conn.execute('SELECT catalog_id, version FROM catalog_state').fetchone()
+        catalog_id = request.args.get('catalog_id')
+        full = since <= 0 or since > state['version'] or (catalog_id is not None and catalog_id != state['catalog_id'])
+        if full:
+            events = conn.execute('SELECT id, name, tickets_left FROM events ORDER BY id').fetchall()
+            deleted = []
+        else:
+            events = conn.execute('SELECT id, name, tickets_left FROM events WHERE version > ? ORDER BY version', (since,)).fetchall()
+            deleted = [row[0] for row in conn.execute('SELECT event_id FROM event_tombstones WHERE version > ?', (since,))]
+    finally:
+        conn.rollback()
+
+    response = jsonify({'catalog_id': state['catalog_id'], 'version': state['version'], 'full': full,
+                        'events': [dict(event) for event in events], 'deleted': deleted})
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 # 티켓 예약
-=======
->>>>>>> 719c53c26b6c3eef8fe6b3e8413b22469dd604f7
-@app.route('/reserve', methods=['POST'])
+@bp.route('/reserve', methods=['POST'])
 def reserve_ticket():
     data = request.json
     user_id = data['user_id']
     event_id = data['event_id']
     
-    conn = connect_db()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM events WHERE id=?', (event_id,))
-    event = cursor.fetchone()
-    
-    if event and event['tickets_left'] > 0:
-        cursor.execute('UPDATE events SET tickets_left=tickets_left-1 WHERE id=?', (event_id,))
-        cursor.execute('INSERT INTO reservations (user_id, event_id) VALUES (?, ?)', (user_id, event_id))
-        conn.commit()
-        conn.close()
+    # 남은 티켓이 있을 때만 차감되는 조건부 UPDATE로 초과 예약 방지
+    conn = get_db()
+    with immediate_transaction(conn):
+        cursor = conn.execute('UPDATE events SET tickets_left=tickets_left-1 WHERE id=? AND tickets_left>0', (event_id,))
+        reserved = cursor.rowcount == 1
+        if reserved:
+            conn.execute('INSERT INTO reservations (user_id, event_id) VALUES (?, ?)', (user_id, event_id))
+
+    if reserved:
         return jsonify({'message': '예약이 완료되었습니다.'}), 200
     else:
-        conn.close()
         return jsonify({'message': '이벤트 예약이 불가능합니다.'}), 400
 
-<<<<<<< HEAD
-# 예약 목록 조회
-=======
->>>>>>> 719c53c26b6c3eef8fe6b3e8413b22469dd604f7
-@app.route('/reservations', methods=['GET'])
+# 예약 목록 조회 (limit/after_id로 페이지 조회, limit이 없으면 전체를 스트리밍)
+@bp.route('/reservations', methods=['GET'])
 def get_reservations():
-    conn = connect_db()
+    limit, after_id = page_args()
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('SELECT * FROM reservations')
-    reservations = cursor.fetchall()
-    conn.close()
+    cursor.execute('SELECT * FROM reservations WHERE id > ? ORDER BY id LIMIT ?', (after_id, sql_limit(limit)))
     
-    return jsonify({'reservations': [dict(res) for res in reservations]}), 200
+    return list_response('reservations', cursor, dict, limit)
 
-<<<<<<< HEAD
 # 사용자 목록 조회 (추가된 부분)
-@app.route('/users', methods=['GET'])
+@bp.route('/users', methods=['GET'])
 def get_users():
-    conn = connect_db()
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute('SELECT id, username FROM users')
     users = cursor.fetchall()
-    conn.close()
     
     return jsonify({'users': [{'id': user[0], 'username': user[1]} for user in users]}), 200
 
-=======
->>>>>>> 719c53c26b6c3eef8fe6b3e8413b22469dd604f7
+# 개발용 단일 프로세스 실행 (운영에서는 serve.py 사용)
 if __name__ == '__main__':
+    create_app()
     init_db()
-    app.run(debug=True)
+    app.run(host=app.config['SERVER_HOST'], port=app.config['SERVER_PORT'], debug=app.config['DEBUG'])